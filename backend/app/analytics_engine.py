@@ -0,0 +1,105 @@
+import calendar
+from datetime import datetime
+from typing import Any, Dict, Optional
+
+
+def department_filter(department: Optional[str]) -> Dict[str, Any]:
+    """Build the department match used by the analytics endpoints ("all" means no filter)"""
+    if department and department != "all":
+        return {"department": department}
+    return {}
+
+
+def current_month_range(now: Optional[datetime] = None):
+    """Return the first and last day of the current month as YYYY-MM-DD strings"""
+    now = now or datetime.utcnow()
+    month_start = datetime(now.year, now.month, 1).strftime("%Y-%m-%d")
+    month_end = datetime(now.year, now.month, calendar.monthrange(now.year, now.month)[1]).strftime("%Y-%m-%d")
+    return month_start, month_end
+
+
+def build_dashboard_pipeline(department: Optional[str], month_start: str, month_end: str):
+    """Single $facet pipeline computing every dashboard KPI in one pass over employees"""
+    base_filter = department_filter(department)
+
+    return [
+        {"$facet": {
+            # Totals, average salary, attrition and new hires share the department filter
+            "summary": [
+                {"$match": base_filter},
+                {"$group": {
+                    "_id": None,
+                    "total": {"$sum": 1},
+                    "avg_salary": {"$avg": "$salary"},
+                    "inactive": {"$sum": {"$cond": [{"$eq": ["$is_active", False]}, 1, 0]}},
+                    "new_hires": {"$sum": {"$cond": [
+                        {"$and": [
+                            {"$gte": ["$join_date", month_start]},
+                            {"$lte": ["$join_date", month_end]}
+                        ]},
+                        1, 0
+                    ]}}
+                }}
+            ],
+            # Top department is always ranked across the whole active workforce
+            "top_department": [
+                {"$match": {"is_active": True}},
+                {"$group": {
+                    "_id": "$department",
+                    "avg_performance": {"$avg": "$performance_score"},
+                    "count": {"$sum": 1}
+                }},
+                {"$sort": {"avg_performance": -1}},
+                {"$limit": 1}
+            ]
+        }}
+    ]
+
+
+def fetch_dashboard_stats(collection, department: Optional[str] = None, now: Optional[datetime] = None):
+    """Run the dashboard pipeline and shape the raw facet output into KPI values"""
+    month_start, month_end = current_month_range(now)
+    result = list(collection.aggregate(build_dashboard_pipeline(department, month_start, month_end)))
+    facets = result[0] if result else {}
+
+    summary = facets.get("summary") or [{}]
+    summary = summary[0]
+    top = facets.get("top_department") or []
+
+    total = summary.get("total", 0)
+    inactive = summary.get("inactive", 0)
+
+    return {
+        "total_employees": total,
+        "average_salary": summary.get("avg_salary") or 0,
+        "new_hires_this_month": summary.get("new_hires", 0),
+        "attrition_rate": (inactive / total * 100) if total > 0 else 0,
+        "top_department": top[0]["_id"] if top else "N/A"
+    }
+
+
+def dashboard_stats_from_snapshots(snapshots, department: Optional[str] = None, now: Optional[datetime] = None):
+    """Same KPIs as fetch_dashboard_stats, folded from per-department snapshot documents"""
+    month_key = current_month_range(now)[0][:7]
+    selected = [s for s in snapshots if not department or department == "all" or s.get("department") == department]
+
+    total = sum(s.get("employee_count", 0) for s in selected)
+    salary_count = sum(s.get("salary_count", 0) for s in selected)
+    salary_sum = sum(s.get("salary_sum", 0) for s in selected)
+    inactive = sum(s.get("inactive_count", 0) for s in selected)
+    new_hires = sum((s.get("hires") or {}).get(month_key, 0) for s in selected)
+
+    # Top department is always ranked across the whole active workforce
+    ranked = [
+        (s["active_performance_sum"] / s["active_performance_count"], s.get("department"))
+        for s in snapshots if s.get("active_performance_count")
+    ]
+    top_department = max(ranked, key=lambda r: r[0])[1] if ranked else "N/A"
+
+    return {
+        "total_employees": total,
+        "average_salary": (salary_sum / salary_count) if salary_count > 0 else 0,
+        "new_hires_this_month": new_hires,
+        "attrition_rate": (inactive / total * 100) if total > 0 else 0,
+        "top_department": top_department
+    }
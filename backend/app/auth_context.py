@@ -0,0 +1,80 @@
+import copy
+import hashlib
+import os
+import time
+from typing import Any, Dict
+from dotenv import load_dotenv
+from fastapi import Depends, HTTPException
+from fastapi.security import HTTPAuthorizationCredentials, HTTPBearer
+from .cache import MemoryBackend, _MISSING
+from .database import get_database
+from .utils.auth import decodetoken
+
+# Per-process caches for authenticated requests: verified JWT payloads (kept until the
+# token's own `exp`) and user documents (kept for a few seconds, dropped on profile updates).
+
+load_dotenv()
+
+AUTH_TOKEN_CACHE_SIZE = int(os.getenv("AUTH_TOKEN_CACHE_SIZE", 10000))
+AUTH_USER_CACHE_SIZE = int(os.getenv("AUTH_USER_CACHE_SIZE", 10000))
+AUTH_USER_CACHE_TTL = int(os.getenv("AUTH_USER_CACHE_TTL", 30))
+
+db = get_database()
+empcollection = db["employees"]
+
+security = HTTPBearer()
+
+_tokens = MemoryBackend(max_entries=AUTH_TOKEN_CACHE_SIZE)
+_users = MemoryBackend(max_entries=AUTH_USER_CACHE_SIZE)
+
+
+def _token_key(token: str) -> str:
+    # Raw bearer tokens never sit in memory as dict keys
+    return hashlib.sha256(token.encode("utf-8")).hexdigest()
+
+
+def verify_token(token: str):
+    """decodetoken with caching; None for invalid or expired tokens"""
+    key = _token_key(token)
+    payload = _tokens.get(key)
+    if payload is not _MISSING:
+        return payload
+    payload = decodetoken(token)
+    if payload and isinstance(payload.get("exp"), (int, float)):
+        ttl = int(payload["exp"] - time.time())
+        if ttl > 0:
+            _tokens.set(key, payload, ttl)
+    return payload
+
+
+def load_user(email: str):
+    """User document by email, served from the short-TTL cache; callers get their own copy"""
+    user = _users.get(email)
+    if user is _MISSING:
+        user = empcollection.find_one({"email": email})
+        if user is None:
+            return None
+        _users.set(email, user, AUTH_USER_CACHE_TTL)
+    return copy.deepcopy(user)
+
+
+def invalidate_user(email: str):
+    """Call after writing to a user's employee document"""
+    _users.delete(email)
+
+
+def get_token_payload(credentials: HTTPAuthorizationCredentials = Depends(security)) -> Dict[str, Any]:
+    """Dependency: verified JWT payload with a `sub` email, or 401"""
+    payload = verify_token(credentials.credentials)
+    if not payload or not payload.get("sub"):
+        raise HTTPException(status_code=401, detail="Invalid token")
+    return payload
+
+
+def get_current_user(payload: Dict[str, Any] = Depends(get_token_payload)) -> Dict[str, Any]:
+    """Dependency: the authenticated user's employee document, or 404"""
+    user = load_user(payload["sub"])
+    if not user:
+        raise HTTPException(status_code=404, detail="User Not Found")
+    return user
+
@@ -0,0 +1,147 @@
+import json
+from typing import Any, Dict, List, Optional, Tuple
+from pydantic import ValidationError
+from pymongo import DeleteOne, InsertOne, UpdateOne
+from pymongo.errors import BulkWriteError
+from . import snapshots
+from .data_version import employees_changed
+from .database import get_database
+from .models import NewEmployee, UpdateEmployee
+from .search import search_update, with_search_tokens
+
+# Mixed insert/update/upsert/delete operations for /employees/bulk, one JSON object per line:
+#   {"op": "update", "employee_id": "EMP001", "data": {"salary": 90000}}
+# Operations are grouped into unordered bulk_write batches.
+
+db = get_database()
+employees_collection = db["employees"]
+
+OPERATIONS = ("insert", "update", "upsert", "delete")
+DEFAULT_BATCH_SIZE = 1000
+MAX_BATCH_SIZE = 10000
+MAX_LINE_BYTES = 1024 * 1024
+
+
+class OperationError(ValueError):
+    pass
+
+
+def _validation_message(e: ValidationError) -> str:
+    return "; ".join(f"{'.'.join(str(part) for part in error['loc'])}: {error['msg']}" for error in e.errors())
+
+
+def parse_operation(line: bytes) -> Dict[str, Any]:
+    """Validate one NDJSON line into {"op", "employee_id", "data"}; raises OperationError"""
+    try:
+        entry = json.loads(line)
+    except ValueError as e:
+        raise OperationError(f"Invalid JSON: {e}")
+    if not isinstance(entry, dict):
+        raise OperationError("Each line must be a JSON object")
+
+    op = entry.get("op")
+    if op not in OPERATIONS:
+        raise OperationError(f"op must be one of: {', '.join(OPERATIONS)}")
+    data = entry.get("data") or {}
+    if not isinstance(data, dict):
+        raise OperationError("data must be an object")
+    employee_id = entry.get("employee_id") or data.get("employee_id")
+    if not isinstance(employee_id, str) or not employee_id:
+        raise OperationError("employee_id is required")
+
+    try:
+        if op in ("insert", "upsert"):
+            data = NewEmployee(**{**data, "employee_id": employee_id}).dict()
+        elif op == "update":
+            unknown = set(data) - set(UpdateEmployee.model_fields)
+            if unknown:
+                raise OperationError(f"Unknown fields: {', '.join(sorted(unknown))}")
+            # Every UpdateEmployee field is Optional but required; default the ones not sent
+            validated = UpdateEmployee(**{**dict.fromkeys(UpdateEmployee.model_fields), **data}).dict()
+            data = {key: value for key, value in validated.items() if key in data and value is not None}
+            if not data:
+                raise OperationError("update needs at least one field in data")
+        else:
+            data = {}
+    except ValidationError as e:
+        raise OperationError(_validation_message(e))
+    return {"op": op, "employee_id": employee_id, "data": data}
+
+
+def _write_model(operation: Dict[str, Any]):
+    employee_filter = {"employee_id": operation["employee_id"]}
+    if operation["op"] == "insert":
+        return InsertOne(with_search_tokens(operation["data"]))
+    if operation["op"] == "upsert":
+        return UpdateOne(employee_filter, search_update(operation["data"]), upsert=True)
+    if operation["op"] == "update":
+        return UpdateOne(employee_filter, search_update(operation["data"]))
+    return DeleteOne(employee_filter)
+
+
+def execute_batch(batch: List[Tuple[int, Dict[str, Any]]]) -> List[Dict[str, Any]]:
+    """
+    Run (line number, operation) pairs as one unordered bulk_write and return a result per
+    operation. Callers must not put two operations for the same employee in one batch,
+    since an unordered batch may apply them in any order.
+    """
+    ids = [operation["employee_id"] for _, operation in batch]
+    existing = {
+        doc["employee_id"]: doc
+        for doc in employees_collection.find({"employee_id": {"$in": ids}}, snapshots.SNAPSHOT_FIELDS)
+    }
+
+    failed = {}
+    try:
+        employees_collection.bulk_write([_write_model(operation) for _, operation in batch], ordered=False)
+    except BulkWriteError as e:
+        failed = {error["index"]: error.get("errmsg", "Write failed") for error in e.details.get("writeErrors", [])}
+
+    results, removed, added = [], [], []
+    for index, (line_number, operation) in enumerate(batch):
+        op, employee_id, data = operation["op"], operation["employee_id"], operation["data"]
+        before = existing.get(employee_id)
+        result = {"line": line_number, "op": op, "employee_id": employee_id}
+        if index in failed:
+            result.update(status="error", error=failed[index])
+        elif op in ("update", "delete") and before is None:
+            result["status"] = "not_found"
+        else:
+            # Inserts onto an existing id fail on employee_id_unique, so only updates and upserts replace one
+            replaced = before if op != "insert" else None
+            if replaced is not None:
+                removed.append(replaced)
+            if op == "delete":
+                result["status"] = "deleted"
+            else:
+                added.append({**replaced, **data} if op == "update" else data)
+                result["status"] = "inserted" if replaced is None else "updated"
+        results.append(result)
+
+    if removed or added:
+        snapshots.apply_delete(removed)
+        snapshots.apply_insert(added)
+        employees_changed()
+    return results
+
+
+class BatchBuilder:
+    """Accumulates parsed operations; a batch is closed early when an employee_id repeats"""
+
+    def __init__(self, batch_size: int = DEFAULT_BATCH_SIZE):
+        self.batch_size = batch_size
+        self.batch: List[Tuple[int, Dict[str, Any]]] = []
+        self.ids = set()
+
+    def add(self, line_number: int, operation: Dict[str, Any]) -> Optional[List[Tuple[int, Dict[str, Any]]]]:
+        """Queue an operation; returns a full batch to execute first, if any"""
+        ready = None
+        if operation["employee_id"] in self.ids or len(self.batch) >= self.batch_size:
+            ready = self.flush()
+        self.batch.append((line_number, operation))
+        self.ids.add(operation["employee_id"])
+        return ready
+
+    def flush(self) -> Optional[List[Tuple[int, Dict[str, Any]]]]:
+        ready, self.batch, self.ids = self.batch or None, [], set()
+        return ready
@@ -0,0 +1,205 @@
+import functools
+import inspect
+import os
+import pickle
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Optional
+from dotenv import load_dotenv
+
+load_dotenv()
+
+CACHE_BACKEND = os.getenv("ANALYTICS_CACHE_BACKEND", "memory")
+CACHE_TTL = int(os.getenv("ANALYTICS_CACHE_TTL", 60))
+CACHE_MAX_ENTRIES = int(os.getenv("ANALYTICS_CACHE_MAX_ENTRIES", 512))
+REDIS_URL = os.getenv("REDIS_URL", "redis://localhost:6379/0")
+# Seconds the data version is reused before it is read again; another worker's
+# write may be served stale for up to this long
+CACHE_VERSION_TTL = float(os.getenv("ANALYTICS_CACHE_VERSION_TTL", 1))
+
+_MISSING = object()
+
+
+class MemoryBackend:
+    """In-process LRU store with per-entry TTLs"""
+
+    def __init__(self, max_entries: int = CACHE_MAX_ENTRIES):
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.evictions = 0
+        self.expirations = 0
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def get(self, key: str):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return _MISSING
+            expires_at, value = entry
+            if expires_at <= time.monotonic():
+                del self._entries[key]
+                self.expirations += 1
+                return _MISSING
+            self._entries.move_to_end(key)
+            return value
+
+    def set(self, key: str, value: Any, ttl: int):
+        with self._lock:
+            self._entries[key] = (time.monotonic() + ttl, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def delete(self, key: str):
+        with self._lock:
+            self._entries.pop(key, None)
+
+    def size(self) -> int:
+        return len(self._entries)
+
+
+class RedisBackend:
+    """Redis-compatible store shared by every worker; LRU is left to the server's maxmemory-policy"""
+
+    prefix = "analytics-cache"
+
+    def __init__(self, url: str = REDIS_URL):
+        import redis
+        self._client = redis.Redis.from_url(url)
+        self._client.ping()
+        self.evictions = 0
+        self.expirations = 0
+
+    def clear(self):
+        # Entries keyed on an older data version are never read again and expire on their TTL
+        pass
+
+    def get(self, key: str):
+        raw = self._client.get(f"{self.prefix}:{key}")
+        return _MISSING if raw is None else pickle.loads(raw)
+
+    def set(self, key: str, value: Any, ttl: int):
+        self._client.setex(f"{self.prefix}:{key}", ttl, pickle.dumps(value))
+
+    def delete(self, key: str):
+        self._client.delete(f"{self.prefix}:{key}")
+
+    def size(self) -> int:
+        return sum(1 for _ in self._client.scan_iter(f"{self.prefix}:*:*"))
+
+
+def _create_backend():
+    if CACHE_BACKEND == "redis":
+        try:
+            return RedisBackend()
+        except Exception as e:
+            print(f"Warning: Redis cache unavailable, using in-process cache: {e}")
+    return MemoryBackend()
+
+
+def _employees_version() -> int:
+    # data_version imports this module for analytics_cache
+    from .data_version import employees_version
+    return employees_version()
+
+
+class ResultCache:
+    """
+    Response cache keyed on endpoint + normalized params and the employees data version.
+
+    The version is the persistent counter in app/data_version.py, so a write made
+    through any worker process retires every process's entries, whichever backend
+    holds them. It is read at most once per `version_ttl` seconds, so hits don't
+    cost a MongoDB round trip; this process's own writes reset it at once.
+    """
+
+    def __init__(self, backend=None, ttl: int = CACHE_TTL, version: Callable[[], int] = _employees_version,
+                 version_ttl: float = CACHE_VERSION_TTL):
+        self.backend = backend or _create_backend()
+        self.ttl = ttl
+        self.version = version
+        self.version_ttl = version_ttl
+        self._version = None
+        self._version_expires_at = 0.0
+        self.hits = 0
+        self.misses = 0
+
+    def current_version(self) -> int:
+        now = time.monotonic()
+        if self._version is None or now >= self._version_expires_at:
+            self._version = self.version()
+            self._version_expires_at = now + self.version_ttl
+        return self._version
+
+    @staticmethod
+    def make_key(endpoint: str, params: Dict[str, Any], version: int) -> str:
+        # "all" department and unset params mean the same query
+        normalized = sorted(
+            (name, value) for name, value in params.items()
+            if value is not None and not (name == "department" and value == "all")
+        )
+        return f"{version}:{endpoint}:{normalized!r}"
+
+    def get_or_compute(self, endpoint: str, params: Dict[str, Any], compute: Callable[[], Any]):
+        try:
+            key = self.make_key(endpoint, params, self.current_version())
+            value = self.backend.get(key)
+        except Exception as e:
+            # A broken cache backend must never take the endpoint down
+            print(f"Warning: Analytics cache lookup failed: {e}")
+            return compute()
+        if value is not _MISSING:
+            self.hits += 1
+            return value
+        self.misses += 1
+        value = compute()
+        try:
+            self.backend.set(key, value, self.ttl)
+        except Exception as e:
+            print(f"Warning: Analytics cache store failed: {e}")
+        return value
+
+    def invalidate(self):
+        """Called through data_version.employees_changed; drops this process's entries for older versions"""
+        self._version = None
+        try:
+            self.backend.clear()
+        except Exception as e:
+            print(f"Warning: Failed to invalidate analytics cache: {e}")
+
+    def stats(self) -> Dict[str, Any]:
+        lookups = self.hits + self.misses
+        return {
+            "backend": type(self.backend).__name__,
+            "ttl_seconds": self.ttl,
+            "entries": self.backend.size(),
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / lookups * 100, 2) if lookups else 0,
+            "evictions": self.backend.evictions,
+            "expirations": self.backend.expirations
+        }
+
+
+analytics_cache = ResultCache()
+
+
+def cached(endpoint: str, cache: Optional[ResultCache] = None):
+    """Cache a route's return value; the wrapped signature is preserved for FastAPI"""
+    def decorator(func):
+        signature = inspect.signature(func)
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            bound = signature.bind(*args, **kwargs)
+            bound.apply_defaults()
+            target = cache or analytics_cache
+            return target.get_or_compute(endpoint, dict(bound.arguments), lambda: func(*args, **kwargs))
+        return wrapper
+    return decorator
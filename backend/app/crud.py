@@ -1,6 +1,9 @@
 from .database import get_database
+from . import snapshots
+from .data_version import employees_changed
 from .models import Employee
-from typing import List
+from .search import EMPLOYEE_PROJECTION, SEARCH_TOKENS_FIELD, search_tokens, search_update
+from typing import List, Optional
 from bson.objectid import ObjectId
 
 # Fetch data
@@ -9,12 +12,32 @@ employees_collection = db["employees"]
 
 # Show all employees
 def get_all_employees():
-    employees = list(employees_collection.find({}, {"_id": 0}))
+    employees = list(employees_collection.find({}, EMPLOYEE_PROJECTION))
     return employees
 
+# Employees /employees lists, paged or not: those with a string employee_id, which every
+# write path sets. `$gte: ""` matches only strings, so the partial employee_id index
+# serves keyset pages.
+LISTED = {"employee_id": {"$gte": ""}}
+
+# Keyset page of employees ordered by employee_id
+def get_employees_page(query: dict, limit: int, after: Optional[str] = None, projection: Optional[dict] = None):
+    id_filter = {"employee_id": {"$gt": after}} if after is not None else LISTED
+    cursor = employees_collection.find(
+        {**query, **id_filter},
+        projection or EMPLOYEE_PROJECTION
+    ).sort("employee_id", 1).limit(limit + 1)
+    employees = list(cursor)
+    next_after = employees[limit - 1]["employee_id"] if len(employees) > limit else None
+    return employees[:limit], next_after
+
+# Estimated size of the employees collection (metadata only, no scan)
+def estimate_employee_count():
+    return employees_collection.estimated_document_count()
+
 # Shhow employees filtered by id
 def get_employee_by_id(employee_id: str):
-    employee = employees_collection.find_one({"employee_id": employee_id}, {"_id": 0})
+    employee = employees_collection.find_one({"employee_id": employee_id}, EMPLOYEE_PROJECTION)
     return employee
 
 # Show all departments
@@ -24,7 +47,7 @@ def get_all_departments():
 
 # Show departments filtered by department name
 def get_employees_by_department(dept: str):
-    employees = list(employees_collection.find({"department": dept}, {"_id": 0}))
+    employees = list(employees_collection.find({"department": dept}, EMPLOYEE_PROJECTION))
     return employees
 
 # Aggregate salary data per department
@@ -61,13 +84,20 @@ def get_top_performers(threshold=4.5):
 # Insert a New Employee
 def add_employee(employee_data):
     employee_dict = employee_data.dict()
+    employee_dict[SEARCH_TOKENS_FIELD] = search_tokens(employee_dict)
     employees_collection.insert_one(employee_dict)
+    snapshots.apply_insert([employee_dict])
+    employees_changed()
     return str(employee_dict["employee_id"])
 
 # Update an Existing Employee
 def update_employee(employee_id, updates):
+    before = snapshots.load_before({"employee_id": employee_id})
     result = employees_collection.update_one(
         {"employee_id": employee_id},
-        {"$set": updates}
+        search_update(updates)
     )
+    if result.modified_count:
+        snapshots.apply_update(before[:1], updates)
+        employees_changed()
     return result.modified_count
@@ -0,0 +1,32 @@
+from .cache import analytics_cache
+from .database import get_database
+
+# A persistent version stamp for the employees collection, shared by every API and
+# worker process. Anything derived from employee data (cached analytics, generated
+# report files) can be tagged with it and reused while it hasn't moved.
+
+db = get_database()
+counters_collection = db["counters"]
+
+VERSION_ID = "employees_version"
+
+
+def employees_changed():
+    """Call after any write to `employees`"""
+    try:
+        counters_collection.update_one({"_id": VERSION_ID}, {"$inc": {"seq": 1}}, upsert=True)
+    except Exception as e:
+        # A missed bump leaves cached analytics and report reuse stale until the next write
+        print(f"Warning: Failed to advance employees data version: {e}")
+    analytics_cache.invalidate()
+
+
+def employees_version() -> int:
+    counter = counters_collection.find_one({"_id": VERSION_ID})
+    return counter["seq"] if counter else 0
+
+
+async def employees_version_async(db) -> int:
+    """employees_version for async routes, using their AsyncDatabase handle"""
+    counter = await db["counters"].find_one({"_id": VERSION_ID})
+    return counter["seq"] if counter else 0
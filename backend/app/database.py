@@ -1,5 +1,8 @@
-from pymongo import MongoClient
+from pymongo import MongoClient, AsyncMongoClient
+from pymongo import monitoring
+import asyncio
 import os
+import threading
 from dotenv import load_dotenv
 
 # Load environment variables from .env file
@@ -7,12 +10,212 @@ load_dotenv()
 
 # Read connection string
 MONGODB_URL = os.getenv("MONGODB_URL")
+DATABASE_NAME = "employee_analytics"
+# OperationFailure codes for an unknown accumulator or expression operator, by server version
+UNSUPPORTED_OPERATOR_CODES = {168, 15952, 40234}
 
-# Create a MongoDB client
-client = MongoClient(MONGODB_URL)
 
-# Import database
-db = client["employee_analytics"]
+class PoolMetrics(monitoring.ConnectionPoolListener):
+    """Connection pool counters: checkouts, failures, in-use connections and checkout wait time"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        with self._lock:
+            self.connections_created = 0
+            self.connections_closed = 0
+            self.checkouts = 0
+            self.checkout_failures = 0
+            self.checked_out = 0
+            self.total_wait_ms = 0.0
+            self.max_wait_ms = 0.0
+
+    def _record_wait(self, event):
+        # `duration` (seconds) is reported by PyMongo 4.7+
+        wait_ms = (getattr(event, "duration", 0) or 0) * 1000
+        self.total_wait_ms += wait_ms
+        self.max_wait_ms = max(self.max_wait_ms, wait_ms)
+
+    def pool_created(self, event): pass
+    def pool_ready(self, event): pass
+    def pool_cleared(self, event): pass
+    def pool_closed(self, event): pass
+    def connection_ready(self, event): pass
+    def connection_check_out_started(self, event): pass
+
+    def connection_created(self, event):
+        with self._lock:
+            self.connections_created += 1
+
+    def connection_closed(self, event):
+        with self._lock:
+            self.connections_closed += 1
+
+    def connection_checked_out(self, event):
+        with self._lock:
+            self.checkouts += 1
+            self.checked_out += 1
+            self._record_wait(event)
+
+    def connection_check_out_failed(self, event):
+        with self._lock:
+            self.checkout_failures += 1
+            self._record_wait(event)
+
+    def connection_checked_in(self, event):
+        with self._lock:
+            self.checked_out -= 1
+
+    def snapshot(self):
+        with self._lock:
+            return {
+                "connections_open": self.connections_created - self.connections_closed,
+                "connections_in_use": self.checked_out,
+                "checkouts": self.checkouts,
+                "checkout_failures": self.checkout_failures,
+                "avg_wait_ms": round(self.total_wait_ms / self.checkouts, 3) if self.checkouts else 0,
+                "max_wait_ms": round(self.max_wait_ms, 3)
+            }
+
+
+pool_metrics = PoolMetrics()
+
+
+def _max_pool_size():
+    """
+    MONGODB_MAX_POOL_SIZE wins; otherwise split MONGODB_MAX_TOTAL_CONNECTIONS across
+    WEB_CONCURRENCY uvicorn workers, each holding a sync and an async client.
+    """
+    if os.getenv("MONGODB_MAX_POOL_SIZE"):
+        return int(os.getenv("MONGODB_MAX_POOL_SIZE"))
+    if os.getenv("MONGODB_MAX_TOTAL_CONNECTIONS"):
+        workers = int(os.getenv("WEB_CONCURRENCY", 1))
+        return max(1, int(os.getenv("MONGODB_MAX_TOTAL_CONNECTIONS")) // (workers * 2))
+    return 100
+
+
+def client_options():
+    """Pool, compression and read preference settings shared by both clients"""
+    options = {
+        "maxPoolSize": _max_pool_size(),
+        "minPoolSize": int(os.getenv("MONGODB_MIN_POOL_SIZE", 0)),
+        "event_listeners": [pool_metrics]
+    }
+    if os.getenv("MONGODB_MAX_IDLE_TIME_MS"):
+        options["maxIdleTimeMS"] = int(os.getenv("MONGODB_MAX_IDLE_TIME_MS"))
+    if os.getenv("MONGODB_WAIT_QUEUE_TIMEOUT_MS"):
+        options["waitQueueTimeoutMS"] = int(os.getenv("MONGODB_WAIT_QUEUE_TIMEOUT_MS"))
+    if os.getenv("MONGODB_COMPRESSORS"):
+        # e.g. "zstd,snappy,zlib"; zstd needs `zstandard`, snappy needs `python-snappy`
+        options["compressors"] = os.getenv("MONGODB_COMPRESSORS")
+    if os.getenv("MONGODB_READ_PREFERENCE"):
+        options["readPreference"] = os.getenv("MONGODB_READ_PREFERENCE")
+    return options
+
+
+# Blocking client, created on first use and again after close_clients(). Modules keep
+# `db` and collection handles from import time, so those look the current client up
+# on every use instead of holding one.
+_client = None
+_client_lock = threading.Lock()
+
+
+def get_client() -> MongoClient:
+    global _client
+    client = _client
+    if client is None:
+        with _client_lock:
+            if _client is None:
+                # connect=False defers sockets until the lifespan startup or first use
+                _client = MongoClient(MONGODB_URL, connect=False, **client_options())
+            client = _client
+    return client
+
+
+class _Collection:
+    """A collection of DATABASE_NAME on whichever sync client is current"""
+
+    def __init__(self, name: str):
+        self.name = name
+
+    def __getattr__(self, attr):
+        return getattr(get_client()[DATABASE_NAME][self.name], attr)
+
+    def __getitem__(self, name: str) -> "_Collection":
+        return _Collection(f"{self.name}.{name}")
+
+
+class _Database:
+    """DATABASE_NAME on whichever sync client is current"""
+
+    def __getitem__(self, name: str) -> _Collection:
+        return _Collection(name)
+
+    def __getattr__(self, attr):
+        return getattr(get_client()[DATABASE_NAME], attr)
+
+
+db = _Database()
+
+# Async client for `async def` routes; created on first use so it binds to the running event loop
+async_client = None
 
 def get_database():
     return db
+
+def get_async_database():
+    """FastAPI dependency returning the non-blocking database handle"""
+    global async_client
+    if async_client is None:
+        async_client = AsyncMongoClient(MONGODB_URL, **client_options())
+    return async_client[DATABASE_NAME]
+
+
+async def open_clients():
+    """Lifespan startup: create the async client on the app's loop and warm up both pools"""
+    database = get_async_database()
+    try:
+        await asyncio.gather(
+            database.command("ping"),
+            asyncio.to_thread(db.command, "ping")
+        )
+        return True
+    except Exception as e:
+        # Keep serving; both clients reconnect on first use once MongoDB is reachable
+        print(f"Warning: MongoDB not reachable at startup: {e}")
+        return False
+
+
+async def close_clients():
+    """Lifespan shutdown: close both clients; a later lifespan creates new ones on first use"""
+    global _client, async_client
+    if async_client is not None:
+        await async_client.close()
+        async_client = None
+    with _client_lock:
+        client, _client = _client, None
+    if client is not None:
+        await asyncio.to_thread(client.close)
+
+
+def _pool_options(client):
+    options = client.options.pool_options
+    return {
+        "max_pool_size": options.max_pool_size,
+        "min_pool_size": options.min_pool_size,
+        "max_idle_time_seconds": options.max_idle_time_seconds,
+        "wait_queue_timeout": options.wait_queue_timeout,
+        "read_preference": client.read_preference.name
+    }
+
+
+def get_pool_stats():
+    """Both clients' pool settings; the checkout metrics are shared, as both report to pool_metrics"""
+    return {
+        **_pool_options(get_client()),
+        "async_client": _pool_options(async_client) if async_client is not None else None,
+        "compressors": client_options().get("compressors", ""),
+        **pool_metrics.snapshot()
+    }
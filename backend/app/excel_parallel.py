@@ -0,0 +1,207 @@
+import multiprocessing
+import os
+import re
+import shutil
+import tempfile
+import threading
+import zipfile
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import Dict, List
+from xml.sax.saxutils import escape
+import pandas as pd
+from dotenv import load_dotenv
+from openpyxl.cell import WriteOnlyCell
+from openpyxl.cell.cell import ILLEGAL_CHARACTERS_RE
+from openpyxl.compat import safe_string
+from openpyxl.utils import get_column_letter
+from openpyxl.utils.exceptions import IllegalCharacterError
+from .excel_writer import _records
+
+# Fast path for the long employee tables at the bottom of report sheets, which is where
+# most of a big report's save time goes. Their rows are written straight to <row> XML
+# fragments, without a cell object per value going through ws.append(), and spliced
+# into the saved package. Fragments are rendered in this process, or by a long-lived
+# pool of worker processes while this process renders every other sheet. Workers are
+# started with forkserver (spawn where that's missing), never forked from a process
+# running PyMongo's threads, and read their rows from temporary files. Tables holding
+# values the fast path doesn't write (dates, formulas) are appended as before.
+
+load_dotenv()
+
+REPORT_WORKERS = int(os.getenv("REPORT_WORKERS", 2))
+# Rendering processes per report worker process; together they should fit the cores
+REPORT_RENDER_WORKERS = int(os.getenv("REPORT_RENDER_WORKERS", max(1, (os.cpu_count() or 1) // REPORT_WORKERS)))
+# Tables shorter than this are appended row by row
+REPORT_PARALLEL_MIN_ROWS = int(os.getenv("REPORT_PARALLEL_MIN_ROWS", 20000))
+REPORT_PARALLEL_CHUNK_ROWS = int(os.getenv("REPORT_PARALLEL_CHUNK_ROWS", 25000))
+
+SHEET_DATA_CLOSE = b"</sheetData>"
+# Excel's limit on the length of a cell's text
+MAX_CELL_TEXT = 32767
+
+_executor = None
+_executor_lock = threading.Lock()
+
+
+def _get_executor() -> ProcessPoolExecutor:
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            methods = multiprocessing.get_all_start_methods()
+            method = "forkserver" if "forkserver" in methods else "spawn"
+            _executor = ProcessPoolExecutor(REPORT_RENDER_WORKERS, mp_context=multiprocessing.get_context(method))
+        return _executor
+
+
+def _reset_executor(broken: ProcessPoolExecutor):
+    global _executor
+    with _executor_lock:
+        if _executor is broken:
+            _executor = None
+    broken.shutdown(wait=False, cancel_futures=True)
+
+
+def _cell_xml(ref: str, style: str, value) -> str:
+    # The markup openpyxl writes for the same cell in a write-only sheet
+    if value is None:
+        return f'<c r="{ref}" s="{style}" t="n"/>'
+    if isinstance(value, bool):
+        return f'<c r="{ref}" s="{style}" t="b"><v>{int(value)}</v></c>'
+    if isinstance(value, (int, float)):
+        return f'<c r="{ref}" s="{style}" t="n"><v>{safe_string(value)}</v></c>'
+    if isinstance(value, str) and not value.startswith("="):
+        if not value:
+            return f'<c r="{ref}" s="{style}" t="inlineStr"/>'
+        value = value[:MAX_CELL_TEXT]
+        if ILLEGAL_CHARACTERS_RE.search(value):
+            raise IllegalCharacterError(f"{value} cannot be used in worksheets.")
+        space = ' xml:space="preserve"' if value != value.strip() else ""
+        return f'<c r="{ref}" s="{style}" t="inlineStr"><is><t{space}>{escape(value)}</t></is></c>'
+    raise TypeError(f"{type(value).__name__} values are written by openpyxl")
+
+
+def render_rows(df: pd.DataFrame, first_row: int, style_ids: List[int], path: str) -> str:
+    """Write the rows of `df` as <row> elements numbered from `first_row` to `path`"""
+    columns = [get_column_letter(column) for column in range(1, len(style_ids) + 1)]
+    styles = [str(style) for style in style_ids]
+    row = first_row
+    with open(path, "w", encoding="utf-8") as out:
+        for values in _records(df):
+            cells = "".join(
+                _cell_xml(f"{column}{row}", style, value) for column, style, value in zip(columns, styles, values)
+            )
+            out.write(f'<row r="{row}">{cells}</row>')
+            row += 1
+    return path
+
+
+def _render_chunk(frame_path: str, first_row: int, style_ids: List[int], path: str) -> str:
+    # Worker process: the rows come from the temporary file the parent wrote
+    return render_rows(pd.read_pickle(frame_path), first_row, style_ids, path)
+
+
+def _style_ids(ws, styles: List[str]) -> List[int]:
+    # Reading style_id registers the style, so the ids written match styles.xml
+    ids = []
+    for style in styles:
+        cell = WriteOnlyCell(ws)
+        cell.style = style
+        ids.append(cell.style_id)
+    return ids
+
+
+def _splice(skeleton: str, filepath: str, fragments: Dict[str, List[str]]):
+    """Copy the package at `skeleton` to `filepath`, appending fragments to their sheets' sheetData"""
+    with zipfile.ZipFile(skeleton) as source, \
+            zipfile.ZipFile(filepath, "w", zipfile.ZIP_DEFLATED, allowZip64=True) as target:
+        for info in source.infolist():
+            paths = fragments.get(info.filename)
+            if not paths:
+                with source.open(info) as src, target.open(info, "w") as dst:
+                    shutil.copyfileobj(src, dst)
+                continue
+            xml = source.read(info)
+            # A sheet whose rows all come from fragments may be saved with an empty <sheetData/>
+            xml = re.sub(rb"<sheetData\s*/>", b"<sheetData></sheetData>", xml, count=1)
+            end = xml.rindex(SHEET_DATA_CLOSE)
+            entry = zipfile.ZipInfo(info.filename, info.date_time)
+            entry.compress_type = zipfile.ZIP_DEFLATED
+            with target.open(entry, "w", force_zip64=True) as dst:
+                dst.write(xml[:end])
+                for path in paths:
+                    with open(path, "rb") as fragment:
+                        shutil.copyfileobj(fragment, dst)
+                dst.write(xml[end:])
+
+
+def save_parallel(book, filepath: str) -> bool:
+    """Save `book` with its long tables written as XML fragments; False if none qualify"""
+    deferred = [(sheet, rows) for sheet in book._sheets if (rows := sheet.defer_rows(REPORT_PARALLEL_MIN_ROWS))]
+    if not deferred:
+        return False
+
+    workdir = tempfile.mkdtemp(prefix="report_render_")
+    chunks = [
+        (table, start, rows.first_row + start, os.path.join(workdir, f"{table}_{start}.xml"))
+        for table, (_, rows) in enumerate(deferred)
+        for start in range(0, len(rows.df), REPORT_PARALLEL_CHUNK_ROWS)
+    ]
+    style_ids = [_style_ids(sheet.ws, rows.styles) for sheet, rows in deferred]
+    executor = None
+    futures = {}
+    failed = set()
+    try:
+        if REPORT_RENDER_WORKERS > 1 and len(chunks) > 1:
+            try:
+                executor = _get_executor()
+                for table, start, first_row, path in chunks:
+                    frame_path = os.path.join(workdir, f"{table}_{start}.pkl")
+                    deferred[table][1].df.iloc[start:start + REPORT_PARALLEL_CHUNK_ROWS].to_pickle(frame_path)
+                    futures[path] = executor.submit(_render_chunk, frame_path, first_row, style_ids[table], path)
+            except Exception as e:
+                print(f"Warning: Report rendering pool unavailable, rendering here: {e}")
+                if isinstance(e, BrokenProcessPool):
+                    _reset_executor(executor)
+                for future in futures.values():
+                    future.cancel()
+                futures = {}
+
+        # The rest of the workbook renders here while any workers run
+        for sheet in book._sheets:
+            sheet.render()
+
+        fragments: Dict[int, List[str]] = {}
+        for table, start, first_row, path in chunks:
+            if table in failed:
+                continue
+            try:
+                if path in futures:
+                    futures[path].result()
+                else:
+                    render_rows(deferred[table][1].df.iloc[start:start + REPORT_PARALLEL_CHUNK_ROWS],
+                                first_row, style_ids[table], path)
+                fragments.setdefault(table, []).append(path)
+            except Exception as e:
+                if isinstance(e, BrokenProcessPool):
+                    _reset_executor(executor)
+                if not isinstance(e, TypeError):
+                    print(f"Warning: Rendering rows of '{deferred[table][0].ws.title}' failed, "
+                          f"appending them instead: {e}")
+                failed.add(table)
+        # Rows must stay in order, so a table with any failed range is appended whole
+        for table in failed:
+            deferred[table][0].write_deferred()
+
+        skeleton = os.path.join(workdir, "skeleton.xlsx")
+        book.workbook.save(skeleton)
+        _splice(skeleton, filepath, {
+            # Sheet paths are assigned by save()
+            deferred[table][0].ws.path[1:]: paths
+            for table, paths in fragments.items() if table not in failed
+        })
+        return True
+    finally:
+        for future in futures.values():
+            future.cancel()
+        shutil.rmtree(workdir, ignore_errors=True)
@@ -0,0 +1,215 @@
+from datetime import datetime
+from typing import Any, Callable, Dict, Iterable, Iterator, List, NamedTuple, Optional, Tuple, Union
+import pandas as pd
+from openpyxl import Workbook
+from openpyxl.cell import WriteOnlyCell
+from openpyxl.utils import get_column_letter
+from .report_styles import (
+    MIN_COLUMN_WIDTH, Highlight, add_table_rules, column_lengths, column_styles, column_width, register_styles
+)
+
+# Write-only rendering for the report builders in excel_generator.py. Rows go straight
+# to the sheet's temporary file as they are appended, so memory stays flat as the row
+# count grows, and every cell shares one of a few named styles instead of carrying its
+# own Font/Fill/Border objects (see report_styles.py). openpyxl's write-only sheets must
+# be written top to bottom, so a SheetWriter records blocks (header, tables, text,
+# charts) against row numbers and renders them in one pass when the workbook is saved.
+# Long tables at the bottom of a sheet may be written by excel_parallel instead.
+
+# Rows converted from a DataFrame at a time
+RENDER_CHUNK_SIZE = 5000
+
+Table = Union[pd.DataFrame, Iterable[pd.DataFrame]]
+
+
+class DeferredRows(NamedTuple):
+    """Data rows of a sheet's last table, left for excel_parallel to write"""
+    df: pd.DataFrame
+    styles: List[str]
+    first_row: int
+
+
+class StreamingWorkbook:
+    """A write-only workbook whose sheets are laid out with SheetWriter"""
+
+    def __init__(self):
+        self.workbook = Workbook(write_only=True)
+        register_styles(self.workbook)
+        self._sheets: List["SheetWriter"] = []
+
+    def sheet(self, title: str) -> "SheetWriter":
+        sheet = SheetWriter(self, title)
+        self._sheets.append(sheet)
+        return sheet
+
+    def save(self, filepath: str) -> str:
+        # Imported here as excel_parallel builds on this module
+        from .excel_parallel import save_parallel
+        if save_parallel(self, filepath):
+            return filepath
+        for sheet in self._sheets:
+            sheet.render()
+        self.workbook.save(filepath)
+        return filepath
+
+
+class SheetWriter:
+    """Top-to-bottom layout of one write-only worksheet; blocks must be added in row order"""
+
+    def __init__(self, book: StreamingWorkbook, title: str):
+        self.book = book
+        self.ws = book.workbook.create_sheet(title)
+        self.next_row = 1
+        self._blocks: List[Tuple[int, Callable[[], Iterator[list]]]] = []
+        self._charts: List[Tuple[Any, str]] = []
+        self._widths: Dict[int, int] = {}
+        self._open_ended = False
+        # The last block when it is a DataFrame table, and whether its rows are deferred
+        self._tail: Optional[DeferredRows] = None
+        self._deferred: Optional[DeferredRows] = None
+
+    def _place(self, row: Optional[int], height: Optional[int]) -> int:
+        self._tail = None
+        if self._open_ended:
+            raise ValueError("Nothing can be placed below a table of unknown length")
+        row = row or self.next_row
+        if row < self.next_row:
+            raise ValueError(f"Row {row} of '{self.ws.title}' is already taken")
+        if height is None:
+            self._open_ended = True
+        else:
+            self.next_row = row + height
+        return row
+
+    def _cell(self, value, style: str) -> WriteOnlyCell:
+        cell = WriteOnlyCell(self.ws, value)
+        cell.style = style
+        return cell
+
+    def _fit(self, column: int, length: int):
+        self._widths[column] = max(self._widths.get(column, MIN_COLUMN_WIDTH), length)
+
+    def header(self, title: str, description: str):
+        """Title and description merged across A:E, then the generation timestamp"""
+        row = self._place(1, 3)
+        self.ws.merged_cells.add(f"A{row}:E{row}")
+        self.ws.merged_cells.add(f"A{row + 1}:E{row + 1}")
+        generated = f"Generated on: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}"
+        self._blocks.append((row, lambda: iter([
+            [self._cell(title, "report_title")],
+            [self._cell(description, "report_description")],
+            [self._cell(generated, "report_timestamp")],
+        ])))
+
+    def text(self, value: str, row: Optional[int] = None, style: Optional[str] = None, column: int = 1):
+        row = self._place(row, 1)
+        cells = [None] * (column - 1) + [self._cell(value, style) if style else value]
+        self._blocks.append((row, lambda: iter([cells])))
+        return row
+
+    def section(self, title: str, row: Optional[int] = None, column: int = 1) -> int:
+        return self.text(title, row, "section_title", column)
+
+    def metrics(self, metrics: Dict[str, Any], row: Optional[int] = None) -> int:
+        """Label/value pairs in columns A and B"""
+        row = self._place(row, len(metrics))
+        for label, value in metrics.items():
+            self._fit(1, len(str(label)))
+            self._fit(2, len(str(value)))
+        self._blocks.append((row, lambda: (
+            [self._cell(label, "metric_label"), self._cell(value, "metric_value")]
+            for label, value in metrics.items()
+        )))
+        return row
+
+    def table(self, data: Table, row: Optional[int] = None, number_formats: Optional[Dict[str, str]] = None,
+              band: bool = True, highlight: Optional[Highlight] = None) -> Tuple[int, Optional[int]]:
+        """Header plus data rows from a DataFrame or an iterable of DataFrame batches.
+
+        Returns (header_row, last_row); last_row is None for batches, whose length isn't
+        known until they are written, and nothing can be placed below them.
+        """
+        if isinstance(data, pd.DataFrame):
+            batches, first, height = [data], data, len(data) + 1
+        else:
+            batches = iter(data)
+            first = next(batches, None)
+            if first is None:
+                return self._place(row, 1), None
+            batches, height = _chain(first, batches), None
+        header_row = self._place(row, height)
+
+        columns = [str(column) for column in first.columns]
+        styles = column_styles(self.ws.parent, columns, number_formats)
+        # Widths come from the first batch only when the rest is still streaming in
+        for index, length in enumerate(column_lengths(first), 1):
+            self._fit(index, length)
+        tail = DeferredRows(data, styles, header_row + 1) if height is not None else None
+
+        def rows():
+            yield [self._cell(column, "table_header") for column in columns]
+            if tail is not None and self._deferred is tail:
+                count = len(tail.df)
+            else:
+                count = 0
+                for cells in self._data_rows(styles, batches):
+                    yield cells
+                    count += 1
+            add_table_rules(self.ws, columns, header_row + 1, header_row + count, band, highlight)
+
+        self._blocks.append((header_row, rows))
+        self._tail = tail
+        return header_row, None if height is None else header_row + height - 1
+
+    def _data_rows(self, styles: List[str], batches: Iterable[pd.DataFrame]) -> Iterator[list]:
+        # One styled cell per column, refilled for every row: append() serialises a row
+        # before returning, so cells needn't outlive it
+        cells = [self._cell(None, style) for style in styles]
+        for batch in batches:
+            for values in _records(batch):
+                for cell, value in zip(cells, values):
+                    cell.value = value
+                yield cells
+
+    def defer_rows(self, min_rows: int) -> Optional[DeferredRows]:
+        """Leave the last table's data rows out of render() if there are at least `min_rows`"""
+        if self._tail is not None and len(self._tail.df) >= min_rows:
+            self._deferred = self._tail
+        return self._deferred
+
+    def write_deferred(self):
+        """Append the deferred rows after all; the sheet must be rendered and not yet saved"""
+        for cells in self._data_rows(self._deferred.styles, [self._deferred.df]):
+            self.ws.append(cells)
+        self._deferred = None
+
+    def chart(self, chart, anchor: str):
+        """Charts are attached after the data they reference has been written"""
+        self._charts.append((chart, anchor))
+
+    def render(self):
+        for column, width in self._widths.items():
+            self.ws.column_dimensions[get_column_letter(column)].width = column_width(width)
+        current = 1
+        for first_row, rows in self._blocks:
+            while current < first_row:
+                self.ws.append([])
+                current += 1
+            for row in rows():
+                self.ws.append(row)
+                current += 1
+        for chart, anchor in self._charts:
+            self.ws.add_chart(chart, anchor)
+        self._blocks, self._charts = [], []
+
+
+def _chain(first: pd.DataFrame, rest: Iterator[pd.DataFrame]) -> Iterator[pd.DataFrame]:
+    yield first
+    yield from rest
+
+
+def _records(df: pd.DataFrame) -> Iterator[tuple]:
+    """Rows as plain Python values with NaN/NaT as empty cells, a chunk at a time"""
+    for start in range(0, len(df), RENDER_CHUNK_SIZE):
+        chunk = df.iloc[start:start + RENDER_CHUNK_SIZE].astype(object)
+        yield from chunk.where(chunk.notna(), None).itertuples(index=False, name=None)
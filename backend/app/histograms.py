@@ -0,0 +1,148 @@
+import math
+from typing import Any, Dict, List, Optional, Sequence, Union
+from pymongo import ASCENDING
+from pymongo.errors import OperationFailure
+from .database import UNSUPPORTED_OPERATOR_CODES
+
+OTHER_BUCKET = "other"
+
+# $percentile needs MongoDB 7.0+; flipped to False the first time the server rejects it,
+# after which quantiles are read by sorted position
+_percentile_supported = True
+
+
+def _boundaries(ranges: List[Dict[str, Any]]) -> List[float]:
+    """Turn contiguous [{"range", "min", "max"}] definitions into $bucket boundaries"""
+    boundaries = [r["min"] for r in ranges] + [ranges[-1]["max"]]
+    if any(lo >= hi for lo, hi in zip(boundaries, boundaries[1:])):
+        raise ValueError("Histogram ranges must be contiguous and ascending")
+    return boundaries
+
+
+def _stats_group(field: str, quantiles: Sequence[float]) -> Dict[str, Any]:
+    group = {
+        "_id": None,
+        "count": {"$sum": 1},
+        "min": {"$min": f"${field}"},
+        "max": {"$max": f"${field}"},
+        "avg": {"$avg": f"${field}"}
+    }
+    if quantiles:
+        group["quantiles"] = {"$percentile": {"input": f"${field}", "p": list(quantiles), "method": "approximate"}}
+    return {"$group": group}
+
+
+def build_histogram_pipeline(
+    field: str,
+    ranges: Union[List[Dict[str, Any]], int],
+    match: Optional[Dict[str, Any]] = None,
+    quantiles: Sequence[float] = ()
+):
+    """$facet pipeline returning the bucket counts, summary statistics and `quantiles` for one numeric field"""
+    if isinstance(ranges, int):
+        # Let the server pick evenly populated boundaries
+        buckets_stage = {"$bucketAuto": {"groupBy": f"${field}", "buckets": ranges}}
+    else:
+        buckets_stage = {"$bucket": {
+            "groupBy": f"${field}",
+            "boundaries": _boundaries(ranges),
+            "default": OTHER_BUCKET,
+            "output": {"count": {"$sum": 1}}
+        }}
+
+    return [
+        {"$match": _numeric(field, match)},
+        {"$facet": {
+            "buckets": [buckets_stage],
+            "stats": [_stats_group(field, quantiles)]
+        }}
+    ]
+
+
+def _numeric(field: str, match: Optional[Dict[str, Any]]) -> Dict[str, Any]:
+    return {**(match or {}), field: {"$type": "number"}}
+
+
+def quantile_positions(count: int, quantiles: Sequence[float]) -> List[int]:
+    """Sorted positions of the exact quantiles, using the 'higher' method"""
+    # round() keeps 0.9 * 10 == 9.000000000000002 from moving up a position;
+    # for the median this is sorted(values)[n // 2]
+    return [min(count - 1, math.ceil(round(q * (count - 1), 9))) for q in quantiles]
+
+
+def _exact_quantiles(collection, field: str, match: Optional[Dict[str, Any]], quantiles: Sequence[float], count: int):
+    """
+    Read each quantile's observation at its sorted position, for servers without
+    $percentile. Each read skips `position` index entries, and a filtered read sorts
+    in memory, so this is one pass over the matches per quantile.
+    """
+    values = []
+    for position in quantile_positions(count, quantiles):
+        cursor = collection.find(_numeric(field, match), {field: 1, "_id": 0}) \
+            .sort(field, ASCENDING).skip(position).limit(1)
+        doc = next(iter(cursor), None)
+        values.append(doc[field] if doc else None)
+    return values
+
+
+def compute_histogram(
+    collection,
+    field: str,
+    ranges: Union[List[Dict[str, Any]], int],
+    match: Optional[Dict[str, Any]] = None,
+    quantiles: Sequence[float] = (0.5,)
+) -> Dict[str, Any]:
+    """
+    Compute bucket counts, min/max/avg and approximate quantiles ($percentile) for
+    `field` in one aggregation; servers without $percentile get exact quantiles read
+    by sorted position instead.
+
+    `ranges` is either a list of contiguous {"range", "min", "max"} definitions
+    (served by $bucket) or a bucket count (served by $bucketAuto).
+    """
+    global _percentile_supported
+
+    result = None
+    if quantiles and _percentile_supported:
+        try:
+            result = list(collection.aggregate(build_histogram_pipeline(field, ranges, match, quantiles)))
+        except OperationFailure as e:
+            if e.code not in UNSUPPORTED_OPERATOR_CODES:
+                raise
+            _percentile_supported = False
+    if result is None:
+        result = list(collection.aggregate(build_histogram_pipeline(field, ranges, match)))
+
+    facets = result[0] if result else {"buckets": [], "stats": []}
+
+    # Map bucket lower bounds back to labels, keeping empty buckets
+    if isinstance(ranges, int):
+        buckets = [
+            {"range": f"{b['_id']['min']}-{b['_id']['max']}", "min": b["_id"]["min"], "max": b["_id"]["max"], "count": b["count"]}
+            for b in facets["buckets"]
+        ]
+    else:
+        counts = {b["_id"]: b["count"] for b in facets["buckets"]}
+        buckets = [{"range": r["range"], "count": counts.get(r["min"], 0)} for r in ranges]
+
+    stats = facets["stats"][0] if facets["stats"] else None
+    if stats is None:
+        return {"buckets": buckets, "stats": None}
+
+    if not quantiles:
+        values = []
+    elif "quantiles" in stats:
+        values = stats["quantiles"]
+    else:
+        values = _exact_quantiles(collection, field, match, quantiles, stats["count"])
+
+    return {
+        "buckets": buckets,
+        "stats": {
+            "count": stats["count"],
+            "min": stats["min"],
+            "max": stats["max"],
+            "avg": stats["avg"],
+            "quantiles": dict(zip(quantiles, values))
+        }
+    }
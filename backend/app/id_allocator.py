@@ -0,0 +1,90 @@
+import os
+import threading
+from typing import List
+from dotenv import load_dotenv
+from pymongo import ReturnDocument
+from .database import get_database
+
+# Sequential IDs from the `counters` collection: one document per sequence,
+# {"_id": <name>, "seq": <last allocated number>}, advanced with an atomic $inc.
+
+load_dotenv()
+
+# IDs reserved per round trip; >1 trades gaps after a restart for fewer counter writes
+EMPLOYEE_ID_BLOCK_SIZE = int(os.getenv("EMPLOYEE_ID_BLOCK_SIZE", 1))
+
+db = get_database()
+counters_collection = db["counters"]
+employees_collection = db["employees"]
+
+
+class IdAllocator:
+    """Hands out `prefix` + zero-padded sequence numbers, reserving `block_size` at a time per worker"""
+
+    def __init__(self, name: str, prefix: str, width: int = 3, block_size: int = 1):
+        self.name = name
+        self.prefix = prefix
+        self.width = width
+        self.block_size = max(1, block_size)
+        self._next = 0
+        self._end = 0
+        self._seeded = False
+        self._lock = threading.Lock()
+
+    def format(self, number: int) -> str:
+        return f"{self.prefix}{number:0{self.width}d}"
+
+    def _highest_existing(self) -> int:
+        # One-off scan when the counter is first created; afterwards the counter is authoritative
+        pipeline = [
+            {"$match": {"employee_id": {"$regex": f"^{self.prefix}\\d+$"}}},
+            {"$group": {"_id": None, "max": {"$max": {
+                "$convert": {"input": {"$substrCP": ["$employee_id", len(self.prefix), 32]},
+                             "to": "long", "onError": 0}
+            }}}}
+        ]
+        result = list(employees_collection.aggregate(pipeline))
+        return result[0]["max"] if result and result[0]["max"] is not None else 0
+
+    def _seed(self):
+        if self._seeded:
+            return
+        if counters_collection.find_one({"_id": self.name}, {"_id": 1}) is None:
+            # $max makes concurrent seeding from several workers converge on the same value
+            counters_collection.update_one(
+                {"_id": self.name},
+                {"$max": {"seq": self._highest_existing()}},
+                upsert=True
+            )
+        self._seeded = True
+
+    def _reserve(self, count: int) -> int:
+        """Atomically reserve `count` numbers; returns the first one"""
+        self._seed()
+        counter = counters_collection.find_one_and_update(
+            {"_id": self.name},
+            {"$inc": {"seq": count}},
+            upsert=True,
+            return_document=ReturnDocument.AFTER
+        )
+        return counter["seq"] - count + 1
+
+    def next_id(self) -> str:
+        with self._lock:
+            if self._next >= self._end:
+                self._next = self._reserve(self.block_size)
+                self._end = self._next + self.block_size
+            number = self._next
+            self._next += 1
+        return self.format(number)
+
+    def allocate(self, count: int) -> List[str]:
+        """`count` consecutive IDs in a single counter update, for bulk onboarding"""
+        if count <= 0:
+            return []
+        with self._lock:
+            first = self._reserve(count)
+        return [self.format(number) for number in range(first, first + count)]
+
+
+employee_ids = IdAllocator("employee_id", "EMP", block_size=EMPLOYEE_ID_BLOCK_SIZE)
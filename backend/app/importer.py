@@ -0,0 +1,521 @@
+import ast
+import csv
+import io
+import os
+import re
+import shutil
+import threading
+import time
+import uuid
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date, datetime, timedelta
+from pathlib import Path
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+from dotenv import load_dotenv
+from openpyxl import load_workbook
+from pydantic import ValidationError
+from pymongo import ReturnDocument, UpdateOne
+from pymongo.errors import BulkWriteError
+from . import snapshots
+from .data_version import employees_changed
+from .database import get_database
+from .models import NewEmployee
+from .search import search_update, with_search_tokens
+
+# Chunked bulk-import pipeline: uploads are spooled to disk, parsed in fixed-size
+# batches, validated row by row and written with unordered bulk_write upserts
+# from a small thread pool while the next batches are parsed. Progress and a
+# resume checkpoint are committed to `import_jobs` after every batch. Each row claims
+# its employee_id in `import_rows` before it is written, so the unique _id index finds
+# IDs repeated anywhere in a file, whichever batches or runs they land in.
+
+load_dotenv()
+
+IMPORT_BATCH_SIZE = int(os.getenv("IMPORT_BATCH_SIZE", 1000))
+IMPORT_WORKERS = int(os.getenv("IMPORT_WORKERS", 4))
+# 0 disables throttling; a per-job value can be passed when the import is queued
+IMPORT_MAX_ROWS_PER_SECOND = int(os.getenv("IMPORT_MAX_ROWS_PER_SECOND", 0))
+# Lease a running import holds on its job; renewed every third of it by a heartbeat
+# thread, however long a batch takes. A job whose lease ran out may be resumed.
+IMPORT_STALE_SECONDS = int(os.getenv("IMPORT_STALE_SECONDS", 300))
+# Per-row errors kept on the job document; the failed counter keeps counting past this
+MAX_STORED_ERRORS = 1000
+UPLOAD_CHUNK_SIZE = 1024 * 1024
+
+IMPORT_DIRECTORY = Path("uploads/imports")
+IMPORT_DIRECTORY.mkdir(parents=True, exist_ok=True)
+
+FORMATS = {".csv": "csv", ".xlsx": "xlsx"}
+
+db = get_database()
+employees_collection = db["employees"]
+jobs_collection = db["import_jobs"]
+claims_collection = db["import_rows"]
+
+DUPLICATE_KEY = 11000
+
+
+def detect_format(filename: Optional[str]) -> Optional[str]:
+    return FORMATS.get(Path(filename or "").suffix.lower())
+
+
+# ---------------------------------------------------------------- parsing
+
+def _read_csv_records(f) -> Iterator[bytes]:
+    """Raw bytes per CSV record; quoted fields may span lines"""
+    pending = b""
+    for line in f:
+        pending += line
+        # An odd number of quotes means a quoted field continues on the next line
+        if pending.count(b'"') % 2:
+            continue
+        yield pending
+        pending = b""
+
+
+def iter_csv_records(path: Path, start_offset: int = 0, start_row: int = 0) -> Iterator[Tuple[int, int, Dict[str, Any]]]:
+    """
+    (spreadsheet row number, byte offset after the row, raw row) triples. A record whose
+    quoted fields span lines is one row, numbered as a spreadsheet would show it.
+    Resuming from a checkpoint re-reads the header, then seeks straight to `start_offset`.
+    """
+    with open(path, "rb") as f:
+        header = None
+        row_number = 0
+        offset = 0
+        for data in _read_csv_records(f):
+            row_number += 1
+            offset += len(data)
+            text = data.decode("utf-8-sig")
+            if text.strip():
+                header = [name.strip() for name in next(csv.reader(io.StringIO(text)))]
+                break
+        if header is None:
+            return
+        if start_offset:
+            f.seek(start_offset)
+            offset = start_offset
+            row_number = start_row
+
+        for data in _read_csv_records(f):
+            row_number += 1
+            offset += len(data)
+            text = data.decode("utf-8")
+            if not text.strip():
+                continue
+            yield row_number, offset, dict(zip(header, next(csv.reader(io.StringIO(text)))))
+
+
+def iter_xlsx_records(path: Path, start_offset: int = 0, start_row: int = 0) -> Iterator[Tuple[int, Optional[int], Dict[str, Any]]]:
+    """
+    Rows of the first worksheet, read in openpyxl's streaming read-only mode. A zipped
+    sheet has no usable byte offsets, so resuming skips rows up to `start_row` unparsed.
+    """
+    workbook = load_workbook(path, read_only=True, data_only=True)
+    try:
+        rows = workbook.active.iter_rows(values_only=True)
+        header = None
+        for row_number, values in enumerate(rows, start=1):
+            if header is None:
+                header = [str(name).strip() if name is not None else "" for name in values]
+                continue
+            if row_number <= start_row or all(value is None for value in values):
+                continue
+            yield row_number, None, dict(zip(header, values))
+    finally:
+        workbook.close()
+
+
+def iter_batches(records: Iterator[Tuple], batch_size: int):
+    batch = []
+    for record in records:
+        batch.append(record)
+        if len(batch) >= batch_size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+# ------------------------------------------------------------- validation
+
+def parse_skills(value: Any) -> Any:
+    """Accept lists, "['a', 'b']" (pandas CSV export) and "a, b" (Excel export)"""
+    if not isinstance(value, str):
+        return value
+    value = value.strip()
+    if value.startswith("["):
+        try:
+            return [str(skill) for skill in ast.literal_eval(value)]
+        except (ValueError, SyntaxError):
+            value = value.strip("[]")
+    return [skill.strip().strip("'\"") for skill in value.split(",") if skill.strip()]
+
+
+def clean_record(raw: Dict[str, Any]) -> Dict[str, Any]:
+    record = {}
+    for key, value in raw.items():
+        if not key:
+            continue
+        if isinstance(value, str):
+            value = value.strip()
+            if value == "":
+                value = None
+        if isinstance(value, (datetime, date)):
+            value = value.strftime("%Y-%m-%d")
+        if value is not None:
+            record[key] = value
+    if isinstance(record.get("employee_id"), (int, float)) and not isinstance(record["employee_id"], bool):
+        # Spreadsheet tools turn numeric IDs into numbers
+        value = record["employee_id"]
+        record["employee_id"] = str(int(value)) if float(value).is_integer() else str(value)
+    if "skills" in record:
+        record["skills"] = parse_skills(record["skills"])
+    return record
+
+
+def validate_record(raw: Dict[str, Any]) -> Tuple[Optional[Dict[str, Any]], Optional[str]]:
+    """(employee document, None) or (None, error message) for one imported row"""
+    try:
+        return NewEmployee(**clean_record(raw)).dict(), None
+    except ValidationError as e:
+        return None, "; ".join(
+            f"{'.'.join(str(part) for part in error['loc'])}: {error['msg']}" for error in e.errors()
+        )
+
+
+# ---------------------------------------------------------------- writing
+
+def _claim_id(job_id: str, employee_id: str) -> str:
+    # String ids so a finished job's claims are one anchored _id range
+    return f"{job_id}:{employee_id}"
+
+
+def claim_rows(job_id: str, rows: List[Tuple[int, Dict[str, Any]]]):
+    """
+    Claim each row's employee_id for this job; (rows to write, duplicate errors, replayed
+    employee_ids a previous run inserted). A claim already held by the same row is a
+    replay of a batch written before a resume, so that row is written again.
+    """
+    if not rows:
+        return rows, [], set()
+    claims = [{"_id": _claim_id(job_id, doc["employee_id"]), "row": row_number} for row_number, doc in rows]
+    try:
+        claims_collection.insert_many(claims, ordered=False)
+        return rows, [], set()
+    except BulkWriteError as e:
+        write_errors = e.details.get("writeErrors", [])
+        if any(error.get("code") != DUPLICATE_KEY for error in write_errors):
+            raise
+        taken = {error["index"] for error in write_errors}
+
+    owners = {
+        claim["_id"]: claim
+        for claim in claims_collection.find({"_id": {"$in": [claims[index]["_id"] for index in taken]}})
+    }
+    claimed, errors, replayed_inserts = [], [], set()
+    for index, (row_number, doc) in enumerate(rows):
+        owner = owners.get(claims[index]["_id"], {}) if index in taken else claims[index]
+        if owner.get("row") != row_number:
+            errors.append({"row": row_number, "employee_id": doc["employee_id"],
+                           "error": f"Duplicate employee_id; already imported from row {owner.get('row')}"})
+            continue
+        claimed.append((row_number, doc))
+        if owner.get("inserted"):
+            replayed_inserts.add(doc["employee_id"])
+    return claimed, errors, replayed_inserts
+
+
+def release_claims(job_id: str):
+    claims_collection.delete_many({"_id": {"$regex": f"^{re.escape(job_id)}:"}})
+
+
+def write_batch(rows: List[Tuple[int, Dict[str, Any]]], on_conflict: str = "skip", job_id: Optional[str] = None) -> Dict[str, Any]:
+    """
+    Upsert validated (row number, document) pairs keyed on employee_id.
+    on_conflict="skip" leaves existing employees untouched, "update" overwrites them.
+    With a job_id, rows repeating an employee_id the job already imported are rejected,
+    and replayed rows a previous run inserted count as inserted again.
+    """
+    result = {"inserted": 0, "updated": 0, "skipped": 0, "errors": []}
+    replayed_inserts = set()
+    if job_id is not None:
+        rows, result["errors"], replayed_inserts = claim_rows(job_id, rows)
+    if not rows:
+        return result
+
+    ids = [doc["employee_id"] for _, doc in rows]
+    before = snapshots.load_before({"employee_id": {"$in": ids}}) if on_conflict == "update" else []
+
+    if on_conflict == "update":
+        operations = [UpdateOne({"employee_id": doc["employee_id"]}, search_update(doc), upsert=True) for _, doc in rows]
+    else:
+        operations = [UpdateOne({"employee_id": doc["employee_id"]}, {"$setOnInsert": with_search_tokens(doc)}, upsert=True)
+                      for _, doc in rows]
+
+    try:
+        outcome = employees_collection.bulk_write(operations, ordered=False)
+        upserted = set(outcome.upserted_ids)
+        failed = {}
+    except BulkWriteError as e:
+        upserted = {entry["index"] for entry in e.details.get("upserted", [])}
+        failed = {error["index"]: error.get("errmsg", "Write failed") for error in e.details.get("writeErrors", [])}
+    if job_id is not None:
+        if failed:
+            # A row that was never written doesn't own its employee_id
+            claims_collection.delete_many({"_id": {"$in": [_claim_id(job_id, rows[index][1]["employee_id"]) for index in failed]}})
+        if upserted:
+            claims_collection.update_many(
+                {"_id": {"$in": [_claim_id(job_id, rows[index][1]["employee_id"]) for index in upserted]}},
+                {"$set": {"inserted": True}}
+            )
+
+    inserted_docs, updated_docs = [], []
+    for index, (row_number, doc) in enumerate(rows):
+        if index in failed:
+            result["errors"].append({"row": row_number, "employee_id": doc["employee_id"], "error": failed[index]})
+        elif index in upserted:
+            inserted_docs.append(doc)
+        elif doc["employee_id"] in replayed_inserts:
+            # The earlier run already applied this row's snapshot change
+            result["inserted"] += 1
+        elif on_conflict == "update":
+            updated_docs.append(doc)
+        else:
+            result["skipped"] += 1
+    result["inserted"] += len(inserted_docs)
+    result["updated"] = len(updated_docs)
+
+    if inserted_docs or updated_docs:
+        updated_ids = {doc["employee_id"] for doc in updated_docs}
+        snapshots.apply_delete([doc for doc in before if doc.get("employee_id") in updated_ids])
+        snapshots.apply_insert(inserted_docs + updated_docs)
+        employees_changed()
+    return result
+
+
+def prepare_batch(batch: List[Tuple[int, Optional[int], Dict[str, Any]]]):
+    """Validate a parsed batch; duplicate employee_ids are caught when write_batch claims them"""
+    valid, errors = [], []
+    for row_number, _, raw in batch:
+        doc, error = validate_record(raw)
+        if doc is None:
+            errors.append({"row": row_number, "employee_id": raw.get("employee_id"), "error": error})
+            continue
+        valid.append((row_number, doc))
+    return valid, errors
+
+
+# ------------------------------------------------------------------- jobs
+
+def create_job(upload, on_conflict: str = "skip", max_rows_per_second: int = IMPORT_MAX_ROWS_PER_SECOND) -> Dict[str, Any]:
+    """Spool an UploadFile to disk without reading it into memory and record a queued job"""
+    job_id = str(uuid.uuid4())
+    file_format = detect_format(upload.filename)
+    path = IMPORT_DIRECTORY / f"{job_id}.{file_format}"
+    with open(path, "wb") as f:
+        shutil.copyfileobj(upload.file, f, UPLOAD_CHUNK_SIZE)
+
+    now = datetime.utcnow().isoformat()
+    job = {
+        "_id": job_id,
+        "filename": upload.filename,
+        "file_path": str(path),
+        "format": file_format,
+        "on_conflict": on_conflict,
+        "max_rows_per_second": max_rows_per_second,
+        "status": "Queued",
+        "rows_processed": 0,
+        "inserted": 0,
+        "updated": 0,
+        "skipped": 0,
+        "failed": 0,
+        "errors": [],
+        # Position after the last batch whose writes are committed; resume starts here
+        "checkpoint": {"offset": 0, "row_number": 0, "last_employee_id": None},
+        "cancel_requested": False,
+        "attempts": 0,
+        "message": None,
+        "created_at": now,
+        "updated_at": now
+    }
+    jobs_collection.insert_one(job)
+    return job
+
+
+def get_job(job_id: str) -> Optional[Dict[str, Any]]:
+    return jobs_collection.find_one({"_id": job_id})
+
+
+def list_jobs(limit: int = 50) -> List[Dict[str, Any]]:
+    return list(jobs_collection.find({}, {"errors": 0}).sort("created_at", -1).limit(limit))
+
+
+class ImportLeaseLost(Exception):
+    """The job was resumed elsewhere after this run's lease ran out"""
+
+
+def _lease_expiry() -> str:
+    return (datetime.utcnow() + timedelta(seconds=IMPORT_STALE_SECONDS)).isoformat()
+
+
+def request_resume(job_id: str) -> Optional[Dict[str, Any]]:
+    """
+    Re-queue a failed or cancelled job, one whose run's lease expired (process crash or
+    restart), or a stale one without a lease (queued but never started, or running from
+    before leases). Atomic, so a job can't be resumed twice; the expired run loses its
+    lease and stops at its next checkpoint.
+    """
+    now = datetime.utcnow()
+    return jobs_collection.find_one_and_update(
+        {"_id": job_id, "$or": [
+            {"status": {"$in": ["Failed", "Cancelled"]}},
+            {"status": "Running", "lease_expires_at": {"$lt": now.isoformat()}},
+            {"status": {"$in": ["Queued", "Running"]}, "lease_expires_at": {"$exists": False},
+             "updated_at": {"$lt": (now - timedelta(seconds=IMPORT_STALE_SECONDS)).isoformat()}}
+        ]},
+        {"$set": {"status": "Queued", "cancel_requested": False, "message": None, "updated_at": now.isoformat()},
+         "$unset": {"locked_by": "", "lease_expires_at": ""}},
+        return_document=ReturnDocument.AFTER
+    )
+
+
+def extend_lease(job_id: str, run_id: str) -> bool:
+    result = jobs_collection.update_one(
+        {"_id": job_id, "locked_by": run_id},
+        {"$set": {"lease_expires_at": _lease_expiry()}}
+    )
+    return result.matched_count == 1
+
+
+def _heartbeat(job_id: str, run_id: str, done: threading.Event, lost: threading.Event):
+    while not done.wait(IMPORT_STALE_SECONDS / 3):
+        try:
+            if not extend_lease(job_id, run_id):
+                lost.set()
+                return
+        except Exception as e:
+            # A missed renewal is retried; the lease only lapses after three in a row
+            print(f"Warning: Failed to renew import lease for {job_id}: {e}")
+
+
+def request_cancel(job_id: str) -> Optional[Dict[str, Any]]:
+    """Ask the worker to stop after the batches already in flight; the job stays resumable"""
+    return jobs_collection.find_one_and_update(
+        {"_id": job_id, "status": {"$in": ["Queued", "Running"]}},
+        {"$set": {"cancel_requested": True, "updated_at": datetime.utcnow().isoformat()}},
+        return_document=ReturnDocument.AFTER
+    )
+
+
+def _cancel_requested(job_id: str) -> bool:
+    return jobs_collection.find_one({"_id": job_id, "cancel_requested": True}, {"_id": 1}) is not None
+
+
+def _record_progress(job_id: str, run_id: str, batch: List[Tuple], result: Dict[str, Any], errors: List[Dict[str, Any]]):
+    """Commit a batch's counters together with the checkpoint just past it, if this run still holds the job"""
+    row_number, offset, raw = batch[-1]
+    update = {
+        "$inc": {
+            "rows_processed": len(batch),
+            "inserted": result["inserted"],
+            "updated": result["updated"],
+            "skipped": result["skipped"],
+            "failed": len(errors)
+        },
+        "$set": {
+            "checkpoint": {"offset": offset, "row_number": row_number, "last_employee_id": raw.get("employee_id")},
+            "updated_at": datetime.utcnow().isoformat()
+        }
+    }
+    if errors:
+        update["$push"] = {"errors": {"$each": errors, "$slice": MAX_STORED_ERRORS}}
+    if jobs_collection.update_one({"_id": job_id, "locked_by": run_id}, update).matched_count == 0:
+        raise ImportLeaseLost()
+
+
+def _finish(job_id: str, run_id: str, status: str, message: Optional[str] = None) -> bool:
+    now = datetime.utcnow().isoformat()
+    result = jobs_collection.update_one(
+        {"_id": job_id, "locked_by": run_id},
+        {"$set": {"status": status, "message": message, "finished_at": now, "updated_at": now},
+         "$unset": {"locked_by": "", "lease_expires_at": ""}}
+    )
+    return result.matched_count == 1
+
+
+def run_import(job_id: str):
+    """
+    Background task: parse, validate and write an import job's file batch by batch,
+    starting from its checkpoint. Batches already written but not yet checkpointed when
+    a run dies are replayed on resume; upserts keyed on employee_id make that harmless.
+    The run holds a lease on the job and checkpoints only while it still owns it, so a
+    run that was resumed elsewhere stops instead of counting batches twice.
+    """
+    run_id = uuid.uuid4().hex
+    now = datetime.utcnow().isoformat()
+    job = jobs_collection.find_one_and_update(
+        {"_id": job_id, "status": "Queued"},
+        {"$set": {"status": "Running", "started_at": now, "updated_at": now,
+                  "locked_by": run_id, "lease_expires_at": _lease_expiry()},
+         "$inc": {"attempts": 1}},
+        return_document=ReturnDocument.AFTER
+    )
+    if job is None:
+        return
+    checkpoint = job.get("checkpoint") or {}
+    path = Path(job["file_path"])
+    reader = iter_csv_records if job["format"] == "csv" else iter_xlsx_records
+    records = reader(path, checkpoint.get("offset") or 0, checkpoint.get("row_number") or 0)
+    # Throttle so a large import doesn't starve live traffic of connections
+    max_rate = job.get("max_rows_per_second") or 0
+
+    done, lost = threading.Event(), threading.Event()
+    threading.Thread(target=_heartbeat, args=(job_id, run_id, done, lost), daemon=True).start()
+
+    def drain(in_flight):
+        batch, errors, future = in_flight.popleft()
+        result = future.result()
+        _record_progress(job_id, run_id, batch, result, errors + result["errors"])
+
+    try:
+        cancelled = False
+        started = time.monotonic()
+        rows_read = 0
+        with ThreadPoolExecutor(max_workers=IMPORT_WORKERS) as pool:
+            # Writes run in parallel but are checkpointed in file order
+            in_flight = deque()
+            for batch in iter_batches(records, IMPORT_BATCH_SIZE):
+                if lost.is_set():
+                    raise ImportLeaseLost()
+                if _cancel_requested(job_id):
+                    cancelled = True
+                    break
+                valid, errors = prepare_batch(batch)
+                in_flight.append((batch, errors, pool.submit(write_batch, valid, job["on_conflict"], job_id)))
+                if len(in_flight) >= IMPORT_WORKERS * 2:
+                    drain(in_flight)
+                rows_read += len(batch)
+                if max_rate:
+                    time.sleep(max(0.0, rows_read / max_rate - (time.monotonic() - started)))
+            while in_flight:
+                drain(in_flight)
+
+        if cancelled:
+            _finish(job_id, run_id, "Cancelled", "Cancelled by request; resume to continue from the checkpoint")
+        elif get_job(job_id)["rows_processed"] == 0:
+            if _finish(job_id, run_id, "Failed", "No data found"):
+                path.unlink(missing_ok=True)
+                release_claims(job_id)
+        elif _finish(job_id, run_id, "Completed"):
+            path.unlink(missing_ok=True)
+            release_claims(job_id)
+    except ImportLeaseLost:
+        # The resumed run replays anything this one wrote past the checkpoint
+        print(f"Warning: Import {job_id} was resumed by another run; stopping this one")
+    except Exception as e:
+        # The spooled file is kept so the job can be resumed
+        _finish(job_id, run_id, "Failed", str(e))
+    finally:
+        done.set()
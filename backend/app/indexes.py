@@ -0,0 +1,155 @@
+import sys
+from typing import Any, Dict, List
+from pymongo import ASCENDING, DESCENDING, TEXT, IndexModel
+from pymongo.errors import OperationFailure
+from .database import get_database
+from .search import SEARCH_TOKENS_EXPRESSION, SEARCH_TOKENS_FIELD, SEARCH_WEIGHTS, TEXT_INDEX_NAME
+
+db = get_database()
+
+def _has_string(field: str) -> Dict[str, Any]:
+    # Only enforce uniqueness on documents that actually carry the key, so legacy
+    # rows without an email or employee_id don't collide on null. `$gte: ""` matches
+    # every string (BSON type bracketing) and, unlike `$type`, lets the planner prove
+    # an equality lookup is covered by the partial index.
+    return {field: {"$gte": ""}}
+
+
+# Every index the application relies on, per collection
+INDEXES: Dict[str, List[IndexModel]] = {
+    "employees": [
+        # crud.get_employee_by_id, update_employee, bulk-update, bulk-delete
+        IndexModel([("employee_id", ASCENDING)], name="employee_id_unique", unique=True,
+                   partialFilterExpression=_has_string("employee_id")),
+        # authroutes login / register / me / profile
+        IndexModel([("email", ASCENDING)], name="email_unique", unique=True,
+                   partialFilterExpression=_has_string("email")),
+        # department filters combined with join_date ranges (dashboard, retention, reports)
+        IndexModel([("department", ASCENDING), ("join_date", ASCENDING)], name="department_join_date"),
+        # keyset pages of /employees/department/{dept}
+        IndexModel([("department", ASCENDING), ("employee_id", ASCENDING)], name="department_employee_id"),
+        # join_date ranges without a department (/employees/export, hiring trends)
+        IndexModel([("join_date", ASCENDING)], name="join_date"),
+        # active-only analytics grouped by department
+        IndexModel([("is_active", ASCENDING), ("department", ASCENDING)], name="is_active_department"),
+        # quantiles read by sorted position on servers without $percentile (app/histograms.py)
+        IndexModel([("salary", ASCENDING)], name="salary"),
+        IndexModel([("performance_score", ASCENDING)], name="performance_score"),
+        # /employees/search; no stemming or stop words since the fields are names and identifiers
+        IndexModel([(field, TEXT) for field in SEARCH_WEIGHTS], name=TEXT_INDEX_NAME,
+                   weights=SEARCH_WEIGHTS, default_language="none"),
+        # /employees/search word prefixes: anchored ^prefix ranges over the stored tokens
+        IndexModel([(SEARCH_TOKENS_FIELD, ASCENDING)], name="search_tokens"),
+    ],
+    "reports": [
+        # /reports/history
+        IndexModel([("created_at", DESCENDING)], name="created_at_desc"),
+        # report worker claims (app/report_queue.py) and stale-lease recovery
+        IndexModel([("status", ASCENDING), ("priority", DESCENDING), ("created_at", ASCENDING)],
+                   name="status_priority_created_at"),
+        # report cache lookups (app/report_cache.py)
+        IndexModel([("cache_key", ASCENDING), ("status", ASCENDING)], name="cache_key_status",
+                   partialFilterExpression=_has_string("cache_key")),
+    ],
+    "custom_reports": [
+        # /reports/custom/history
+        IndexModel([("created_at", DESCENDING)], name="created_at_desc"),
+        IndexModel([("status", ASCENDING), ("priority", DESCENDING), ("created_at", ASCENDING)],
+                   name="status_priority_created_at"),
+        IndexModel([("cache_key", ASCENDING), ("status", ASCENDING)], name="cache_key_status",
+                   partialFilterExpression=_has_string("cache_key")),
+    ],
+    "custom_report_templates": [
+        # /reports/custom/saved
+        IndexModel([("created_at", DESCENDING)], name="created_at_desc"),
+    ],
+    "employee_files": [
+        # one files record per employee
+        IndexModel([("employee_id", ASCENDING)], name="employee_id_unique", unique=True),
+    ],
+    "files": [
+        # /files/list, newest uploads first
+        IndexModel([("uploaded_at", DESCENDING)], name="uploaded_at_desc"),
+    ],
+    "import_jobs": [
+        # /employees/bulk-import job list
+        IndexModel([("created_at", DESCENDING)], name="created_at_desc"),
+    ],
+    "report_schedules": [
+        # /reports/schedules
+        IndexModel([("created_at", DESCENDING)], name="created_at_desc"),
+        # due-schedule polling
+        IndexModel([("is_active", ASCENDING), ("next_run", ASCENDING)], name="is_active_next_run"),
+    ],
+}
+
+
+def ensure_indexes() -> Dict[str, Any]:
+    """Create any missing registry indexes; failures are reported per index, not raised"""
+    results = {}
+    for collection_name, models in INDEXES.items():
+        created, errors = [], {}
+        # One at a time: create_indexes() is all or nothing, so a unique index blocked by
+        # legacy duplicates would also keep the text and search token indexes from building
+        for model in models:
+            name = model.document["name"]
+            try:
+                created.extend(db[collection_name].create_indexes([model]))
+            except OperationFailure as e:
+                # e.g. duplicate keys blocking a unique index, or an index with conflicting options
+                print(f"Warning: Failed to ensure index {name} on {collection_name}: {e}")
+                errors[name] = str(e)
+        results[collection_name] = {"created": created, "errors": errors} if errors else created
+    return results
+
+
+def backfill_search_tokens() -> int:
+    """Store search tokens on employees written before prefix search relied on them"""
+    try:
+        # Missing tokens index as null, so this is an index lookup once the backfill has run
+        result = db["employees"].update_many(
+            {SEARCH_TOKENS_FIELD: None},
+            [{"$set": {SEARCH_TOKENS_FIELD: SEARCH_TOKENS_EXPRESSION}}]
+        )
+        return result.modified_count
+    except OperationFailure as e:
+        print(f"Warning: Failed to backfill employee search tokens: {e}")
+        return 0
+
+
+def index_report() -> Dict[str, Any]:
+    """Compare the registry with the server: missing, unregistered and never-used indexes"""
+    report = {}
+    for collection_name, models in INDEXES.items():
+        collection = db[collection_name]
+        existing = collection.index_information()
+        declared = {model.document["name"] for model in models}
+
+        usage = {}
+        try:
+            for stats in collection.aggregate([{"$indexStats": {}}]):
+                usage[stats["name"]] = stats["accesses"]["ops"]
+        except OperationFailure:
+            # $indexStats needs clusterMonitor privileges
+            pass
+
+        report[collection_name] = {
+            "missing": sorted(declared - set(existing)),
+            "unregistered": sorted(set(existing) - declared - {"_id_"}),
+            "unused": sorted(name for name, ops in usage.items() if ops == 0 and name != "_id_")
+        }
+    return report
+
+
+if __name__ == "__main__":
+    command = sys.argv[1] if len(sys.argv) > 1 else "ensure"
+    if command == "ensure":
+        for name, created in ensure_indexes().items():
+            print(f"{name}: {created}")
+        print(f"search tokens backfilled: {backfill_search_tokens()}")
+    elif command == "report":
+        for name, details in index_report().items():
+            print(f"{name}: {details}")
+    else:
+        print("Usage: python -m app.indexes [ensure|report]")
+        sys.exit(1)
@@ -1,8 +1,23 @@
 from fastapi import FastAPI
 from .routes import authroutes, employeeroutes, analyticsroutes, filesroutes, reportsroutes, customreportsroutes
 from fastapi.middleware.cors import CORSMiddleware
+from contextlib import asynccontextmanager
+import asyncio
+from .database import open_clients, close_clients, get_pool_stats
+from .indexes import backfill_search_tokens, ensure_indexes, index_report
+from .utils.password_pool import password_pool
 
-app = FastAPI()
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Open MongoDB pools with the worker; both clients are closed on shutdown
+    if await open_clients():
+        await asyncio.to_thread(ensure_indexes)
+        await asyncio.to_thread(backfill_search_tokens)
+    yield
+    password_pool.shutdown()
+    await close_clients()
+
+app = FastAPI(lifespan=lifespan)
 
 origins = [
     "http://localhost:5173",
@@ -15,6 +30,7 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"], 
     allow_headers=["*"], 
+    expose_headers=["X-Next-Cursor", "X-Total-Count"],
 )
 
 # Auth and Employee routes
@@ -30,3 +46,12 @@ app.include_router(customreportsroutes.router)
 def health_check():
     return {"message": "Employee Analytics API is running successfully."}
 
+# Connection pool settings and checkout metrics for this worker
+@app.get("/db/pool-stats")
+def pool_stats():
+    return get_pool_stats()
+
+# Missing, unregistered and unused indexes compared to app/indexes.py
+@app.get("/db/indexes")
+def indexes_report():
+    return index_report()
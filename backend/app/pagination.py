@@ -0,0 +1,40 @@
+import base64
+import json
+import re
+from typing import Dict, Optional
+from fastapi import HTTPException
+from .search import EMPLOYEE_PROJECTION
+
+MAX_PAGE_SIZE = 1000
+
+_FIELD_NAME = re.compile(r"^[A-Za-z_][A-Za-z0-9_]*$")
+
+
+def encode_cursor(last_employee_id: str) -> str:
+    """Opaque continuation token for the page after `last_employee_id`"""
+    payload = json.dumps({"after": last_employee_id}).encode("utf-8")
+    return base64.urlsafe_b64encode(payload).decode("ascii").rstrip("=")
+
+
+def decode_cursor(token: Optional[str]) -> Optional[str]:
+    if not token:
+        return None
+    try:
+        padded = token + "=" * (-len(token) % 4)
+        return json.loads(base64.urlsafe_b64decode(padded))["after"]
+    except (ValueError, KeyError, TypeError):
+        raise HTTPException(status_code=400, detail="Invalid pagination cursor")
+
+
+def build_projection(fields: Optional[str]) -> Dict[str, int]:
+    """Projection for a comma-separated `fields=` parameter; employee_id is always kept for keyset paging"""
+    if not fields:
+        return dict(EMPLOYEE_PROJECTION)
+    names = [name.strip() for name in fields.split(",") if name.strip()]
+    invalid = [name for name in names if not _FIELD_NAME.match(name) or name == "_id"]
+    if invalid:
+        raise HTTPException(status_code=400, detail=f"Invalid fields: {', '.join(invalid)}")
+    projection = {name: 1 for name in names}
+    projection["employee_id"] = 1
+    projection["_id"] = 0
+    return projection
@@ -0,0 +1,366 @@
+from abc import ABC, abstractmethod
+from typing import Any, Dict, Iterable, List, Optional, Sequence, Set, Tuple
+import pandas as pd
+from pymongo import DESCENDING
+from pymongo.errors import OperationFailure
+from .database import UNSUPPORTED_OPERATOR_CODES
+from .report_frames import employee_frame, employee_pipeline, flat_projection, normalize_dtypes
+
+# What the report templates are built from. The builders in excel_generator.py read
+# summary tables and detail rows through ReportData: FrameReportData computes the
+# summaries with pandas from an already loaded DataFrame, MongoReportData plans them
+# into a single $facet aggregation over the matching employees and loads detail rows
+# only when a sheet lists employees. Both shape their results the same way.
+
+SALARY_BINS = [0, 40000, 60000, 80000, 100000, 120000, float("inf")]
+SALARY_LABELS = ["<$40K", "$40K-$60K", "$60K-$80K", "$80K-$100K", "$100K-$120K", "$120K+"]
+PERFORMANCE_BINS = [0, 2, 3, 4, 4.5, 5]
+PERFORMANCE_LABELS = ["Poor (0-2)", "Fair (2-3)", "Good (3-4)", "Excellent (4-4.5)", "Outstanding (4.5-5)"]
+
+# Fields whose presence decides what the builders render
+SUMMARY_FIELDS = ("employee_id", "department", "salary", "performance_score", "is_active", "join_date")
+
+# The $facet each summary table is computed from
+SUMMARY_FACETS = {
+    "overview": "overview",
+    "salary_stats": "overview",
+    "department_analysis": "departments",
+    "performance_by_department": "departments",
+    "department_salary": "departments",
+    "department_counts": "departments",
+    "salary_ranges": "salary_ranges",
+    "performance_ranges": "performance_ranges",
+    "hiring_trends": "hiring",
+}
+
+DEPARTMENT_COLUMNS = ["rows", "employee_count", "avg_salary", "median_salary", "min_salary", "max_salary",
+                      "avg_performance"]
+
+OTHER_BUCKET = "other"
+
+# $median needs MongoDB 7.0+; flipped to False the first time the server rejects it
+_median_supported = True
+
+
+class ReportData(ABC):
+    """Summary tables and detail rows for one report"""
+
+    fields: Set[str]
+
+    @abstractmethod
+    def overview(self) -> Dict[str, Any]:
+        """total, active, departments, avg_performance and salary avg/min/max/std"""
+
+    @abstractmethod
+    def rows(self, columns: Optional[List[str]] = None) -> pd.DataFrame:
+        """Employee rows with `columns` in that order, leaving out those no employee has; all
+        columns when `columns` is None or none of them exist"""
+
+    @abstractmethod
+    def top_performers(self, columns: List[str], minimum: float) -> pd.DataFrame:
+        """rows() with performance_score >= `minimum`, best first"""
+
+    @abstractmethod
+    def _departments(self, medians: bool = False) -> pd.DataFrame:
+        """DEPARTMENT_COLUMNS per department, sorted by department; median_salary only if `medians`"""
+
+    @abstractmethod
+    def _median_salary(self) -> Optional[float]:
+        """Median salary of all employees, None without salaries"""
+
+    @abstractmethod
+    def _range_counts(self, facet: str, field: str, bins: List[float], labels: List[str]) -> Dict[str, int]:
+        """Employees per label of `field` binned like pd.cut(right=False); `facet` computes it in MongoDB"""
+
+    @abstractmethod
+    def _hires(self) -> pd.Series:
+        """Hires per join year, by year"""
+
+    @property
+    def total(self) -> int:
+        return self.overview()["total"]
+
+    def department_analysis(self) -> pd.DataFrame:
+        columns = {"employee_count": "Employee_Count"}
+        if "salary" in self.fields:
+            columns.update(avg_salary="Avg_Salary", median_salary="Median_Salary")
+        if "performance_score" in self.fields:
+            columns["avg_performance"] = "Avg_Performance"
+        departments = self._departments(medians="salary" in self.fields)
+        return departments[list(columns)].rename(columns=columns).round(2).reset_index()
+
+    def performance_by_department(self) -> pd.DataFrame:
+        table = self._departments()[["avg_performance"]].round(2).reset_index()
+        table.columns = ["Department", "Avg_Performance"]
+        return table
+
+    def department_salary(self) -> pd.DataFrame:
+        departments = self._departments(medians=True)
+        table = departments[["avg_salary", "median_salary", "min_salary", "max_salary"]].round(0).reset_index()
+        table.columns = ["Department", "Avg_Salary", "Median_Salary", "Min_Salary", "Max_Salary"]
+        return table
+
+    def department_counts(self) -> pd.DataFrame:
+        table = self._departments()["rows"].sort_values(ascending=False, kind="stable").reset_index()
+        table.columns = ["Department", "Count"]
+        return table
+
+    def salary_ranges(self) -> pd.DataFrame:
+        counts = self._range_counts("salary_ranges", "salary", SALARY_BINS, SALARY_LABELS)
+        return pd.DataFrame({"Salary_Range": SALARY_LABELS,
+                             "Employee_Count": [counts.get(label, 0) for label in SALARY_LABELS]})
+
+    def performance_ranges(self) -> pd.DataFrame:
+        counts = self._range_counts("performance_ranges", "performance_score", PERFORMANCE_BINS, PERFORMANCE_LABELS)
+        return pd.DataFrame({"Performance_Range": PERFORMANCE_LABELS,
+                             "Employee_Count": [counts.get(label, 0) for label in PERFORMANCE_LABELS]})
+
+    def salary_stats(self) -> pd.DataFrame:
+        salary = self.overview()["salary"]
+        return pd.DataFrame({
+            "Metric": ["Average Salary", "Median Salary", "Min Salary", "Max Salary", "Std Deviation"],
+            "Value": [salary["avg"], self._median_salary(), salary["min"], salary["max"], salary["std"]]
+        }).round(2)
+
+    def hiring_trends(self) -> pd.DataFrame:
+        hires = self._hires()
+        return pd.DataFrame({"Year": hires.index, "Hires": hires.values})
+
+
+def report_data(data) -> ReportData:
+    """`data` as ReportData; a DataFrame is summarised with pandas"""
+    return data if isinstance(data, ReportData) else FrameReportData(data)
+
+
+class FrameReportData(ReportData):
+    """ReportData over a DataFrame that is already in memory"""
+
+    def __init__(self, df: pd.DataFrame):
+        self.df = df
+        self.fields = set(df.columns)
+
+    def overview(self) -> Dict[str, Any]:
+        df = self.df
+        salary = df["salary"] if "salary" in df.columns else pd.Series(dtype=float)
+        return {
+            "total": len(df),
+            "active": int((df["is_active"] == True).sum()) if "is_active" in df.columns else len(df),
+            "departments": len(df["department"].unique()) if "department" in df.columns else 0,
+            "avg_performance": df["performance_score"].mean() if "performance_score" in df.columns else None,
+            "salary": {"avg": salary.mean(), "min": salary.min(), "max": salary.max(), "std": salary.std()},
+        }
+
+    def rows(self, columns: Optional[List[str]] = None) -> pd.DataFrame:
+        available = [column for column in columns or [] if column in self.df.columns]
+        return self.df[available] if available else self.df
+
+    def top_performers(self, columns: List[str], minimum: float) -> pd.DataFrame:
+        top = self.df[self.df["performance_score"] >= minimum]
+        available = [column for column in columns if column in top.columns]
+        return top[available].sort_values("performance_score", ascending=False)
+
+    def _departments(self, medians: bool = False) -> pd.DataFrame:
+        df = self.df
+        grouped = df.groupby("department")
+        frame = pd.DataFrame({
+            "rows": grouped.size(),
+            "employee_count": grouped["employee_id"].count() if "employee_id" in df.columns else grouped.size()
+        })
+        if "salary" in df.columns:
+            salary = grouped["salary"]
+            frame["avg_salary"], frame["median_salary"] = salary.mean(), salary.median()
+            frame["min_salary"], frame["max_salary"] = salary.min(), salary.max()
+        if "performance_score" in df.columns:
+            frame["avg_performance"] = grouped["performance_score"].mean()
+        return frame.reindex(columns=DEPARTMENT_COLUMNS)
+
+    def _median_salary(self) -> Optional[float]:
+        return self.df["salary"].median()
+
+    def _range_counts(self, facet: str, field: str, bins: List[float], labels: List[str]) -> Dict[str, int]:
+        ranges = pd.cut(self.df[field], bins=bins, labels=labels, right=False)
+        return {label: int(count) for label, count in ranges.value_counts().items()}
+
+    def _hires(self) -> pd.Series:
+        return pd.to_datetime(self.df["join_date"], errors="coerce").dt.year.value_counts().sort_index()
+
+
+def _number(field: str) -> Dict[str, Any]:
+    """`field` as a double, null where it isn't numeric (pd.to_numeric with errors="coerce")"""
+    return {"$convert": {"input": f"${field}", "to": "double", "onError": None, "onNull": None}}
+
+
+def _salary_stats(with_median: bool) -> Dict[str, Any]:
+    stats = {
+        "avg_salary": {"$avg": "$salary"},
+        "min_salary": {"$min": "$salary"},
+        "max_salary": {"$max": "$salary"},
+    }
+    if with_median:
+        stats["median_salary"] = {"$median": {"input": "$salary", "method": "approximate"}}
+    return stats
+
+
+def _facet_pipeline(name: str, with_median: bool) -> List[Dict[str, Any]]:
+    if name == "overview":
+        return [{"$group": {
+            "_id": None,
+            "total": {"$sum": 1},
+            "active": {"$sum": {"$cond": [{"$eq": ["$is_active", True]}, 1, 0]}},
+            "departments": {"$addToSet": "$department"},
+            "avg_performance": {"$avg": "$performance_score"},
+            "std_salary": {"$stdDevSamp": "$salary"},
+            **_salary_stats(with_median),
+            **{f"has_{field}": {"$max": f"$present.{field}"} for field in SUMMARY_FIELDS}
+        }}]
+    if name == "departments":
+        return [
+            {"$match": {"department": {"$ne": None}}},
+            {"$group": {
+                "_id": "$department",
+                "rows": {"$sum": 1},
+                "employee_count": {"$sum": {"$cond": [{"$eq": [{"$ifNull": ["$employee_id", None]}, None]}, 0, 1]}},
+                "avg_performance": {"$avg": "$performance_score"},
+                **_salary_stats(with_median)
+            }},
+            {"$sort": {"_id": 1}}
+        ]
+    if name in ("salary_ranges", "performance_ranges"):
+        field, bins = ("salary", SALARY_BINS) if name == "salary_ranges" else ("performance_score", PERFORMANCE_BINS)
+        # Values outside the bins (missing, or past the last edge) are left out, as pd.cut does
+        return [
+            {"$match": {field: {"$gte": bins[0]}}},
+            {"$bucket": {
+                "groupBy": f"${field}",
+                "boundaries": bins,
+                "default": OTHER_BUCKET,
+                "output": {"count": {"$sum": 1}}
+            }}
+        ]
+    if name == "hiring":
+        return [
+            {"$match": {"join_year": {"$ne": None}}},
+            {"$group": {"_id": "$join_year", "hires": {"$sum": 1}}},
+            {"$sort": {"_id": 1}}
+        ]
+    raise ValueError(f"Unknown summary facet: {name}")
+
+
+def build_summary_pipeline(query: Dict[str, Any], facets: Iterable[str], with_median: bool = True):
+    """One pass over the matching employees computing each of `facets`"""
+    return [
+        {"$match": query},
+        # Only what the facets read, with numbers and dates coerced the way the DataFrame path does
+        {"$project": {
+            "_id": 0,
+            "department": 1,
+            "employee_id": 1,
+            "is_active": 1,
+            "salary": _number("salary"),
+            "performance_score": _number("performance_score"),
+            "join_year": {"$year": {"$convert": {"input": "$join_date", "to": "date", "onError": None, "onNull": None}}},
+            "present": {field: {"$ne": [{"$type": f"${field}"}, "missing"]} for field in SUMMARY_FIELDS}
+        }},
+        {"$facet": {name: _facet_pipeline(name, with_median) for name in sorted(set(facets))}}
+    ]
+
+
+class MongoReportData(ReportData):
+    """ReportData computed by MongoDB for the employees matching `query`.
+
+    `summaries` names the tables the report will read (methods of ReportData); they are
+    computed together by the first one read. Anything not planned costs its own query.
+    """
+
+    def __init__(self, collection, query: Dict[str, Any], summaries: Sequence[str] = ()):
+        self.collection = collection
+        self.query = query
+        # The overview also reports which fields exist, so it is always computed
+        self._planned = {"overview"} | {SUMMARY_FACETS[name] for name in summaries}
+        self._facets: Dict[str, List[Dict[str, Any]]] = {}
+        self._rows: Dict[Optional[tuple], pd.DataFrame] = {}
+        self._medians: Optional[Tuple[Optional[float], pd.Series]] = None
+
+    def _facet(self, name: str) -> List[Dict[str, Any]]:
+        if name not in self._facets:
+            self._run((self._planned - set(self._facets)) | {name})
+        return self._facets[name]
+
+    def _run(self, facets: Set[str]):
+        global _median_supported
+
+        result = None
+        if _median_supported:
+            try:
+                result = list(self.collection.aggregate(build_summary_pipeline(self.query, facets, True)))
+            except OperationFailure as e:
+                if e.code not in UNSUPPORTED_OPERATOR_CODES:
+                    raise
+                _median_supported = False
+        if result is None:
+            result = list(self.collection.aggregate(build_summary_pipeline(self.query, facets, False)))
+        self._facets.update(result[0])
+
+    def _fallback_medians(self) -> Tuple[Optional[float], pd.Series]:
+        """For servers without $median: overall and per-department medians from the two columns they need"""
+        if self._medians is None:
+            df = normalize_dtypes(pd.DataFrame(
+                list(self.collection.find(self.query, {"department": 1, "salary": 1, "_id": 0})),
+                columns=["department", "salary"]
+            ))
+            self._medians = df["salary"].median(), df.groupby("department")["salary"].median()
+        return self._medians
+
+    @property
+    def fields(self) -> Set[str]:
+        overview = next(iter(self._facet("overview")), {})
+        return {field for field in SUMMARY_FIELDS if overview.get(f"has_{field}")}
+
+    def overview(self) -> Dict[str, Any]:
+        overview = next(iter(self._facet("overview")), {})
+        return {
+            "total": overview.get("total", 0),
+            "active": overview.get("active", 0) if "is_active" in self.fields else overview.get("total", 0),
+            "departments": len(overview.get("departments", [])),
+            "avg_performance": overview.get("avg_performance"),
+            "salary": {key: overview.get(f"{key}_salary") for key in ("avg", "min", "max", "std")},
+        }
+
+    def rows(self, columns: Optional[List[str]] = None) -> pd.DataFrame:
+        key = tuple(columns) if columns else None
+        if key not in self._rows:
+            if key is None:
+                self._rows[key] = employee_frame(self.collection.aggregate(employee_pipeline(self.query)))
+            else:
+                df = employee_frame(self.collection.find(self.query, flat_projection(columns)))
+                available = [column for column in columns if column in df.columns]
+                self._rows[key] = df[available] if available else self.rows()
+        return self._rows[key]
+
+    def top_performers(self, columns: List[str], minimum: float) -> pd.DataFrame:
+        cursor = self.collection.find(
+            {"$and": [self.query, {"performance_score": {"$gte": minimum}}]}, flat_projection(columns)
+        ).sort("performance_score", DESCENDING)
+        df = employee_frame(cursor)
+        return df[[column for column in columns if column in df.columns]]
+
+    def _departments(self, medians: bool = False) -> pd.DataFrame:
+        docs = self._facet("departments")
+        departments = pd.DataFrame(docs, columns=["_id"] + DEPARTMENT_COLUMNS).set_index("_id").rename_axis("department")
+        if medians and docs and "median_salary" not in docs[0]:
+            departments["median_salary"] = self._fallback_medians()[1].reindex(departments.index)
+        return departments
+
+    def _median_salary(self) -> Optional[float]:
+        overview = next(iter(self._facet("overview")), {})
+        if overview and "median_salary" not in overview:
+            return self._fallback_medians()[0]
+        return overview.get("median_salary")
+
+    def _range_counts(self, facet: str, field: str, bins: List[float], labels: List[str]) -> Dict[str, int]:
+        label_of = dict(zip(bins, labels))
+        return {label_of[doc["_id"]]: doc["count"] for doc in self._facet(facet) if doc["_id"] in label_of}
+
+    def _hires(self) -> pd.Series:
+        hires = self._facet("hiring")
+        return pd.Series([doc["hires"] for doc in hires], index=[doc["_id"] for doc in hires], dtype=int)
@@ -0,0 +1,126 @@
+import argparse
+import hashlib
+import json
+import os
+from datetime import datetime, timedelta
+from pathlib import Path
+from typing import Any, Dict, Optional
+from dotenv import load_dotenv
+from pymongo import ASCENDING, DESCENDING
+from .database import get_database
+from .report_queue import QUEUES
+
+# Generated reports are content-addressed: a report's cache_key hashes what it was built
+# from (template or custom config, filters, and the employees data version), so a repeat
+# request reuses the queued, running or finished report instead of writing another file.
+# `python -m app.report_cache evict` trims old files; the report workers also run it.
+
+load_dotenv()
+
+# Completed reports older than this are neither reused nor kept on disk
+REPORT_CACHE_MAX_AGE_HOURS = float(os.getenv("REPORT_CACHE_MAX_AGE_HOURS", 24 * 7))
+# Total size of generated_reports/ + custom_reports/ files before the oldest are evicted
+REPORT_CACHE_MAX_BYTES = int(os.getenv("REPORT_CACHE_MAX_BYTES", 2 * 1024 ** 3))
+
+db = get_database()
+
+
+def report_cache_key(kind: str, spec: Dict[str, Any], data_version: int) -> str:
+    """Stable hash of a report request; dict key order doesn't matter"""
+    payload = json.dumps({"kind": kind, "spec": spec, "data_version": data_version},
+                         sort_keys=True, default=str, separators=(",", ":"))
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+def _cutoff() -> str:
+    return (datetime.utcnow() - timedelta(hours=REPORT_CACHE_MAX_AGE_HOURS)).isoformat()
+
+
+def _pending(cache_key: str) -> Dict[str, Any]:
+    return {"cache_key": cache_key, "status": {"$in": ["Queued", "Generating"]}}
+
+
+def _completed(cache_key: str) -> Dict[str, Any]:
+    return {"cache_key": cache_key, "status": "Completed", "generated_at": {"$gte": _cutoff()}}
+
+
+def _file_exists(report: Dict[str, Any]) -> bool:
+    return bool(report.get("file_path")) and Path(report["file_path"]).exists()
+
+
+async def find_reusable(db, queue: str, cache_key: str) -> Optional[Dict[str, Any]]:
+    """An in-flight or recent completed report with this key whose file is still on disk"""
+    pending = await db[queue].find_one(_pending(cache_key))
+    if pending:
+        return pending
+    cursor = db[queue].find(_completed(cache_key)).sort("generated_at", DESCENDING).limit(3)
+    async for report in cursor:
+        if _file_exists(report):
+            return report
+    return None
+
+
+def find_reusable_sync(queue: str, cache_key: str) -> Optional[Dict[str, Any]]:
+    """find_reusable for worker processes, on the blocking client"""
+    pending = db[queue].find_one(_pending(cache_key))
+    if pending:
+        return pending
+    cursor = db[queue].find(_completed(cache_key)).sort("generated_at", DESCENDING).limit(3)
+    return next((report for report in cursor if _file_exists(report)), None)
+
+
+def _expire(queue: str, report: Dict[str, Any], reason: str):
+    try:
+        os.remove(report["file_path"])
+    except FileNotFoundError:
+        pass
+    except OSError as e:
+        print(f"Warning: Failed to evict report file {report['file_path']}: {e}")
+        return
+    db[queue].update_one(
+        {"_id": report["_id"], "status": "Completed"},
+        {"$set": {"status": "Expired", "message": reason, "updated_at": datetime.utcnow().isoformat()}}
+    )
+
+
+def evict() -> Dict[str, int]:
+    """Remove completed report files past the max age, then oldest first until under the size cap"""
+    cutoff = _cutoff()
+    expired = 0
+    remaining = []
+    for queue in QUEUES:
+        cursor = db[queue].find(
+            {"status": "Completed", "file_path": {"$ne": None}},
+            {"file_path": 1, "generated_at": 1}
+        ).sort("generated_at", ASCENDING)
+        for report in cursor:
+            if (report.get("generated_at") or "") < cutoff:
+                _expire(queue, report, "Report file expired from the report cache")
+                expired += 1
+                continue
+            try:
+                size = Path(report["file_path"]).stat().st_size
+            except OSError:
+                continue
+            remaining.append((report.get("generated_at") or "", queue, report, size))
+
+    total = sum(size for *_, size in remaining)
+    evicted = 0
+    for _, queue, report, size in sorted(remaining, key=lambda entry: entry[0]):
+        if total <= REPORT_CACHE_MAX_BYTES:
+            break
+        _expire(queue, report, "Report file evicted to keep the report cache under its size limit")
+        total -= size
+        evicted += 1
+    return {"expired": expired, "evicted": evicted, "bytes": total}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Report file cache maintenance")
+    parser.add_argument("command", choices=["evict"])
+    parser.parse_args()
+    print(evict())
+
+
+if __name__ == "__main__":
+    main()
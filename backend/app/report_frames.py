@@ -0,0 +1,76 @@
+from typing import Any, Dict, Iterable, List, Optional
+import pandas as pd
+from .models import NewEmployee
+from .search import SEARCH_TOKENS_FIELD
+
+# Employee documents as flat rows for every report and export. `skills` is the only
+# list field in the schema (see models.py); MongoDB joins it into a comma-separated
+# string where the query allows, and employee_frame does the same in one pass for
+# documents that arrive as-is. Numeric fields are coerced once here so report code
+# can aggregate without re-checking types.
+
+LIST_FIELDS = ("skills",)
+LIST_SEPARATOR = ", "
+NUMERIC_FIELDS = ("salary", "performance_score")
+# Columns of streamed exports, which can't look ahead for the fields of later rows:
+# the schema, then fields only some employees have (uploaded photos, self-registration)
+EXPORT_COLUMNS = [*NewEmployee.model_fields, "photo_url", "created_at", "updated_at"]
+
+
+def _joined(field: str) -> Dict[str, Any]:
+    """Aggregation expression: the list at `field` joined with LIST_SEPARATOR, other values as-is"""
+    path = f"${field}"
+    return {"$cond": [
+        {"$isArray": path},
+        {"$reduce": {
+            "input": path,
+            "initialValue": "",
+            "in": {"$concat": [
+                "$$value",
+                {"$cond": [{"$eq": ["$$value", ""]}, "", LIST_SEPARATOR]},
+                {"$toString": "$$this"}
+            ]}
+        }},
+        path
+    ]}
+
+
+def flat_projection(fields: List[str]) -> Dict[str, Any]:
+    """find() projection of `fields` with list fields joined server-side"""
+    projection = {field: _joined(field) if field in LIST_FIELDS else 1 for field in fields}
+    projection["_id"] = 0
+    return projection
+
+
+def employee_pipeline(query: Dict[str, Any], sort: Optional[Dict[str, int]] = None) -> List[Dict[str, Any]]:
+    """Aggregation returning whole employee documents, minus _id and search tokens, with list fields joined"""
+    pipeline = [{"$match": query}]
+    if sort:
+        pipeline.append({"$sort": sort})
+    pipeline.append({"$set": {field: _joined(field) for field in LIST_FIELDS}})
+    pipeline.append({"$unset": ["_id", SEARCH_TOKENS_FIELD]})
+    return pipeline
+
+
+def flatten_lists(df: pd.DataFrame) -> pd.DataFrame:
+    """Join list values in the schema's list columns; a no-op when MongoDB already did it"""
+    for column in LIST_FIELDS:
+        if column in df.columns and df[column].dtype == object:
+            df[column] = df[column].map(
+                lambda value: LIST_SEPARATOR.join(map(str, value)) if isinstance(value, list) else value
+            )
+    return df
+
+
+def normalize_dtypes(df: pd.DataFrame) -> pd.DataFrame:
+    for column in NUMERIC_FIELDS:
+        if column in df.columns:
+            df[column] = pd.to_numeric(df[column], errors="coerce")
+    return df
+
+
+def employee_frame(documents: Iterable[Dict[str, Any]]) -> pd.DataFrame:
+    """DataFrame of employee documents ready for the report builders"""
+    df = pd.DataFrame(documents if isinstance(documents, list) else list(documents))
+    df = df.drop(columns=["_id"], errors="ignore")
+    return normalize_dtypes(flatten_lists(df))
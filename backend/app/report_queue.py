@@ -0,0 +1,111 @@
+import os
+from datetime import datetime, timedelta
+from typing import Any, Dict, Optional
+from dotenv import load_dotenv
+from pymongo import DESCENDING, ASCENDING, ReturnDocument
+from .database import get_database
+
+# The `reports` and `custom_reports` documents double as a job queue: routes insert
+# them as "Queued", report workers (python -m app.report_worker) claim them with a
+# lease, and expired leases are handed back to the queue.
+
+load_dotenv()
+
+# "worker": a separate `python -m app.report_worker` pool generates reports.
+# "inline": FastAPI BackgroundTasks in the API process (single-process development).
+REPORT_EXECUTION = os.getenv("REPORT_EXECUTION", "worker")
+REPORT_MAX_ATTEMPTS = int(os.getenv("REPORT_MAX_ATTEMPTS", 3))
+REPORT_LEASE_SECONDS = int(os.getenv("REPORT_LEASE_SECONDS", 600))
+REPORT_RETRY_BASE_SECONDS = int(os.getenv("REPORT_RETRY_BASE_SECONDS", 30))
+
+QUEUES = ("reports", "custom_reports")
+
+db = get_database()
+
+
+def queue_fields(priority: int = 0) -> Dict[str, Any]:
+    """Fields a new report document needs to be picked up by the workers"""
+    return {
+        "priority": priority,
+        "attempts": 0,
+        "max_attempts": REPORT_MAX_ATTEMPTS,
+        "available_at": datetime.utcnow().isoformat()
+    }
+
+
+def claim_next(queue: str, worker_id: str) -> Optional[Dict[str, Any]]:
+    """Atomically take the highest-priority, oldest due job from `queue`"""
+    now = datetime.utcnow()
+    return db[queue].find_one_and_update(
+        # available_at is missing on documents queued before the worker pool existed
+        {"status": "Queued", "available_at": {"$not": {"$gt": now.isoformat()}}},
+        {"$set": {
+            "status": "Generating",
+            "locked_by": worker_id,
+            "lease_expires_at": (now + timedelta(seconds=REPORT_LEASE_SECONDS)).isoformat(),
+            "updated_at": now.isoformat()
+        }, "$inc": {"attempts": 1}},
+        sort=[("priority", DESCENDING), ("created_at", ASCENDING)],
+        return_document=ReturnDocument.AFTER
+    )
+
+
+def job_filter(job_id: str, worker_id: Optional[str] = None) -> Dict[str, Any]:
+    """Query for a job's status writes; with `worker_id` they only apply while it holds the lease"""
+    return {"_id": job_id, "locked_by": worker_id} if worker_id else {"_id": job_id}
+
+
+def extend_lease(queue: str, job_id: str, worker_id: str) -> bool:
+    expires = datetime.utcnow() + timedelta(seconds=REPORT_LEASE_SECONDS)
+    result = db[queue].update_one(
+        {"_id": job_id, "locked_by": worker_id},
+        {"$set": {"lease_expires_at": expires.isoformat()}}
+    )
+    return result.matched_count == 1
+
+
+def release(queue: str, job_id: str, worker_id: str):
+    """Drop the lease after a run; requeue with exponential backoff if it failed transiently"""
+    job = db[queue].find_one({"_id": job_id, "locked_by": worker_id})
+    if job is None:
+        return
+    update = {"$unset": {"locked_by": "", "lease_expires_at": ""}}
+    attempts = job.get("attempts", 1)
+    if job.get("status") == "Failed" and job.get("retryable") and attempts < job.get("max_attempts", REPORT_MAX_ATTEMPTS):
+        delay = REPORT_RETRY_BASE_SECONDS * 2 ** (attempts - 1)
+        update["$set"] = {
+            "status": "Queued",
+            "retryable": False,
+            "last_error": job.get("message"),
+            "available_at": (datetime.utcnow() + timedelta(seconds=delay)).isoformat()
+        }
+    db[queue].update_one({"_id": job_id}, update)
+
+
+def recover_stale(queue: str) -> int:
+    """Requeue jobs whose worker died mid-run (expired lease); give up after max_attempts"""
+    now = datetime.utcnow().isoformat()
+    expired = {"status": "Generating", "lease_expires_at": {"$lt": now}}
+    failed = db[queue].update_many(
+        {**expired, "$expr": {"$gte": ["$attempts", {"$ifNull": ["$max_attempts", REPORT_MAX_ATTEMPTS]}]}},
+        {"$set": {"status": "Failed", "message": "Report worker stopped while generating this report",
+                  "updated_at": now},
+         "$unset": {"locked_by": "", "lease_expires_at": ""}}
+    )
+    requeued = db[queue].update_many(
+        expired,
+        {"$set": {"status": "Queued", "available_at": now, "updated_at": now},
+         "$unset": {"locked_by": "", "lease_expires_at": ""}}
+    )
+    return failed.modified_count + requeued.modified_count
+
+
+def queue_stats() -> Dict[str, Any]:
+    stats = {}
+    for queue in QUEUES:
+        counts = {doc["_id"]: doc["count"] for doc in db[queue].aggregate([
+            {"$match": {"status": {"$in": ["Queued", "Generating"]}}},
+            {"$group": {"_id": "$status", "count": {"$sum": 1}}}
+        ])}
+        stats[queue] = {"queued": counts.get("Queued", 0), "generating": counts.get("Generating", 0)}
+    return {"execution": REPORT_EXECUTION, **stats}
@@ -0,0 +1,169 @@
+import argparse
+import calendar
+import os
+import signal
+import threading
+from collections import defaultdict
+from datetime import datetime, timedelta
+from typing import Any, Dict, List, Optional
+from dotenv import load_dotenv
+from pymongo import ASCENDING
+from .database import get_database
+
+# Report scheduler: `python -m app.report_scheduler [--once]`.
+# Polls `report_schedules` for due entries, claims each run by moving its next_run forward
+# (a compare-and-set, so several schedulers never run the same slot twice) and queues one
+# report per distinct template + filters for the report workers.
+
+load_dotenv()
+
+REPORT_SCHEDULER_POLL_INTERVAL = float(os.getenv("REPORT_SCHEDULER_POLL_INTERVAL", 30))
+REPORT_SCHEDULER_BATCH_SIZE = int(os.getenv("REPORT_SCHEDULER_BATCH_SIZE", 100))
+# Scheduled runs queue behind reports someone is waiting for
+REPORT_SCHEDULE_PRIORITY = int(os.getenv("REPORT_SCHEDULE_PRIORITY", -1))
+
+FREQUENCIES = ("daily", "weekly", "monthly")
+
+db = get_database()
+schedules_collection = db["report_schedules"]
+reports_collection = db["reports"]
+
+
+def next_run_after(run: datetime, frequency: str, anchor_day: Optional[int] = None) -> datetime:
+    """The run one period after `run`; monthly runs keep `anchor_day`, clamped to short months"""
+    if frequency == "daily":
+        return run + timedelta(days=1)
+    if frequency == "weekly":
+        return run + timedelta(weeks=1)
+    if frequency == "monthly":
+        year, month = (run.year + 1, 1) if run.month == 12 else (run.year, run.month + 1)
+        day = min(anchor_day or run.day, calendar.monthrange(year, month)[1])
+        return run.replace(year=year, month=month, day=day)
+    raise ValueError(f"Unknown frequency: {frequency}")
+
+
+def following_run(schedule: Dict[str, Any], now: datetime) -> datetime:
+    """First slot after `now`; runs missed while no scheduler was up are skipped, not replayed"""
+    run = datetime.fromisoformat(schedule["next_run"])
+    anchor_day = schedule.get("anchor_day") or run.day
+    while run <= now:
+        run = next_run_after(run, schedule["frequency"], anchor_day)
+    return run
+
+
+def claim_due(now: datetime) -> List[Dict[str, Any]]:
+    """Due active schedules this process won; each is advanced to its next slot"""
+    claimed = []
+    due = schedules_collection.find(
+        {"is_active": True, "next_run": {"$lte": now.isoformat()}}
+    ).sort("next_run", ASCENDING).limit(REPORT_SCHEDULER_BATCH_SIZE)
+    for schedule in due:
+        if schedule.get("frequency") not in FREQUENCIES:
+            schedules_collection.update_one(
+                {"_id": schedule["_id"]},
+                {"$set": {"is_active": False, "message": f"Unknown frequency: {schedule.get('frequency')}",
+                          "updated_at": now.isoformat()}}
+            )
+            continue
+        result = schedules_collection.update_one(
+            # Another scheduler already took this slot if next_run has moved
+            {"_id": schedule["_id"], "is_active": True, "next_run": schedule["next_run"]},
+            {"$set": {
+                "next_run": following_run(schedule, now).isoformat(),
+                "last_run_at": now.isoformat(),
+                "updated_at": now.isoformat()
+            }}
+        )
+        if result.modified_count == 1:
+            claimed.append(schedule)
+    return claimed
+
+
+def enqueue(schedules: List[Dict[str, Any]]) -> int:
+    """Queue one report per template + filters among `schedules`; returns reports queued"""
+    # Imported here so that reportsroutes can import next_run_after from this module
+    from .data_version import employees_version
+    from .report_cache import find_reusable_sync
+    from .report_queue import REPORT_EXECUTION
+    from .routes.reportsroutes import (
+        _generate_report_task, _report_document, _template_cache_key, report_templates
+    )
+
+    data_version = employees_version()
+    groups = defaultdict(list)
+    for schedule in schedules:
+        groups[_template_cache_key(schedule["template_id"], schedule.get("filters"), data_version)].append(schedule)
+
+    queued = 0
+    now = datetime.utcnow().isoformat()
+    for cache_key, group in groups.items():
+        schedule_ids = [schedule["_id"] for schedule in group]
+        recipients = sorted({r for schedule in group for r in schedule.get("recipients") or []})
+        template = next((t for t in report_templates if t["id"] == group[0]["template_id"]), None)
+        if not template:
+            schedules_collection.update_many(
+                {"_id": {"$in": schedule_ids}},
+                {"$set": {"is_active": False, "message": "Template no longer exists", "updated_at": now}}
+            )
+            continue
+
+        # An identical report queued by hand (or still fresh from a previous run) is shared
+        existing = find_reusable_sync("reports", cache_key)
+        if existing:
+            report_id = existing["_id"]
+            reports_collection.update_one(
+                {"_id": report_id},
+                {"$addToSet": {"schedule_ids": {"$each": schedule_ids}, "recipients": {"$each": recipients}}}
+            )
+        else:
+            report = _report_document(template, group[0].get("filters"), REPORT_SCHEDULE_PRIORITY,
+                                      cache_key, data_version)
+            report.update({"schedule_ids": schedule_ids, "recipients": recipients})
+            reports_collection.insert_one(report)
+            report_id = report["_id"]
+            queued += 1
+
+        schedules_collection.update_many(
+            {"_id": {"$in": schedule_ids}},
+            {"$set": {"last_report_id": report_id, "updated_at": now}}
+        )
+        # Without a worker pool nothing else would pick the report up
+        if not existing and REPORT_EXECUTION == "inline":
+            _generate_report_task(report_id, template["id"], group[0].get("filters"))
+    return queued
+
+
+def run_once() -> Dict[str, int]:
+    claimed = claim_due(datetime.utcnow())
+    return {"schedules": len(claimed), "reports": enqueue(claimed) if claimed else 0}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Run scheduled report generation")
+    parser.add_argument("--once", action="store_true", help="Process due schedules and exit")
+    args = parser.parse_args()
+
+    if args.once:
+        print(run_once())
+        return
+
+    stop = threading.Event()
+    signal.signal(signal.SIGTERM, lambda *_: stop.set())
+    signal.signal(signal.SIGINT, lambda *_: stop.set())
+    print("Report scheduler started")
+    while not stop.is_set():
+        claimed = 0
+        try:
+            result = run_once()
+            claimed = result["schedules"]
+            if claimed:
+                print(f"Scheduled runs: {result}")
+        except Exception as e:
+            print(f"Warning: Report scheduler poll failed: {e}")
+        # A full batch means more may be due; poll again straight away
+        if claimed < REPORT_SCHEDULER_BATCH_SIZE:
+            stop.wait(REPORT_SCHEDULER_POLL_INTERVAL)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,133 @@
+from typing import Dict, List, NamedTuple, Optional
+import pandas as pd
+from openpyxl.formatting.rule import FormulaRule
+from openpyxl.styles import Alignment, Border, Font, NamedStyle, PatternFill, Side
+from openpyxl.utils import get_column_letter
+
+# The look shared by every generated spreadsheet. Styles are NamedStyles registered once
+# per workbook and referenced by name, column widths are computed from the DataFrame
+# being written rather than by re-reading the sheet, and row banding / highlighting are
+# conditional formatting rules over a range instead of a fill stored on every cell.
+
+CURRENCY_FORMAT = "$#,##0"
+SCORE_FORMAT = "0.0"
+# Applied wherever these columns appear in a table
+DEFAULT_NUMBER_FORMATS = {"salary": CURRENCY_FORMAT, "performance_score": SCORE_FORMAT}
+
+MIN_COLUMN_WIDTH = 15
+MAX_COLUMN_WIDTH = 40
+
+BAND_COLOR = "F2F2F2"
+HIGHLIGHT_COLOR = "E6F3FF"
+TOP_PERFORMER_COLOR = "C6EFCE"
+TOP_PERFORMER_SCORE = 4.5
+
+# Last row Excel addresses; rules for tables of unknown length run to the end of the sheet
+EXCEL_MAX_ROW = 1048576
+
+
+class Highlight(NamedTuple):
+    """Fill rows whose `column` is a number >= `minimum`"""
+    column: str
+    minimum: float
+    color: str = HIGHLIGHT_COLOR
+
+
+TOP_PERFORMERS = Highlight("performance_score", TOP_PERFORMER_SCORE, TOP_PERFORMER_COLOR)
+
+
+def _fill(color: str) -> PatternFill:
+    return PatternFill(start_color=color, end_color=color, fill_type="solid")
+
+
+def _base_styles() -> List[NamedStyle]:
+    # Fresh objects per workbook; openpyxl binds a NamedStyle to the workbook it is added to
+    center = Alignment(horizontal="center", vertical="center")
+    thin = Side(style="thin")
+    border = Border(left=thin, right=thin, top=thin, bottom=thin)
+    return [
+        NamedStyle("report_title", font=Font(bold=True, size=16, color="FFFFFF"), fill=_fill("2F4F4F"), alignment=center),
+        NamedStyle("report_description", font=Font(italic=True, size=12), alignment=center),
+        NamedStyle("report_timestamp", font=Font(size=10, color="808080")),
+        NamedStyle("section_title", font=Font(bold=True, size=14)),
+        NamedStyle("table_header", font=Font(bold=True, color="FFFFFF"), fill=_fill("4F81BD"), alignment=center, border=border),
+        NamedStyle("table_cell", alignment=center, border=border),
+        NamedStyle("metric_label", font=Font(bold=True), border=border),
+        NamedStyle("metric_value", border=border),
+    ]
+
+
+def register_styles(workbook):
+    """Add the report styles to `workbook` unless they are already there"""
+    existing = set(workbook.named_styles)
+    for style in _base_styles():
+        if style.name not in existing:
+            workbook.add_named_style(style)
+
+
+def table_cell_style(workbook, number_format: Optional[str] = None) -> str:
+    """Name of the data-cell style with `number_format`, registered on first use"""
+    if not number_format:
+        return "table_cell"
+    name = f"table_cell {number_format}"
+    if name not in workbook.named_styles:
+        thin = Side(style="thin")
+        workbook.add_named_style(NamedStyle(
+            name, number_format=number_format, alignment=Alignment(horizontal="center", vertical="center"),
+            border=Border(left=thin, right=thin, top=thin, bottom=thin)
+        ))
+    return name
+
+
+def column_styles(workbook, columns, number_formats: Optional[Dict[str, str]] = None) -> List[str]:
+    formats = {**DEFAULT_NUMBER_FORMATS, **(number_formats or {})}
+    return [table_cell_style(workbook, formats.get(str(column))) for column in columns]
+
+
+def column_lengths(df: pd.DataFrame) -> List[int]:
+    """Longest rendered value per column, header included"""
+    # Column by column so only one column's strings exist at a time
+    return [
+        max([len(str(column))] + ([int(df.iloc[:, index].astype(str).str.len().max())] if len(df) else []))
+        for index, column in enumerate(df.columns)
+    ]
+
+
+def column_width(length: int, maximum: int = MAX_COLUMN_WIDTH) -> int:
+    return min(max(length, MIN_COLUMN_WIDTH) + 2, maximum)
+
+
+def add_table_rules(ws, columns, first_row: int, last_row: Optional[int], band: bool = True,
+                    highlight: Optional[Highlight] = None):
+    """Banding and highlight rules over the data rows first_row..last_row"""
+    if last_row is not None and last_row < first_row:
+        return
+    ref = f"A{first_row}:{get_column_letter(len(columns))}{last_row or EXCEL_MAX_ROW}"
+    columns = [str(column) for column in columns]
+    # Rules added first take priority, so a highlight wins over the band
+    if highlight and highlight.column in columns:
+        cell = f"${get_column_letter(columns.index(highlight.column) + 1)}{first_row}"
+        ws.conditional_formatting.add(ref, FormulaRule(
+            formula=[f"AND(ISNUMBER({cell}),{cell}>={highlight.minimum})"], fill=_fill(highlight.color)
+        ))
+    if band:
+        # Every second data row, as the per-cell fills used to do
+        ws.conditional_formatting.add(ref, FormulaRule(
+            formula=[f"MOD(ROW()-{first_row},2)=1"], fill=_fill(BAND_COLOR)
+        ))
+
+
+def style_worksheet(ws, df: pd.DataFrame, start_row: int = 1, band: bool = True,
+                    highlight: Optional[Highlight] = None, max_width: int = MAX_COLUMN_WIDTH):
+    """Style `df` already written to an in-memory worksheet with its header at `start_row`"""
+    workbook = ws.parent
+    register_styles(workbook)
+    for index, length in enumerate(column_lengths(df), 1):
+        ws.column_dimensions[get_column_letter(index)].width = column_width(length, max_width)
+    for cell in ws[start_row][:len(df.columns)]:
+        cell.style = "table_header"
+    styles = column_styles(workbook, df.columns)
+    for row in ws.iter_rows(min_row=start_row + 1, max_row=start_row + len(df), max_col=len(df.columns)):
+        for cell, style in zip(row, styles):
+            cell.style = style
+    add_table_rules(ws, df.columns, start_row + 1, start_row + len(df), band, highlight)
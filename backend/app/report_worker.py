@@ -0,0 +1,135 @@
+import argparse
+import multiprocessing
+import os
+import signal
+import socket
+import threading
+import time
+import uuid
+from dotenv import load_dotenv
+
+# Report worker pool: `python -m app.report_worker [--workers N]`.
+# Each worker process claims queued reports from MongoDB (see app/report_queue.py)
+# and runs the same generation tasks the API used to run in BackgroundTasks.
+
+load_dotenv()
+
+REPORT_WORKERS = int(os.getenv("REPORT_WORKERS", 2))
+REPORT_POLL_INTERVAL = float(os.getenv("REPORT_POLL_INTERVAL", 2))
+# How often one worker sweeps for jobs left behind by a crashed worker and evicts old report files
+REPORT_RECOVERY_INTERVAL = int(os.getenv("REPORT_RECOVERY_INTERVAL", 60))
+
+
+def _run_job(queue: str, job, worker_id: str):
+    # Imported in the worker process only; the route modules pull in pandas/openpyxl
+    from .routes import customreportsroutes, reportsroutes
+    if queue == "reports":
+        reportsroutes._generate_report_task(job["_id"], job["template_id"], job.get("filters"), worker_id)
+    else:
+        config = customreportsroutes.CustomReportConfig(**job["config"])
+        customreportsroutes._generate_custom_report_task(job["_id"], config, worker_id)
+
+
+def _heartbeat(queue: str, job_id: str, worker_id: str, done: threading.Event):
+    from .report_queue import REPORT_LEASE_SECONDS, extend_lease
+    while not done.wait(REPORT_LEASE_SECONDS / 3):
+        # A failed renewal is retried on the next beat; the lease outlasts a few of them
+        try:
+            extend_lease(queue, job_id, worker_id)
+        except Exception as e:
+            print(f"Warning: Failed to extend lease on {queue} job {job_id}: {e}")
+
+
+def work(worker_id: str, stop: threading.Event = None, recover: bool = False):
+    """Claim and run jobs until `stop` is set; one job at a time per process"""
+    from .report_cache import evict
+    from .report_queue import QUEUES, claim_next, recover_stale, release
+    stop = stop or threading.Event()
+    last_recovery = 0.0
+    turn = 0
+    while not stop.is_set():
+        if recover and time.monotonic() - last_recovery >= REPORT_RECOVERY_INTERVAL:
+            for queue in QUEUES:
+                recovered = recover_stale(queue)
+                if recovered:
+                    print(f"Recovered {recovered} stale jobs in {queue}")
+            try:
+                evicted = evict()
+                if evicted["expired"] or evicted["evicted"]:
+                    print(f"Report cache: {evicted}")
+            except Exception as e:
+                print(f"Warning: Report cache eviction failed: {e}")
+            last_recovery = time.monotonic()
+
+        claimed = False
+        # Alternate which queue is polled first so neither starves the other
+        turn = (turn + 1) % len(QUEUES)
+        for queue in QUEUES[turn:] + QUEUES[:turn]:
+            try:
+                job = claim_next(queue, worker_id)
+            except Exception as e:
+                print(f"Warning: Failed to poll {queue}: {e}")
+                job = None
+            if job is None:
+                continue
+            claimed = True
+            done = threading.Event()
+            threading.Thread(target=_heartbeat, args=(queue, job["_id"], worker_id, done), daemon=True).start()
+            try:
+                _run_job(queue, job, worker_id)
+            except Exception as e:
+                # The tasks record their own failures; this only catches bad job documents
+                print(f"Warning: Report job {job['_id']} crashed: {e}")
+            finally:
+                done.set()
+                release(queue, job["_id"], worker_id)
+            break
+        if not claimed:
+            stop.wait(REPORT_POLL_INTERVAL)
+
+
+def _worker_process(index: int):
+    stop = threading.Event()
+    signal.signal(signal.SIGTERM, lambda *_: stop.set())
+    signal.signal(signal.SIGINT, lambda *_: stop.set())
+    worker_id = f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+    # Only the first worker sweeps for stale jobs; the update is idempotent either way
+    work(worker_id, stop, recover=index == 0)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Run report generation workers")
+    parser.add_argument("--workers", type=int, default=REPORT_WORKERS, help="Concurrent report generations")
+    args = parser.parse_args()
+
+    context = multiprocessing.get_context("spawn")
+    stopping = threading.Event()
+
+    def start(index: int):
+        process = context.Process(target=_worker_process, args=(index,))
+        process.start()
+        return process
+
+    processes = [start(index) for index in range(args.workers)]
+    print(f"Started {len(processes)} report workers")
+
+    def shutdown(*_):
+        stopping.set()
+        for process in processes:
+            process.terminate()
+    signal.signal(signal.SIGTERM, shutdown)
+    signal.signal(signal.SIGINT, shutdown)
+
+    # Replace workers that die (OOM kill, segfault in a native library); their job's
+    # lease expires and the recovery sweep requeues it
+    while not stopping.wait(1):
+        for index, process in enumerate(processes):
+            if not process.is_alive():
+                print(f"Warning: Report worker {process.pid} exited with {process.exitcode}; restarting")
+                processes[index] = start(index)
+    for process in processes:
+        process.join()
+
+
+if __name__ == "__main__":
+    main()
@@ -1,10 +1,14 @@
 from fastapi import APIRouter, Depends, HTTPException, Query
 from ..database import get_database
 from datetime import datetime, timedelta
-import calendar
 from typing import Optional, List, Dict, Any
 from pydantic import BaseModel
 from ..models import CustomQueryRequest, DateRangeFilter
+from ..analytics_engine import fetch_dashboard_stats, dashboard_stats_from_snapshots
+from ..snapshots import get_snapshots
+from ..cache import analytics_cache, cached
+from ..histograms import compute_histogram
+from ..search import EMPLOYEE_PROJECTION
 import os
 
 db = get_database()
@@ -13,6 +17,7 @@ empcollection = db["employees"]
 router = APIRouter(prefix="/analytics", tags=["Analytics"])
 
 @router.get("/dashboard-stats")
+@cached("dashboard-stats")
 def get_dashboard_stats(
     department: Optional[str] = Query(None),
     start_date: Optional[str] = Query(None),
@@ -20,81 +25,30 @@ def get_dashboard_stats(
 ):
     """Get main dashboard KPIs with optional filters"""
     try:
-        # Build base filter
-        # base_filter = {"is_active": True}
-        base_filter = {}
-        if department and department != "all":
-            base_filter["department"] = department
-
-        # Date filter for hire_date
-        date_filter = {}
-        if start_date and end_date:
-            date_filter = {
-                "join_date": {
-                    "$gte": start_date,
-                    "$lte": end_date
-                }
-            }
-
-        # Total active employees
-        total_employees = empcollection.count_documents(base_filter)
+        # Serve from the materialized snapshots when available, else one $facet aggregation
+        snapshots = get_snapshots()
+        if snapshots is not None:
+            stats = dashboard_stats_from_snapshots(snapshots, department)
+        else:
+            stats = fetch_dashboard_stats(empcollection, department)
 
         # Active projects (you might want to create a projects collection)
         active_projects = 28  # Mock for now, replace with actual projects count
 
-        # Average salary
-        salary_pipeline = [
-            {"$match": base_filter},
-            {"$group": {"_id": None, "avgSalary": {"$avg": "$salary"}}}
-        ]
-        avg_salary_result = list(empcollection.aggregate(salary_pipeline))
-        avg_salary = avg_salary_result[0]["avgSalary"] if avg_salary_result else 0
-
-        # New hires this month
-        now = datetime.utcnow()
-        month_start = datetime(now.year, now.month, 1).strftime("%Y-%m-%d")
-        month_end = datetime(now.year, now.month, calendar.monthrange(now.year, now.month)[1]).strftime("%Y-%m-%d")
-        
-        hire_filter = base_filter.copy()
-        hire_filter.update({
-            "join_date": {"$gte": month_start, "$lte": month_end}
-        })
-        new_hires = empcollection.count_documents(hire_filter)
-
-        # Attrition rate (inactive employees)
-        total_all = empcollection.count_documents({} if not department or department == "all" else {"department": department})
-        inactive_count = empcollection.count_documents({
-            "is_active": False,
-            **({"department": department} if department and department != "all" else {})
-        })
-        attrition_rate = (inactive_count / total_all * 100) if total_all > 0 else 0
-
-        # Top performing department
-        dept_performance = list(empcollection.aggregate([
-            {"$match": {"is_active": True}},
-            {"$group": {
-                "_id": "$department",
-                "avg_performance": {"$avg": "$performance_score"},
-                "count": {"$sum": 1}
-            }},
-            {"$sort": {"avg_performance": -1}},
-            {"$limit": 1}
-        ]))
-        top_department = dept_performance[0]["_id"] if dept_performance else "N/A"
-
         return {
-            "total_employees": total_employees,
+            "total_employees": stats["total_employees"],
             "active_projects": active_projects,
-            "average_salary": round(avg_salary, 2),
-            "new_hires_this_month": new_hires,
-            "attrition_rate": round(attrition_rate, 2),
-            "top_department": top_department
+            "average_salary": round(stats["average_salary"], 2),
+            "new_hires_this_month": stats["new_hires_this_month"],
+            "attrition_rate": round(stats["attrition_rate"], 2),
+            "top_department": stats["top_department"]
         }
 
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error fetching dashboard stats: {str(e)}")
 
 @router.get("/salary-distribution")
+@cached("salary-distribution")
 def get_salary_distribution(department: Optional[str] = Query(None)):
     """Get salary distribution data for histograms"""
     try:
@@ -112,43 +66,18 @@ def get_salary_distribution(department: Optional[str] = Query(None)):
             {"range": "100k+", "min": 100000, "max": float('inf')}
         ]
 
-        distribution = []
-        for range_data in salary_ranges:
-            filter_query = base_filter.copy()
-            if range_data["max"] == float('inf'):
-                filter_query["salary"] = {"$gte": range_data["min"]}
-            else:
-                filter_query["salary"] = {"$gte": range_data["min"], "$lt": range_data["max"]}
-            
-            count = empcollection.count_documents(filter_query)
-            distribution.append({
-                "range": range_data["range"],
-                "count": count
-            })
-
-        # Additional salary statistics
-        salary_stats = list(empcollection.aggregate([
-            {"$match": base_filter},
-            {"$group": {
-                "_id": None,
-                "min_salary": {"$min": "$salary"},
-                "max_salary": {"$max": "$salary"},
-                "avg_salary": {"$avg": "$salary"},
-                "median_salary": {"$push": "$salary"}
-            }}
-        ]))
+        # Bucket counts and median in one server-side pass
+        histogram = compute_histogram(empcollection, "salary", salary_ranges, match=base_filter)
+        distribution = [{"range": b["range"], "count": b["count"]} for b in histogram["buckets"]]
 
         stats = {}
-        if salary_stats:
-            salaries = sorted(salary_stats[0]["median_salary"])
-            median_idx = len(salaries) // 2
-            median = salaries[median_idx] if salaries else 0
-            
+        if histogram["stats"]:
+            salary_stats = histogram["stats"]
             stats = {
-                "min_salary": salary_stats[0]["min_salary"],
-                "max_salary": salary_stats[0]["max_salary"],
-                "avg_salary": round(salary_stats[0]["avg_salary"], 2),
-                "median_salary": median
+                "min_salary": salary_stats["min"],
+                "max_salary": salary_stats["max"],
+                "avg_salary": round(salary_stats["avg"], 2),
+                "median_salary": salary_stats["quantiles"][0.5]
             }
 
         return {
@@ -160,6 +89,7 @@ def get_salary_distribution(department: Optional[str] = Query(None)):
         raise HTTPException(status_code=500, detail=f"Error fetching salary distribution: {str(e)}")
 
 @router.get("/department-performance")
+@cached("department-performance")
 def get_department_performance():
     """Get department-wise performance metrics"""
     try:
@@ -203,6 +133,7 @@ def get_department_performance():
         raise HTTPException(status_code=500, detail=f"Error fetching department performance: {str(e)}")
 
 @router.get("/hiring-trends")
+@cached("hiring-trends")
 def get_hiring_trends(months: int = Query(12, description="Number of months to analyze")):
     """Get hiring and departure trends over time"""
     try:
@@ -248,6 +179,7 @@ def get_hiring_trends(months: int = Query(12, description="Number of months to a
         raise HTTPException(status_code=500, detail=f"Error fetching hiring trends: {str(e)}")
 
 @router.get("/retention-rate")
+@cached("retention-rate")
 def get_retention_rate(department: Optional[str] = Query(None)):
     """Calculate employee retention rates"""
     try:
@@ -342,6 +274,19 @@ def get_performance_trends(
         if department and department != "all":
             base_filter["department"] = department
 
+        # Performance distribution
+        score_ranges = [
+            {"range": "1.0-2.0", "min": 1.0, "max": 2.0},
+            {"range": "2.0-3.0", "min": 2.0, "max": 3.0},
+            {"range": "3.0-4.0", "min": 3.0, "max": 4.0},
+            {"range": "4.0-5.0", "min": 4.0, "max": 5.0}
+        ]
+
+        # Bins, average and count come from one server-side pass
+        histogram = compute_histogram(empcollection, "performance_score", score_ranges, match=base_filter)
+        performance_distribution = [{"range": b["range"], "count": b["count"]} for b in histogram["buckets"]]
+        performance_data = histogram["stats"]
+
         # For this example, we'll create monthly performance averages
         # In a real scenario, you might have performance review dates
         end_date = datetime.utcnow()
@@ -353,16 +298,7 @@ def get_performance_trends(
             
             # Get average performance for the period
             # This is simplified - you'd typically have performance review dates
-            performance_data = list(empcollection.aggregate([
-                {"$match": base_filter},
-                {"$group": {
-                    "_id": None,
-                    "avg_score": {"$avg": "$performance_score"},
-                    "count": {"$sum": 1}
-                }}
-            ]))
-            
-            avg_score = performance_data[0]["avg_score"] if performance_data else 0
+            avg_score = performance_data["avg"] if performance_data else 0
             
             # Add some variation for demonstration (remove in production)
             import random
@@ -372,26 +308,7 @@ def get_performance_trends(
             monthly_performance.insert(0, {
                 "month": month_label,
                 "score": round(adjusted_score, 2),
-                "employee_count": performance_data[0]["count"] if performance_data else 0
-            })
-
-        # Performance distribution
-        score_ranges = [
-            {"range": "1.0-2.0", "min": 1.0, "max": 2.0},
-            {"range": "2.0-3.0", "min": 2.0, "max": 3.0},
-            {"range": "3.0-4.0", "min": 3.0, "max": 4.0},
-            {"range": "4.0-5.0", "min": 4.0, "max": 5.0}
-        ]
-
-        performance_distribution = []
-        for range_data in score_ranges:
-            filter_query = base_filter.copy()
-            filter_query["performance_score"] = {"$gte": range_data["min"], "$lt": range_data["max"]}
-            count = empcollection.count_documents(filter_query)
-            
-            performance_distribution.append({
-                "range": range_data["range"],
-                "count": count
+                "employee_count": performance_data["count"] if performance_data else 0
             })
 
         return {
@@ -448,23 +365,32 @@ from fastapi.responses import StreamingResponse
 from typing import Optional
 from datetime import datetime
 from io import BytesIO
+import itertools
 import pandas as pd
 import json
+from ..streaming import DEFAULT_BATCH_SIZE, MAX_BATCH_SIZE, MEDIA_TYPES, iter_json_array, iter_ndjson
 
 @router.get("/export-data")
 def export_analytics_data(
     data_type: str = Query(..., description="Type of data to export"),
-    format: str = Query("json", regex="^(json|csv|xlsx)$", description="Export format"),
-    department: Optional[str] = Query(None)
+    format: str = Query("json", pattern="^(json|ndjson|csv|xlsx)$", description="Export format"),
+    department: Optional[str] = Query(None),
+    batch_size: int = Query(DEFAULT_BATCH_SIZE, ge=1, le=MAX_BATCH_SIZE, description="Documents per streamed batch (employees JSON/NDJSON)")
 ):
-    """Export analytics data in various formats (JSON, CSV, Excel)"""
+    """Export analytics data in various formats (JSON, NDJSON, CSV, Excel)"""
     try:
         base_filter = {"is_active": True}
         if department and department != "all":
             base_filter["department"] = department
 
+        if data_type == "employees" and format in ["json", "ndjson"]:
+            return _stream_employee_export(base_filter, format, batch_size)
+
+        if format == "ndjson":
+            raise HTTPException(status_code=400, detail="NDJSON export is only available for employees")
+
         if data_type == "employees":
-            data = list(empcollection.find(base_filter, {"_id": 0}))
+            data = list(empcollection.find(base_filter, EMPLOYEE_PROJECTION))
         elif data_type == "departments":
             data = get_department_performance()
         elif data_type == "salary":
@@ -541,8 +467,29 @@ def export_analytics_data(
                     headers={"Content-Disposition": f"attachment; filename={filename_base}.csv"}
                 )
 
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error exporting data: {str(e)}")
+
+def _stream_employee_export(base_filter: Dict[str, Any], format: str, batch_size: int):
+    """Stream employee rows straight off the cursor; JSON keeps the {"data": [...], ...} envelope"""
+    cursor = empcollection.find(base_filter, EMPLOYEE_PROJECTION).batch_size(batch_size)
+    first = next(cursor, None)
+    if first is None:
+        raise HTTPException(status_code=404, detail="No employees data found")
+    documents = itertools.chain([first], cursor)
+
+    filename_base = f"hr_analytics_employees_{datetime.utcnow().strftime('%Y%m%d_%H%M%S')}"
+    headers = {"Content-Disposition": f"attachment; filename={filename_base}.{format}"}
+    if format == "ndjson":
+        return StreamingResponse(iter_ndjson(documents, batch_size), media_type=MEDIA_TYPES["ndjson"], headers=headers)
+
+    export_date = datetime.utcnow().isoformat()
+    # Metadata follows the array so record_count can be written once the cursor is drained
+    suffix = lambda count: f'], "format": "json", "export_date": "{export_date}", "record_count": {count}}}'
+    body = iter_json_array(documents, batch_size, prefix='{"data": [', suffix=suffix)
+    return StreamingResponse(body, media_type=MEDIA_TYPES["json"], headers=headers)
     
 # @router.get("/export-data")
 # def export_analytics_data(
@@ -576,6 +523,11 @@ def export_analytics_data(
 #     except Exception as e:
 #         raise HTTPException(status_code=500, detail=f"Error exporting data: {str(e)}")
 
+@router.get("/cache-stats")
+def get_cache_stats():
+    """Hit/miss/eviction counters for the analytics response cache"""
+    return analytics_cache.stats()
+
 @router.get("/health")
 def analytics_health_check():
     """Health check endpoint for analytics service"""
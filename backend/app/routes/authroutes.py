@@ -1,11 +1,16 @@
-from fastapi import APIRouter,HTTPException,Depends,Header
+import asyncio
+from fastapi import APIRouter,HTTPException,Depends
+from pymongo.asynchronous.database import AsyncDatabase
 from app.models import Logindetails,Registerdetails,UpdateEmployee
-from app.utils.auth import hashpass, verifypass,createtoken,decodetoken
-from app.database import get_database
-from fastapi.security import HTTPAuthorizationCredentials,HTTPBearer
-import re
+from app.utils.auth import createtoken
+from app.auth_context import get_current_user, get_token_payload, invalidate_user
+from app.utils.password_pool import PASSWORD_POOL_RETRY_AFTER, PasswordPoolBusy, password_pool
+from app.database import get_async_database, get_database
+from app import snapshots
+from app.data_version import employees_changed
+from app.id_allocator import employee_ids
+from app.search import SEARCH_TOKENS_FIELD, search_update, with_search_tokens
 from datetime import datetime
-security=HTTPBearer()
 from bson import ObjectId
 
 router=APIRouter(prefix="/auth",tags=["Auth"])
@@ -14,26 +19,40 @@ db=get_database()
 empcollection=db["employees"]
 
 
+# bcrypt runs in the password process pool and is awaited on the event loop, so sign-ins
+# never hold request threadpool threads; shed load with 429 when its queue is full
+async def run_password_task(func, *args):
+    try:
+        return await func(*args)
+    except PasswordPoolBusy:
+        raise HTTPException(
+            status_code=429,
+            detail="Too many concurrent sign-ins, please retry",
+            headers={"Retry-After": str(PASSWORD_POOL_RETRY_AFTER)}
+        )
+
+
 @router.post("/login")
-def login(data:Logindetails):
-    user=empcollection.find_one({"email":data.email})
-    if not user or not verifypass(data.password,user["hashed_password"]):
+async def login(data:Logindetails, db: AsyncDatabase = Depends(get_async_database)):
+    user=await db["employees"].find_one({"email":data.email})
+    if not user or not await run_password_task(password_pool.verify_async,data.password,user["hashed_password"]):
         raise HTTPException(status_code=401,detail="Invalid Credentials")
     
     token=createtoken(({"sub":user["email"]}))
     return {"message":"Login successful","token":token}
 
 @router.post("/register")
-def register(data: Registerdetails):
+async def register(data: Registerdetails, db: AsyncDatabase = Depends(get_async_database)):
     # Check if user already exists
-    if empcollection.find_one({"email": data.email}):
+    if await db["employees"].find_one({"email": data.email}):
         raise HTTPException(status_code=400, detail="User already registered")
     
-    employee_id = get_next_employee_id()
-    while empcollection.find_one({"employee_id": employee_id}):
-        employee_id = f"EMP{datetime.now().strftime('%Y%m%d%H%M%S')}"
+    employee_id = await asyncio.to_thread(employee_ids.next_id)
+    # IDs written outside the allocator (imports, manual inserts) can still collide
+    while await db["employees"].find_one({"employee_id": employee_id}, {"_id": 1}):
+        employee_id = await asyncio.to_thread(employee_ids.next_id)
     
-    hashedpw = hashpass(data.password)
+    hashedpw = await run_password_task(password_pool.hash_async, data.password)
     
     # Create user document with all required fields
     user = {
@@ -53,10 +72,13 @@ def register(data: Registerdetails):
     }
     
     # Insert user into database
-    result = empcollection.insert_one(user)
+    result = await db["employees"].insert_one(with_search_tokens(user))
     
     if not result.inserted_id:
         raise HTTPException(status_code=500, detail="Failed to create user")
+    # Snapshot and version writes use the blocking client
+    await asyncio.to_thread(snapshots.apply_insert, [user])
+    await asyncio.to_thread(employees_changed)
     
     # Create token
     token = createtoken({"sub": data.email})
@@ -75,21 +97,11 @@ def logout():
     return {"message":"logged out successfully","token":"trial token"}
 
 @router.get("/me")
-def getProfile(credentials: HTTPAuthorizationCredentials = Depends(security)):
-    token = credentials.credentials
-    decoded_payload = decodetoken(token)
-    email = decoded_payload.get("sub") if decoded_payload else None
-    
-    if not email:
-        raise HTTPException(status_code=401, detail="Invalid token")
-    
-    user = empcollection.find_one({"email": email})
-    if not user:
-        raise HTTPException(status_code=404, detail="User Not Found")
-    
+def getProfile(user: dict = Depends(get_current_user)):
     # Convert ObjectId to str and remove sensitive fields
     user["id"] = str(user.pop("_id", ""))
     user.pop("hashed_password", None)
+    user.pop(SEARCH_TOKENS_FIELD, None)
 
     return {
         **user,
@@ -98,26 +110,32 @@ def getProfile(credentials: HTTPAuthorizationCredentials = Depends(security)):
 
 
 @router.put("/profile")
-def updateProfile(data: UpdateEmployee, Authorization: str = Header(...)):
-    token = Authorization.replace("Bearer ", "").strip()
-    decoded_payload = decodetoken(token)
-    email = decoded_payload.get("sub") if decoded_payload else None
+def updateProfile(data: UpdateEmployee, payload: dict = Depends(get_token_payload)):
+    email = payload["sub"]
 
-    if not email:
-        raise HTTPException(status_code=401, detail="Invalid token")
-    
+    # Writes read the current document rather than the cached copy
     user = empcollection.find_one({"email": email})
     if not user:
         raise HTTPException(status_code=404, detail="User not found")
 
     # Update all fields
-    result = empcollection.update_one({"email": email}, {"$set": data.dict()})
+    result = empcollection.update_one({"email": email}, search_update(data.dict()))
 
     if result.modified_count == 0:
         raise HTTPException(status_code=400, detail="No changes made")
+    invalidate_user(email)
+    if data.email:
+        invalidate_user(data.email)
+    snapshots.apply_update([user], data.dict())
+    employees_changed()
     
     return {"message": "Profile updated", "newdata": data}
 
+@router.get("/password-pool-stats")
+def passwordPoolStats():
+    # Queue depth, rejections, queue wait and bcrypt time for this worker's hashing pool
+    return password_pool.stats()
+
 @router.post("/reset-password")
 def resetPassword(email:str):
     user = empcollection.find_one({"email": email})
@@ -125,33 +143,3 @@ def resetPassword(email:str):
         raise HTTPException(status_code=404, detail="Email not found")
     
     return {"message": f"Password reset link sent to {email}"}
-
-
-# Get next employee id
-def get_next_employee_id():
-    """
-    Generate the next available employee ID in format EMP001, EMP002, etc.
-    """
-    try:
-        # Find all employee IDs that match the pattern EMP followed by numbers
-        employees = list(empcollection.find(
-            {"employee_id": {"$regex": r"^EMP\d+$"}}, 
-            {"employee_id": 1}
-        ))
-        
-        if not employees:
-            return "EMP001"
-        
-        max_num = 0
-        for emp in employees:
-            match = re.match(r"EMP(\d+)", emp["employee_id"])
-            if match:
-                num = int(match.group(1))
-                max_num = max(max_num, num)
-        
-        next_num = max_num + 1
-        return f"EMP{next_num:03d}"  
-        
-    except Exception as e:
-        print(f"Error generating employee ID: {e}")
-        return f"EMP{datetime.now().strftime('%Y%m%d%H%M%S')}"  
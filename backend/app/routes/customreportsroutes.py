@@ -1,4 +1,4 @@
-from fastapi import APIRouter, HTTPException, BackgroundTasks, Query
+from fastapi import APIRouter, HTTPException, BackgroundTasks, Query, Depends
 from typing import List, Dict, Any, Optional, Union
 from pydantic import BaseModel
 import uuid
@@ -7,16 +7,22 @@ import pandas as pd
 from datetime import datetime
 from pathlib import Path
 from io import BytesIO
-from ..database import get_database
+from pymongo.asynchronous.database import AsyncDatabase
+from ..database import get_database, get_async_database
+from ..data_version import employees_version_async
+from ..report_cache import find_reusable, report_cache_key
+from ..report_frames import employee_frame, flat_projection
+from ..report_queue import REPORT_EXECUTION, job_filter, queue_fields
+from ..report_styles import style_worksheet
 from openpyxl.styles import Font
 from datetime import datetime
 # from ..excel_generator import generate_custom_report
 
 router = APIRouter(prefix="/reports/custom", tags=["Custom Report Builder"])
+# Blocking handles for the background generation task; routes use get_async_database
 db = get_database()
 employees_collection = db["employees"]
 custom_reports_collection = db["custom_reports"]
-custom_templates_collection = db["custom_report_templates"]
 
 # Ensure custom reports directory exists
 CUSTOM_REPORTS_DIRECTORY = Path("custom_reports")
@@ -117,39 +123,30 @@ def get_sort_direction(sort_order: str) -> int:
     return 1 if sort_order.lower() == "asc" else -1
 
 @router.post("/preview")
-async def preview_custom_report(request: PreviewRequest):
+async def preview_custom_report(request: PreviewRequest, db: AsyncDatabase = Depends(get_async_database)):
     """Preview data for custom report configuration"""
     try:
         # Build MongoDB query from filters
         mongo_query = build_mongodb_query(request.filters)
         
-        # Create projection for selected fields
-        projection = {field: 1 for field in request.selectedFields}
-        projection["_id"] = 0  # Exclude MongoDB _id
+        # Create projection for selected fields; skills are joined by MongoDB
+        projection = flat_projection(request.selectedFields)
         
         # Get sort direction
         sort_direction = get_sort_direction(request.sortOrder)
         
         # Execute query with limit
-        cursor = employees_collection.find(
+        cursor = db["employees"].find(
             mongo_query, 
             projection
         ).sort(request.sortBy, sort_direction).limit(request.limit)
         
-        employees = list(cursor)
-        
-        # Process data for preview
-        for employee in employees:
-            for field, value in employee.items():
-                if isinstance(value, list):
-                    employee[field] = ", ".join(map(str, value))
-        
-        return employees
+        return await cursor.to_list(None)
         
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Preview failed: {str(e)}")
 
-def _generate_custom_report_task(report_id: str, config: CustomReportConfig):
+def _generate_custom_report_task(report_id: str, config: CustomReportConfig, worker_id: Optional[str] = None):
     """Background task to generate custom report"""
     try:
         print(f"Starting report generation for {report_id}")
@@ -157,7 +154,7 @@ def _generate_custom_report_task(report_id: str, config: CustomReportConfig):
         
         # Update status to generating
         custom_reports_collection.update_one(
-            {"_id": report_id},
+            job_filter(report_id, worker_id),
             {"$set": {
                 "status": "Generating",
                 "updated_at": datetime.utcnow().isoformat()
@@ -167,9 +164,8 @@ def _generate_custom_report_task(report_id: str, config: CustomReportConfig):
         # Build MongoDB query from filters
         mongo_query = build_mongodb_query(config.filters)
         
-        # Create projection for selected fields
-        projection = {field: 1 for field in config.selectedFields}
-        projection["_id"] = 0  # Exclude MongoDB _id
+        # Create projection for selected fields; skills are joined by MongoDB
+        projection = flat_projection(config.selectedFields)
         
         # Get sort direction
         sort_direction = get_sort_direction(config.sortOrder)
@@ -184,7 +180,7 @@ def _generate_custom_report_task(report_id: str, config: CustomReportConfig):
 
         if not employees:
             custom_reports_collection.update_one(
-                {"_id": report_id},
+                job_filter(report_id, worker_id),
                 {"$set": {
                     "status": "Failed", 
                     "message": "No employees match the specified criteria.",
@@ -212,13 +208,7 @@ def _generate_custom_report_task(report_id: str, config: CustomReportConfig):
                 )
             else:
                 # Generate CSV file
-                df = pd.DataFrame(employees)
-                
-                # Process list fields for CSV
-                for col in df.columns:
-                    if df[col].apply(lambda x: isinstance(x, list)).any():
-                        df[col] = df[col].apply(lambda x: ", ".join(map(str, x)) if isinstance(x, list) else x)
-                
+                df = employee_frame(employees)
                 df.to_csv(filepath, index=False)
                 final_path = str(filepath)
                 
@@ -235,7 +225,7 @@ def _generate_custom_report_task(report_id: str, config: CustomReportConfig):
 
         # Update database with completion
         custom_reports_collection.update_one(
-            {"_id": report_id},
+            job_filter(report_id, worker_id),
             {"$set": {
                 "status": "Completed",
                 "file_path": str(final_path),
@@ -247,23 +237,43 @@ def _generate_custom_report_task(report_id: str, config: CustomReportConfig):
         )
 
     except Exception as e:
-        # Update status to failed
+        # Update status to failed; report workers retry these, unlike "no data" failures
         custom_reports_collection.update_one(
-            {"_id": report_id},
+            job_filter(report_id, worker_id),
             {"$set": {
                 "status": "Failed", 
                 "message": str(e),
+                "retryable": True,
                 "updated_at": datetime.utcnow().isoformat()
             }}
         )
 
 @router.post("/generate")
-async def generate_custom_report(config: CustomReportConfig, background_tasks: BackgroundTasks):
+async def generate_custom_report(
+    config: CustomReportConfig,
+    background_tasks: BackgroundTasks,
+    priority: int = Query(0, description="Higher runs first"),
+    db: AsyncDatabase = Depends(get_async_database)
+):
     """Generate a custom report based on configuration"""
     try:
         if not config.selectedFields:
             raise HTTPException(status_code=400, detail="At least one field must be selected")
 
+        # Same configuration over unchanged employee data: hand back that report
+        data_version = await employees_version_async(db)
+        cache_key = report_cache_key("custom", config.dict(), data_version)
+        existing = await find_reusable(db, "custom_reports", cache_key)
+        if existing:
+            return {
+                "message": "An identical custom report is already available." if existing["status"] == "Completed"
+                           else "An identical custom report is already being generated.",
+                "report_id": existing["_id"],
+                "report_name": config.name,
+                "status": existing["status"],
+                "cached": True
+            }
+
         # Create report record
         report_id = str(uuid.uuid4())
         report_data = {
@@ -272,21 +282,27 @@ async def generate_custom_report(config: CustomReportConfig, background_tasks: B
             "description": config.description,
             "config": config.dict(),
             "status": "Queued",
+            "cache_key": cache_key,
+            "data_version": data_version,
             "created_at": datetime.utcnow().isoformat(),
-            "updated_at": datetime.utcnow().isoformat()
+            "updated_at": datetime.utcnow().isoformat(),
+            **queue_fields(priority)
         }
         
-        result = custom_reports_collection.insert_one(report_data)
+        result = await db["custom_reports"].insert_one(report_data)
         if not result.inserted_id:
             raise HTTPException(status_code=500, detail="Failed to create report record")
 
-        # Start background task
-        background_tasks.add_task(_generate_custom_report_task, report_id, config)
+        # Report workers pick up the queued document; inline mode keeps generation in this process
+        if REPORT_EXECUTION == "inline":
+            background_tasks.add_task(_generate_custom_report_task, report_id, config)
 
         return {
             "message": "Custom report generation has been queued successfully.", 
             "report_id": report_id,
-            "report_name": config.name
+            "report_name": config.name,
+            "status": "Queued",
+            "cached": False
         }
         
     except HTTPException:
@@ -295,23 +311,23 @@ async def generate_custom_report(config: CustomReportConfig, background_tasks: B
         raise HTTPException(status_code=500, detail=f"Failed to queue custom report generation: {str(e)}")
 
 @router.get("/history")
-async def get_custom_report_history():
+async def get_custom_report_history(db: AsyncDatabase = Depends(get_async_database)):
     """Get all custom report generation history"""
     try:
-        history = list(custom_reports_collection.find(
+        history = await db["custom_reports"].find(
             {}, 
             {"_id": 0}
-        ).sort("created_at", -1))
+        ).sort("created_at", -1).to_list(None)
         
         return history
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Failed to fetch custom report history: {str(e)}")
 
 @router.get("/{report_id}/download")
-async def download_custom_report(report_id: str):
+async def download_custom_report(report_id: str, db: AsyncDatabase = Depends(get_async_database)):
     """Download a completed custom report"""
     try:
-        report = custom_reports_collection.find_one({"_id": report_id})
+        report = await db["custom_reports"].find_one({"_id": report_id})
         if not report:
             raise HTTPException(status_code=404, detail="Report not found.")
         
@@ -323,7 +339,7 @@ async def download_custom_report(report_id: str):
         
         file_path = Path(report["file_path"])
         if not file_path.exists():
-            custom_reports_collection.update_one(
+            await db["custom_reports"].update_one(
                 {"_id": report_id},
                 {"$set": {
                     "status": "Failed",
@@ -358,7 +374,7 @@ async def download_custom_report(report_id: str):
     
     
 @router.post("/save")
-async def save_custom_report_template(request: SaveTemplateRequest):
+async def save_custom_report_template(request: SaveTemplateRequest, db: AsyncDatabase = Depends(get_async_database)):
     """Save a custom report template for reuse"""
     try:
         template_id = str(uuid.uuid4())
@@ -371,7 +387,7 @@ async def save_custom_report_template(request: SaveTemplateRequest):
             "updated_at": datetime.utcnow().isoformat()
         }
         
-        result = custom_templates_collection.insert_one(template_data)
+        result = await db["custom_report_templates"].insert_one(template_data)
         if not result.inserted_id:
             raise HTTPException(status_code=500, detail="Failed to save template")
 
@@ -387,10 +403,10 @@ async def save_custom_report_template(request: SaveTemplateRequest):
         raise HTTPException(status_code=500, detail=f"Failed to save template: {str(e)}")
 
 @router.get("/saved")
-async def get_saved_custom_report_templates():
+async def get_saved_custom_report_templates(db: AsyncDatabase = Depends(get_async_database)):
     """Get all saved custom report templates"""
     try:
-        templates = list(custom_templates_collection.find({}).sort("created_at", -1))
+        templates = await db["custom_report_templates"].find({}).sort("created_at", -1).to_list(None)
         
         # Process templates to include proper id field
         processed_templates = []
@@ -408,10 +424,10 @@ async def get_saved_custom_report_templates():
         raise HTTPException(status_code=500, detail=f"Failed to fetch saved templates: {str(e)}")
 
 @router.delete("/saved/{template_id}")
-async def delete_custom_report_template(template_id: str):
+async def delete_custom_report_template(template_id: str, db: AsyncDatabase = Depends(get_async_database)):
     """Delete a saved custom report template"""
     try:
-        result = custom_templates_collection.delete_one({"_id": template_id})
+        result = await db["custom_report_templates"].delete_one({"_id": template_id})
         if result.deleted_count == 0:
             raise HTTPException(status_code=404, detail="Template not found.")
         
@@ -422,10 +438,10 @@ async def delete_custom_report_template(template_id: str):
         raise HTTPException(status_code=500, detail=f"Failed to delete template: {str(e)}")
     
 @router.get("/{report_id}/status")
-async def get_custom_report_status(report_id: str):
+async def get_custom_report_status(report_id: str, db: AsyncDatabase = Depends(get_async_database)):
     """Get status of a specific custom report"""
     try:
-        report = custom_reports_collection.find_one({"_id": report_id})
+        report = await db["custom_reports"].find_one({"_id": report_id})
         if not report:
             raise HTTPException(status_code=404, detail="Report not found.")
         
@@ -446,10 +462,10 @@ async def get_custom_report_status(report_id: str):
 
 
 @router.delete("/{report_id}")
-async def delete_custom_report(report_id: str):
+async def delete_custom_report(report_id: str, db: AsyncDatabase = Depends(get_async_database)):
     """Delete a custom report and its associated file"""
     try:
-        report = custom_reports_collection.find_one({"_id": report_id})
+        report = await db["custom_reports"].find_one({"_id": report_id})
         if not report:
             raise HTTPException(status_code=404, detail="Report not found.")
         
@@ -462,7 +478,7 @@ async def delete_custom_report(report_id: str):
                 print(f"Warning: Failed to delete custom report file {file_path}: {e}")
 
         # Delete the document from the database
-        result = custom_reports_collection.delete_one({"_id": report_id})
+        result = await db["custom_reports"].delete_one({"_id": report_id})
         if result.deleted_count == 0:
             raise HTTPException(status_code=404, detail="Report not found in database.")
         
@@ -477,12 +493,7 @@ def generate_custom_excel_report(employees, filepath, selected_fields, include_c
     if not employees:
         raise ValueError("No employee data provided.")
 
-    df = pd.DataFrame(employees)
-    
-    # Process list fields for Excel
-    for col in df.columns:
-        if col in df.columns and df[col].apply(lambda x: isinstance(x, list)).any():
-            df[col] = df[col].apply(lambda x: ", ".join(map(str, x)) if isinstance(x, list) else x)
+    df = employee_frame(employees)
 
     from openpyxl import Workbook
     from openpyxl.styles import Font, PatternFill, Alignment, Border, Side
@@ -508,7 +519,7 @@ def generate_custom_excel_report(employees, filepath, selected_fields, include_c
             ws.cell(row=r_idx, column=c_idx, value=value)
     
     # Style the worksheet
-    style_custom_worksheet(ws, start_row=4)
+    style_worksheet(ws, df, start_row=4, band=False, max_width=50)
     
     # Add summary sheet if charts are requested
     if include_charts and len(employees) > 0:
@@ -518,41 +529,6 @@ def generate_custom_excel_report(employees, filepath, selected_fields, include_c
     wb.save(filepath)
     return filepath
 
-def style_custom_worksheet(ws, start_row=1):
-    """Apply styling to custom report worksheet"""
-    from openpyxl.styles import Font, PatternFill, Alignment, Border, Side
-    from openpyxl.utils import get_column_letter
-    
-    header_fill = PatternFill(start_color="4F81BD", end_color="4F81BD", fill_type="solid")
-    header_font = Font(bold=True, color="FFFFFF")
-    alignment = Alignment(horizontal="center", vertical="center")
-    thin_border = Border(
-        left=Side(style="thin"), right=Side(style="thin"),
-        top=Side(style="thin"), bottom=Side(style="thin")
-    )
-    
-    # Style headers
-    for col_num in range(1, ws.max_column + 1):
-        cell = ws.cell(row=start_row, column=col_num)
-        cell.font = header_font
-        cell.fill = header_fill
-        cell.alignment = alignment
-        cell.border = thin_border
-        
-        # Auto-adjust column widths
-        col_letter = get_column_letter(col_num)
-        max_length = 15
-        for row in ws[col_letter]:
-            if row.value:
-                max_length = max(max_length, len(str(row.value)))
-        ws.column_dimensions[col_letter].width = min(max_length + 2, 50)
-    
-    # Style data cells
-    for row in ws.iter_rows(min_row=start_row+1, max_row=ws.max_row, min_col=1, max_col=ws.max_column):
-        for cell in row:
-            cell.alignment = alignment
-            cell.border = thin_border
-
 def add_custom_charts(ws, df, selected_fields):
     """Add charts to summary worksheet based on selected fields"""
     from openpyxl.chart import BarChart, PieChart, Reference
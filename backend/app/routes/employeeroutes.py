@@ -1,13 +1,18 @@
-from fastapi import APIRouter, HTTPException, UploadFile, File, Query
-from typing import List, Dict, Any
-from fastapi.responses import StreamingResponse
+from fastapi import APIRouter, BackgroundTasks, HTTPException, UploadFile, File, Query, Request, Response
+from typing import List, Dict, Any, Optional
 from uuid import uuid4
-from io import BytesIO
-import pandas as pd
+import asyncio
+import itertools
 import os
+import time
 from datetime import datetime
-from .. import crud, excel_generator, models
+from .. import bulk_ops, crud, excel_generator, importer, models, snapshots
 from ..database import get_database
+from ..data_version import employees_changed
+from ..pagination import MAX_PAGE_SIZE, build_projection, decode_cursor, encode_cursor
+from ..report_frames import EXPORT_COLUMNS, employee_pipeline
+from ..search import EMPLOYEE_PROJECTION, MAX_QUERY_LENGTH, search_employees, search_update
+from ..streaming import DEFAULT_BATCH_SIZE, MAX_BATCH_SIZE, stream_documents, stream_table
 
 router = APIRouter(prefix="/employees", tags=["Employees"])
 db = get_database()
@@ -16,22 +21,43 @@ empcollection = db["employees"]
 uploaddir = "uploads/photos"
 os.makedirs(uploaddir, exist_ok=True)
 
+def _employees_response(response: Response, query: dict, limit: Optional[int], after: Optional[str], fields: Optional[str]):
+    """Full list when no page is requested, otherwise one keyset page plus X-Next-Cursor"""
+    projection = build_projection(fields)
+    if limit is None and after is None:
+        return list(empcollection.find({**query, **crud.LISTED}, projection))
+
+    employees, next_after = crud.get_employees_page(query, limit or MAX_PAGE_SIZE, decode_cursor(after), projection)
+    if next_after is not None:
+        response.headers["X-Next-Cursor"] = encode_cursor(next_after)
+    return employees
+
 @router.get("/")
-def get_employees():
-    return crud.get_all_employees()
+def get_employees(
+    response: Response,
+    limit: Optional[int] = Query(None, ge=1, le=MAX_PAGE_SIZE, description="Page size; omit for the full list"),
+    after: Optional[str] = Query(None, description="Continuation token from the X-Next-Cursor header"),
+    fields: Optional[str] = Query(None, description="Comma-separated fields to return"),
+    include_total: bool = Query(False, description="Add an estimated X-Total-Count header"),
+    stream: Optional[str] = Query(None, pattern="^(ndjson|json)$", description="Stream the whole collection as NDJSON or a JSON array"),
+    batch_size: int = Query(DEFAULT_BATCH_SIZE, ge=1, le=MAX_BATCH_SIZE, description="Documents fetched and flushed per batch when streaming")
+):
+    if stream:
+        # Full dump for ETL: iterate the cursor instead of building the list
+        cursor = empcollection.find({}, build_projection(fields))
+        return stream_documents(cursor, stream, batch_size)
+    if include_total:
+        response.headers["X-Total-Count"] = str(crud.estimate_employee_count())
+    return _employees_response(response, {}, limit, after, fields)
 
 @router.get("/search")
-def searchemployees(q: str = Query(...)):
-    query = {
-        "$or": [
-            {"employee_id": {"$regex": q, "$options": "i"}},
-            {"name": {"$regex": q, "$options": "i"}},
-            {"email": {"$regex": q, "$options": "i"}},
-            {"department": {"$regex": q, "$options": "i"}},
-            {"position": {"$regex": q, "$options": "i"}}
-        ]
-    }
-    return list(empcollection.find(query, {"_id": 0}))
+def searchemployees(
+    q: str = Query(..., min_length=1, max_length=MAX_QUERY_LENGTH),
+    limit: int = Query(50, ge=1, le=MAX_PAGE_SIZE),
+    offset: int = Query(0, ge=0)
+):
+    # Best matches first: name > email > position > department / employee_id
+    return search_employees(empcollection, q, limit, offset)
 
 @router.get("/export")
 def export_employees(
@@ -47,33 +73,22 @@ def export_employees(
         raise HTTPException(status_code=400, detail="Invalid date format, use YYYY-MM-DD")
 
     # Query MongoDB using the correct field and sort ascending by join_date
-    employees = list(empcollection.find(
-        {"join_date": {"$gte": start_date, "$lte": end_date}},
-        {"_id": 0}
-    ).sort("join_date", 1))
+    cursor = empcollection.aggregate(
+        employee_pipeline({"join_date": {"$gte": start_date, "$lte": end_date}}, sort={"join_date": 1}),
+        batchSize=DEFAULT_BATCH_SIZE
+    )
 
-    if not employees:
+    first = next(cursor, None)
+    if first is None:
         raise HTTPException(status_code=404, detail="No employees found in given date range")
 
-    df = pd.DataFrame(employees)
-    buf = BytesIO()
-
-    if format == "xlsx":
-        df.to_excel(buf, index=False)
-        buf.seek(0)
-        return StreamingResponse(
-            buf,
-            media_type="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
-            headers={"Content-Disposition": f"attachment; filename=employees_export.xlsx"}
-        )
-    else:
-        df.to_csv(buf, index=False)
-        buf.seek(0)
-        return StreamingResponse(
-            buf,
-            media_type="text/csv",
-            headers={"Content-Disposition": f"attachment; filename=employees_export.csv"}
-        )
+    # Rows are rendered as the cursor is read, so columns come from the schema
+    return stream_table(
+        itertools.chain([first], cursor),
+        EXPORT_COLUMNS,
+        format,
+        f"employees_export.{format}"
+    )
 
 
 @router.get("/statistics")
@@ -90,8 +105,18 @@ def statistics():
     }
 
 @router.get("/department/{dept}")
-def get_employees_by_department(dept: str):
-    return crud.get_employees_by_department(dept)
+def get_employees_by_department(
+    dept: str,
+    response: Response,
+    limit: Optional[int] = Query(None, ge=1, le=MAX_PAGE_SIZE, description="Page size; omit for the full list"),
+    after: Optional[str] = Query(None, description="Continuation token from the X-Next-Cursor header"),
+    fields: Optional[str] = Query(None, description="Comma-separated fields to return"),
+    include_total: bool = Query(False, description="Add an X-Total-Count header")
+):
+    if include_total:
+        # Estimates only exist per collection; this count is served by the department index
+        response.headers["X-Total-Count"] = str(empcollection.count_documents({"department": dept, **crud.LISTED}))
+    return _employees_response(response, {"department": dept}, limit, after, fields)
 
 @router.post("/")
 def create_employee(employee: models.NewEmployee):
@@ -99,37 +124,122 @@ def create_employee(employee: models.NewEmployee):
     return {"message": "Employee added successfully"}
 
 @router.post("/bulk-import")
-def bulkimport(file: UploadFile = File(...)):
+def bulkimport(
+    background_tasks: BackgroundTasks,
+    file: UploadFile = File(...),
+    on_conflict: str = Query("skip", pattern="^(skip|update)$", description="Existing employee_ids: skip or overwrite"),
+    max_rows_per_second: int = Query(importer.IMPORT_MAX_ROWS_PER_SECOND, ge=0, description="Throttle; 0 for unlimited")
+):
+    if importer.detect_format(file.filename) is None:
+        raise HTTPException(status_code=400, detail="Unsupported file type")
     try:
-        if file.filename.endswith(".csv"):
-            df = pd.read_csv(BytesIO(file.file.read()))
-        elif file.filename.endswith(".xlsx"):
-            df = pd.read_excel(BytesIO(file.file.read()))
-        else:
-            raise HTTPException(status_code=400, detail="Unsupported file type")
-        
-        records = df.to_dict(orient="records")
-        if not records:
-            raise HTTPException(status_code=400, detail="No data found")
-        
-        employeeids = [rec.get("employee_id") for rec in records if rec.get("employee_id")]
-        existingids = set(
-            doc["employee_id"]
-            for doc in empcollection.find(
-                {"employee_id": {"$in": employeeids}}, {"employee_id": 1}
-            )
-        )
-        newrecords = [rec for rec in records if rec.get("employee_id") not in existingids]
-
-        if newrecords:
-            empcollection.insert_many(newrecords)
-
-        return {
-            "message": f"{len(newrecords)} new employees imported successfully",
-            "skipped": len(records) - len(newrecords)
-        }
+        # The upload is spooled to disk; parsing and writes happen in the background job
+        job = importer.create_job(file, on_conflict, max_rows_per_second)
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
+    background_tasks.add_task(importer.run_import, job["_id"])
+    return {
+        "message": "Import queued",
+        "job_id": job["_id"],
+        "status": job["status"]
+    }
+
+@router.get("/bulk-import")
+def list_import_jobs(limit: int = Query(50, ge=1, le=500)):
+    # Newest first, without the per-row error lists
+    return importer.list_jobs(limit)
+
+@router.get("/bulk-import/{job_id}")
+def get_import_job(job_id: str):
+    job = importer.get_job(job_id)
+    if not job:
+        raise HTTPException(status_code=404, detail="Import job not found")
+    return job
+
+@router.post("/bulk-import/{job_id}/cancel")
+def cancel_import_job(job_id: str):
+    job = importer.request_cancel(job_id)
+    if not job:
+        raise HTTPException(status_code=409, detail="Import job not found or not running")
+    return {"message": "Cancellation requested", "job_id": job_id, "checkpoint": job["checkpoint"]}
+
+@router.post("/bulk-import/{job_id}/resume")
+def resume_import_job(job_id: str, background_tasks: BackgroundTasks):
+    job = importer.get_job(job_id)
+    if not job:
+        raise HTTPException(status_code=404, detail="Import job not found")
+    if not os.path.exists(job["file_path"]):
+        raise HTTPException(status_code=410, detail="Import file is no longer available")
+    job = importer.request_resume(job_id)
+    if not job:
+        raise HTTPException(status_code=409, detail="Import job is not resumable")
+    background_tasks.add_task(importer.run_import, job_id)
+    return {"message": "Import resumed", "job_id": job_id, "checkpoint": job["checkpoint"]}
+
+@router.post("/bulk")
+async def bulk_operations(
+    request: Request,
+    batch_size: int = Query(bulk_ops.DEFAULT_BATCH_SIZE, ge=1, le=bulk_ops.MAX_BATCH_SIZE),
+    errors_only: bool = Query(False, description="Only return results for failed or unmatched operations")
+):
+    """NDJSON body of insert/update/upsert/delete operations, applied in unordered batches"""
+    started = time.monotonic()
+    results = []
+    batches = 0
+    operations = 0
+    builder = bulk_ops.BatchBuilder(batch_size)
+
+    async def run(batch):
+        nonlocal batches
+        if batch:
+            batches += 1
+            # bulk_write and the snapshot updates are blocking; keep them off the event loop
+            results.extend(await asyncio.to_thread(bulk_ops.execute_batch, batch))
+
+    async def handle(line_number, line):
+        nonlocal operations
+        if not line.strip():
+            return
+        operations += 1
+        try:
+            operation = bulk_ops.parse_operation(line)
+        except bulk_ops.OperationError as e:
+            results.append({"line": line_number, "status": "error", "error": str(e)})
+            return
+        await run(builder.add(line_number, operation))
+
+    # Parse the body as it arrives instead of buffering the whole request
+    pending = b""
+    line_number = 0
+    async for chunk in request.stream():
+        pending += chunk
+        *lines, pending = pending.split(b"\n")
+        if len(pending) > bulk_ops.MAX_LINE_BYTES:
+            raise HTTPException(status_code=413, detail=f"Line {line_number + len(lines) + 1} exceeds {bulk_ops.MAX_LINE_BYTES} bytes")
+        for line in lines:
+            line_number += 1
+            await handle(line_number, line)
+    if pending:
+        line_number += 1
+        await handle(line_number, pending)
+    await run(builder.flush())
+
+    if not operations:
+        raise HTTPException(status_code=400, detail="No operations found")
+
+    results.sort(key=lambda result: result["line"])
+    summary = {}
+    for result in results:
+        summary[result["status"]] = summary.get(result["status"], 0) + 1
+    elapsed = time.monotonic() - started
+    return {
+        "operations": len(results),
+        "batches": batches,
+        "summary": summary,
+        "duration_seconds": round(elapsed, 3),
+        "operations_per_second": round(len(results) / elapsed, 1) if elapsed else None,
+        "results": [r for r in results if r["status"] in ("error", "not_found")] if errors_only else results
+    }
 
 @router.post("/bulk-update")
 def bulk_update(data: Dict[str, Any]):
@@ -137,18 +247,26 @@ def bulk_update(data: Dict[str, Any]):
     updates = data.get("updates")
     if not ids or not updates:
         raise HTTPException(status_code=400, detail="Provide employee_ids and updates")
-    res = empcollection.update_many({"employee_id": {"$in": ids}}, {"$set": updates})
+    before = snapshots.load_before({"employee_id": {"$in": ids}})
+    res = empcollection.update_many({"employee_id": {"$in": ids}}, search_update(updates))
+    if res.modified_count:
+        snapshots.apply_update(before, updates)
+        employees_changed()
     return {"matched": res.matched_count, "modified": res.modified_count}
 
 @router.delete("/bulk-delete")
 def bulk_delete(ids: List[str] = Query(...)):
+    before = snapshots.load_before({"employee_id": {"$in": ids}})
     res = empcollection.delete_many({"employee_id": {"$in": ids}})
+    if res.deleted_count:
+        snapshots.apply_delete(before)
+        employees_changed()
     return {"deleted": res.deleted_count}
 
 def get_employee_by_id(employee_id: str):
     return empcollection.find_one(
         {"employee_id": {"$regex": f"^{employee_id}$", "$options": "i"}}, 
-        {"_id": 0}
+        EMPLOYEE_PROJECTION
     )
 
 
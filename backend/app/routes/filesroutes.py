@@ -1,16 +1,14 @@
-from fastapi import APIRouter, UploadFile, File, HTTPException, Form
+from fastapi import APIRouter, UploadFile, File, HTTPException, Form, Depends
 from fastapi.responses import FileResponse
 from pathlib import Path
 import uuid
 import os
 from datetime import datetime
 from typing import List
-from ..database import get_database
+from pymongo.asynchronous.database import AsyncDatabase
+from ..database import get_async_database
 
 router = APIRouter(prefix="/files", tags=["File Management"])
-db = get_database()
-files_collection = db["files"]
-employee_files_collection = db["employee_files"]
 
 # Define directories
 UPLOAD_DIRECTORY = Path("uploaded_files")
@@ -19,7 +17,7 @@ UPLOAD_DIRECTORY.mkdir(exist_ok=True)
 EMPLOYEE_FILES_DIRECTORY.mkdir(exist_ok=True)
 
 @router.post("/upload")
-async def upload_file(file: UploadFile = File(...)):
+async def upload_file(file: UploadFile = File(...), db: AsyncDatabase = Depends(get_async_database)):
     try:
         # Validate file
         if not file.filename:
@@ -47,7 +45,7 @@ async def upload_file(file: UploadFile = File(...)):
             "mime_type": file.content_type,
             "uploaded_at": datetime.utcnow().isoformat()
         }
-        files_collection.insert_one(file_metadata)
+        await db["files"].insert_one(file_metadata)
         
         return {
             "filename": file.filename, 
@@ -64,7 +62,8 @@ async def upload_file(file: UploadFile = File(...)):
 @router.post("/upload-employee-files")
 async def upload_employee_files(
     employee_id: str = Form(...),
-    files: List[UploadFile] = File(...)
+    files: List[UploadFile] = File(...),
+    db: AsyncDatabase = Depends(get_async_database)
 ):
     try:
         if not files or len(files) == 0:
@@ -108,11 +107,11 @@ async def upload_employee_files(
             raise HTTPException(status_code=400, detail="No valid files to upload")
         
         # Check if employee already has files record
-        existing_record = employee_files_collection.find_one({"employee_id": employee_id})
+        existing_record = await db["employee_files"].find_one({"employee_id": employee_id})
         
         if existing_record:
             # Add files to existing record
-            employee_files_collection.update_one(
+            await db["employee_files"].update_one(
                 {"employee_id": employee_id},
                 {"$push": {"files": {"$each": uploaded_files}}}
             )
@@ -124,7 +123,7 @@ async def upload_employee_files(
                 "created_at": datetime.utcnow().isoformat(),
                 "updated_at": datetime.utcnow().isoformat()
             }
-            employee_files_collection.insert_one(employee_file_record)
+            await db["employee_files"].insert_one(employee_file_record)
         
         return {
             "message": f"{len(uploaded_files)} files uploaded successfully for employee {employee_id}",
@@ -142,9 +141,9 @@ async def upload_employee_files(
         raise HTTPException(status_code=500, detail=f"File upload failed: {str(e)}")
 
 @router.get("/employee-files")
-async def list_employee_files():
+async def list_employee_files(db: AsyncDatabase = Depends(get_async_database)):
     try:
-        employee_files = list(employee_files_collection.find({}))
+        employee_files = await db["employee_files"].find({}).to_list(None)
         
         # Convert ObjectId to string and clean up file paths
         for record in employee_files:
@@ -158,9 +157,9 @@ async def list_employee_files():
         raise HTTPException(status_code=500, detail=f"Failed to fetch employee files: {str(e)}")
 
 @router.get("/employee-files/{employee_id}")
-async def get_employee_files(employee_id: str):
+async def get_employee_files(employee_id: str, db: AsyncDatabase = Depends(get_async_database)):
     try:
-        employee_files = employee_files_collection.find_one({"employee_id": employee_id})
+        employee_files = await db["employee_files"].find_one({"employee_id": employee_id})
         
         if not employee_files:
             raise HTTPException(status_code=404, detail="No files found for this employee")
@@ -177,9 +176,9 @@ async def get_employee_files(employee_id: str):
         raise HTTPException(status_code=500, detail=f"Failed to fetch employee files: {str(e)}")
 
 @router.get("/employee-files/{employee_id}/{file_id}")
-async def download_employee_file(employee_id: str, file_id: str):
+async def download_employee_file(employee_id: str, file_id: str, db: AsyncDatabase = Depends(get_async_database)):
     try:
-        employee_files = employee_files_collection.find_one({"employee_id": employee_id})
+        employee_files = await db["employee_files"].find_one({"employee_id": employee_id})
         
         if not employee_files:
             raise HTTPException(status_code=404, detail="Employee not found")
@@ -198,7 +197,7 @@ async def download_employee_file(employee_id: str, file_id: str):
         
         if not file_path.is_file():
             # File exists in database but not on disk - clean up database entry
-            employee_files_collection.update_one(
+            await db["employee_files"].update_one(
                 {"employee_id": employee_id},
                 {"$pull": {"files": {"file_id": file_id}}}
             )
@@ -216,9 +215,9 @@ async def download_employee_file(employee_id: str, file_id: str):
         raise HTTPException(status_code=500, detail=f"Failed to download file: {str(e)}")
 
 @router.delete("/employee-files/{employee_id}/{file_id}")
-async def delete_employee_file(employee_id: str, file_id: str):
+async def delete_employee_file(employee_id: str, file_id: str, db: AsyncDatabase = Depends(get_async_database)):
     try:
-        employee_files = employee_files_collection.find_one({"employee_id": employee_id})
+        employee_files = await db["employee_files"].find_one({"employee_id": employee_id})
         
         if not employee_files:
             raise HTTPException(status_code=404, detail="Employee not found")
@@ -239,7 +238,7 @@ async def delete_employee_file(employee_id: str, file_id: str):
             os.remove(file_path)
         
         # Remove file from database
-        result = employee_files_collection.update_one(
+        result = await db["employee_files"].update_one(
             {"employee_id": employee_id},
             {"$pull": {"files": {"file_id": file_id}}}
         )
@@ -248,9 +247,9 @@ async def delete_employee_file(employee_id: str, file_id: str):
             raise HTTPException(status_code=404, detail="File not found in database")
         
         # If this was the last file for the employee, optionally remove the employee record
-        updated_employee_files = employee_files_collection.find_one({"employee_id": employee_id})
+        updated_employee_files = await db["employee_files"].find_one({"employee_id": employee_id})
         if updated_employee_files and len(updated_employee_files['files']) == 0:
-            employee_files_collection.delete_one({"employee_id": employee_id})
+            await db["employee_files"].delete_one({"employee_id": employee_id})
             # Also try to remove the employee directory if it's empty
             employee_dir = EMPLOYEE_FILES_DIRECTORY / employee_id
             try:
@@ -267,9 +266,9 @@ async def delete_employee_file(employee_id: str, file_id: str):
         raise HTTPException(status_code=500, detail=f"Failed to delete file: {str(e)}")
 
 @router.get("/list")
-async def list_files():
+async def list_files(db: AsyncDatabase = Depends(get_async_database)):
     try:
-        files = list(files_collection.find({}, {"filepath": 0}))  # Exclude filepath for security
+        files = await db["files"].find({}, {"filepath": 0}).to_list(None)  # Exclude filepath for security
         # Convert ObjectId to string for JSON serialization
         for file in files:
             file['id'] = str(file.pop('_id'))
@@ -278,9 +277,9 @@ async def list_files():
         raise HTTPException(status_code=500, detail=f"Failed to fetch files: {str(e)}")
 
 @router.get("/{file_id}")
-async def get_file(file_id: str):
+async def get_file(file_id: str, db: AsyncDatabase = Depends(get_async_database)):
     try:
-        file_data = files_collection.find_one({"_id": file_id})
+        file_data = await db["files"].find_one({"_id": file_id})
         
         if not file_data:
             raise HTTPException(status_code=404, detail="File not found.")
@@ -289,7 +288,7 @@ async def get_file(file_id: str):
         
         if not file_path.is_file():
             # File exists in database but not on disk - clean up database entry
-            files_collection.delete_one({"_id": file_id})
+            await db["files"].delete_one({"_id": file_id})
             raise HTTPException(status_code=404, detail="File not found on server.")
         
         return FileResponse(
@@ -303,9 +302,9 @@ async def get_file(file_id: str):
         raise HTTPException(status_code=500, detail=f"Failed to retrieve file: {str(e)}")
 
 @router.delete("/{file_id}")
-async def delete_file(file_id: str):
+async def delete_file(file_id: str, db: AsyncDatabase = Depends(get_async_database)):
     try:
-        file_data = files_collection.find_one({"_id": file_id})
+        file_data = await db["files"].find_one({"_id": file_id})
         if not file_data:
             raise HTTPException(status_code=404, detail="File not found.")
         
@@ -315,7 +314,7 @@ async def delete_file(file_id: str):
             os.remove(file_path)
         
         # Delete database record
-        result = files_collection.delete_one({"_id": file_id})
+        result = await db["files"].delete_one({"_id": file_id})
         
         if result.deleted_count == 0:
             raise HTTPException(status_code=404, detail="File not found in database.")
@@ -327,10 +326,10 @@ async def delete_file(file_id: str):
         raise HTTPException(status_code=500, detail=f"Failed to delete file: {str(e)}")
 
 @router.get("/{file_id}/info")
-async def get_file_info(file_id: str):
+async def get_file_info(file_id: str, db: AsyncDatabase = Depends(get_async_database)):
     """Get file metadata without downloading the file"""
     try:
-        file_data = files_collection.find_one({"_id": file_id}, {"filepath": 0})
+        file_data = await db["files"].find_one({"_id": file_id}, {"filepath": 0})
         if not file_data:
             raise HTTPException(status_code=404, detail="File not found.")
         
@@ -343,10 +342,10 @@ async def get_file_info(file_id: str):
 
 # Bulk operations for employee files
 @router.delete("/employee-files/{employee_id}")
-async def delete_all_employee_files(employee_id: str):
+async def delete_all_employee_files(employee_id: str, db: AsyncDatabase = Depends(get_async_database)):
     """Delete all files for a specific employee"""
     try:
-        employee_files = employee_files_collection.find_one({"employee_id": employee_id})
+        employee_files = await db["employee_files"].find_one({"employee_id": employee_id})
         
         if not employee_files:
             raise HTTPException(status_code=404, detail="Employee not found")
@@ -358,7 +357,7 @@ async def delete_all_employee_files(employee_id: str):
                 os.remove(file_path)
         
         # Delete database record
-        result = employee_files_collection.delete_one({"employee_id": employee_id})
+        result = await db["employee_files"].delete_one({"employee_id": employee_id})
         
         if result.deleted_count == 0:
             raise HTTPException(status_code=404, detail="Employee files not found in database")
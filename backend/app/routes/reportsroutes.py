@@ -2,21 +2,29 @@ from fastapi import APIRouter, HTTPException, BackgroundTasks, Depends
 from fastapi.responses import FileResponse
 from typing import List, Dict, Any, Optional
 from pydantic import BaseModel
+import asyncio
 import uuid
 import os
-import pandas as pd
-from datetime import datetime, timedelta
+from datetime import datetime
 from pathlib import Path
-from ..database import get_database
+from pymongo.asynchronous.database import AsyncDatabase
+from ..database import get_database, get_async_database
+from ..data_version import employees_version_async
+from ..report_cache import find_reusable, report_cache_key
+from ..report_aggregates import MongoReportData
+from ..report_queue import REPORT_EXECUTION, job_filter, queue_fields, queue_stats
+from ..report_scheduler import next_run_after
 from ..excel_generator import (
     generate_comprehensive_report, 
     generate_performance_report,
     generate_salary_report,
     generate_department_report,
-    generate_executive_report
+    generate_executive_report,
+    TEMPLATE_SUMMARIES
 )
 
 router = APIRouter(prefix="/reports", tags=["Reporting System"])
+# Blocking handles for the background generation task; routes use get_async_database
 db = get_database()
 employees_collection = db["employees"]
 reports_collection = db["reports"]
@@ -65,6 +73,7 @@ class ReportGenerationRequest(BaseModel):
     filters: Optional[Dict[str, Any]] = None
     scheduling: Optional[Dict[str, Any]] = None
     email_recipients: Optional[List[str]] = None
+    priority: int = 0  # higher runs first
 
 class ReportShareRequest(BaseModel):
     recipients: List[str]
@@ -88,12 +97,13 @@ async def get_report_templates():
         for template in report_templates
     ]
 
-def _generate_report_task(report_id: str, template_id: str, filters: Optional[Dict[str, Any]]):
+def _generate_report_task(report_id: str, template_id: str, filters: Optional[Dict[str, Any]],
+                          worker_id: Optional[str] = None):
     """Background task to generate report"""
     try:
         # Update status to generating
         reports_collection.update_one(
-            {"_id": report_id},
+            job_filter(report_id, worker_id),
             {"$set": {
                 "status": "Generating",
                 "updated_at": datetime.utcnow().isoformat()
@@ -105,14 +115,13 @@ def _generate_report_task(report_id: str, template_id: str, filters: Optional[Di
         if not template:
             raise Exception("Template not found")
 
-        # Fetch employees data with filters
-        query = filters or {}
-        employees_cursor = employees_collection.find(query)
-        employees = list(employees_cursor)
+        # Summaries are computed by MongoDB; employee rows are only loaded for sheets listing them
+        generator_func = template["generator"]
+        data = MongoReportData(employees_collection, filters or {}, TEMPLATE_SUMMARIES.get(generator_func, ()))
 
-        if not employees:
+        if data.total == 0:
             reports_collection.update_one(
-                {"_id": report_id},
+                job_filter(report_id, worker_id),
                 {"$set": {
                     "status": "Failed", 
                     "message": "No employee data found for the specified criteria.",
@@ -121,18 +130,6 @@ def _generate_report_task(report_id: str, template_id: str, filters: Optional[Di
             )
             return
 
-        # Convert to DataFrame and clean data
-        df = pd.DataFrame(employees)
-        
-        # Remove MongoDB _id field if present
-        if '_id' in df.columns:
-            df = df.drop(columns=['_id'])
-        
-        # Handle list columns by converting to strings
-        for col in df.columns:
-            if df[col].apply(lambda x: isinstance(x, list)).any():
-                df[col] = df[col].apply(lambda x: ", ".join(map(str, x)) if isinstance(x, list) else x)
-
         # Generate unique filename
         timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
         filename = f"{template['name'].replace(' ', '_').lower()}_{timestamp}.xlsx"
@@ -140,8 +137,7 @@ def _generate_report_task(report_id: str, template_id: str, filters: Optional[Di
 
         # Generate the Excel file using the appropriate generator
         try:
-            generator_func = template["generator"]
-            final_path = generator_func(df, str(filepath))
+            final_path = generator_func(data, str(filepath))
             
             # Verify file was created
             if not Path(final_path).exists():
@@ -152,7 +148,7 @@ def _generate_report_task(report_id: str, template_id: str, filters: Optional[Di
 
         # Update database with completion
         reports_collection.update_one(
-            {"_id": report_id},
+            job_filter(report_id, worker_id),
             {"$set": {
                 "status": "Completed",
                 "file_path": str(final_path),
@@ -164,18 +160,39 @@ def _generate_report_task(report_id: str, template_id: str, filters: Optional[Di
         )
 
     except Exception as e:
-        # Update status to failed
+        # Update status to failed; report workers retry these, unlike "no data" failures
         reports_collection.update_one(
-            {"_id": report_id},
+            job_filter(report_id, worker_id),
             {"$set": {
                 "status": "Failed", 
                 "message": str(e),
+                "retryable": True,
                 "updated_at": datetime.utcnow().isoformat()
             }}
         )
 
+def _template_cache_key(template_id: str, filters: Optional[Dict[str, Any]], data_version: int) -> str:
+    return report_cache_key("template", {"template_id": template_id, "filters": filters}, data_version)
+
+def _report_document(template: Dict[str, Any], filters: Optional[Dict[str, Any]], priority: int,
+                     cache_key: str, data_version: int) -> Dict[str, Any]:
+    """A new queued `reports` document; shared with the report scheduler"""
+    now = datetime.utcnow().isoformat()
+    return {
+        "_id": str(uuid.uuid4()),
+        "template_id": template["id"],
+        "template_name": template["name"],
+        "status": "Queued",
+        "filters": filters,
+        "cache_key": cache_key,
+        "data_version": data_version,
+        "created_at": now,
+        "updated_at": now,
+        **queue_fields(priority)
+    }
+
 @router.post("/generate")
-async def generate_report(request: ReportGenerationRequest, background_tasks: BackgroundTasks):
+async def generate_report(request: ReportGenerationRequest, background_tasks: BackgroundTasks, db: AsyncDatabase = Depends(get_async_database)):
     """Generate a new report based on template"""
     try:
         # Validate template exists
@@ -183,29 +200,37 @@ async def generate_report(request: ReportGenerationRequest, background_tasks: Ba
         if not template:
             raise HTTPException(status_code=400, detail="Invalid template ID")
 
+        # Same template and filters over unchanged employee data: hand back that report
+        data_version = await employees_version_async(db)
+        cache_key = _template_cache_key(request.template_id, request.filters, data_version)
+        existing = await find_reusable(db, "reports", cache_key)
+        if existing:
+            return {
+                "message": "An identical report is already available." if existing["status"] == "Completed"
+                           else "An identical report is already being generated.",
+                "report_id": existing["_id"],
+                "template_name": template["name"],
+                "status": existing["status"],
+                "cached": True
+            }
+
         # Create report record
-        report_id = str(uuid.uuid4())
-        report_data = {
-            "_id": report_id,
-            "template_id": request.template_id,
-            "template_name": template["name"],
-            "status": "Queued",
-            "filters": request.filters,
-            "created_at": datetime.utcnow().isoformat(),
-            "updated_at": datetime.utcnow().isoformat()
-        }
-        
-        result = reports_collection.insert_one(report_data)
+        report_data = _report_document(template, request.filters, request.priority, cache_key, data_version)
+        report_id = report_data["_id"]
+        result = await db["reports"].insert_one(report_data)
         if not result.inserted_id:
             raise HTTPException(status_code=500, detail="Failed to create report record")
 
-        # Start background task
-        background_tasks.add_task(_generate_report_task, report_id, request.template_id, request.filters)
+        # Report workers pick up the queued document; inline mode keeps generation in this process
+        if REPORT_EXECUTION == "inline":
+            background_tasks.add_task(_generate_report_task, report_id, request.template_id, request.filters)
 
         return {
             "message": "Report generation has been queued successfully.", 
             "report_id": report_id,
-            "template_name": template["name"]
+            "template_name": template["name"],
+            "status": "Queued",
+            "cached": False
         }
         
     except HTTPException:
@@ -214,11 +239,11 @@ async def generate_report(request: ReportGenerationRequest, background_tasks: Ba
         raise HTTPException(status_code=500, detail=f"Failed to queue report generation: {str(e)}")
 
 @router.get("/history")
-async def get_report_history():
+async def get_report_history(db: AsyncDatabase = Depends(get_async_database)):
     """Get all report generation history"""
     try:
         # Get reports sorted by creation date (newest first)
-        history = list(reports_collection.find().sort("created_at", -1))
+        history = await db["reports"].find().sort("created_at", -1).to_list(None)
         
         # Add template names for reports that might not have them
         for report in history:
@@ -232,10 +257,10 @@ async def get_report_history():
         raise HTTPException(status_code=500, detail=f"Failed to fetch report history: {str(e)}")
 
 @router.get("/{report_id}/status")
-async def get_report_status(report_id: str):
+async def get_report_status(report_id: str, db: AsyncDatabase = Depends(get_async_database)):
     """Get status of a specific report"""
     try:
-        report = reports_collection.find_one({"_id": report_id})
+        report = await db["reports"].find_one({"_id": report_id})
         if not report:
             raise HTTPException(status_code=404, detail="Report not found.")
         return report
@@ -245,10 +270,10 @@ async def get_report_status(report_id: str):
         raise HTTPException(status_code=500, detail=f"Failed to get report status: {str(e)}")
 
 @router.get("/{report_id}/download")
-async def download_report(report_id: str):
+async def download_report(report_id: str, db: AsyncDatabase = Depends(get_async_database)):
     """Download a completed report"""
     try:
-        report = reports_collection.find_one({"_id": report_id})
+        report = await db["reports"].find_one({"_id": report_id})
         if not report:
             raise HTTPException(status_code=404, detail="Report not found.")
         
@@ -261,7 +286,7 @@ async def download_report(report_id: str):
         file_path = Path(report["file_path"])
         if not file_path.exists():
             # File missing - mark report as failed
-            reports_collection.update_one(
+            await db["reports"].update_one(
                 {"_id": report_id},
                 {"$set": {
                     "status": "Failed",
@@ -282,10 +307,10 @@ async def download_report(report_id: str):
         raise HTTPException(status_code=500, detail=f"Failed to download report: {str(e)}")
 
 @router.delete("/{report_id}")
-async def delete_report(report_id: str):
+async def delete_report(report_id: str, db: AsyncDatabase = Depends(get_async_database)):
     """Delete a report and its associated file"""
     try:
-        report = reports_collection.find_one({"_id": report_id})
+        report = await db["reports"].find_one({"_id": report_id})
         if not report:
             raise HTTPException(status_code=404, detail="Report not found.")
         
@@ -299,7 +324,7 @@ async def delete_report(report_id: str):
                 print(f"Warning: Failed to delete report file {file_path}: {e}")
 
         # Delete the document from the database
-        result = reports_collection.delete_one({"_id": report_id})
+        result = await db["reports"].delete_one({"_id": report_id})
         if result.deleted_count == 0:
             raise HTTPException(status_code=404, detail="Report not found in database.")
         
@@ -310,7 +335,7 @@ async def delete_report(report_id: str):
         raise HTTPException(status_code=500, detail=f"Failed to delete report: {str(e)}")
 
 @router.post("/schedule")
-async def schedule_report(request: ReportScheduleRequest):
+async def schedule_report(request: ReportScheduleRequest, db: AsyncDatabase = Depends(get_async_database)):
     """Schedule recurring report generation"""
     try:
         # Validate template exists
@@ -326,14 +351,9 @@ async def schedule_report(request: ReportScheduleRequest):
         # Create schedule record
         schedule_id = str(uuid.uuid4())
         
-        # Calculate next run time based on frequency
+        # Calculate next run time based on frequency; `python -m app.report_scheduler` runs it
         now = datetime.utcnow()
-        if request.frequency == 'daily':
-            next_run = now + timedelta(days=1)
-        elif request.frequency == 'weekly':
-            next_run = now + timedelta(weeks=1)
-        elif request.frequency == 'monthly':
-            next_run = now + timedelta(days=30)
+        next_run = next_run_after(now, request.frequency)
         
         schedule_data = {
             "_id": schedule_id,
@@ -344,13 +364,15 @@ async def schedule_report(request: ReportScheduleRequest):
             "filters": request.filters,
             "is_active": True,
             "next_run": next_run.isoformat(),
+            # monthly runs stay on this day of the month (clamped in shorter months)
+            "anchor_day": now.day,
             "created_at": now.isoformat(),
             "updated_at": now.isoformat()
         }
         
         # Store in a schedules collection
         schedules_collection = db["report_schedules"]
-        result = schedules_collection.insert_one(schedule_data)
+        result = await schedules_collection.insert_one(schedule_data)
         
         if not result.inserted_id:
             raise HTTPException(status_code=500, detail="Failed to create schedule")
@@ -369,10 +391,10 @@ async def schedule_report(request: ReportScheduleRequest):
         raise HTTPException(status_code=500, detail=f"Failed to schedule report: {str(e)}")
 
 @router.put("/{report_id}/share")
-async def share_report(report_id: str, request: ReportShareRequest):
+async def share_report(report_id: str, request: ReportShareRequest, db: AsyncDatabase = Depends(get_async_database)):
     """Share a report with specified recipients"""
     try:
-        report = reports_collection.find_one({"_id": report_id})
+        report = await db["reports"].find_one({"_id": report_id})
         if not report:
             raise HTTPException(status_code=404, detail="Report not found.")
         
@@ -386,7 +408,7 @@ async def share_report(report_id: str, request: ReportShareRequest):
             "updated_at": datetime.utcnow().isoformat()
         }
         
-        reports_collection.update_one(
+        await db["reports"].update_one(
             {"_id": report_id},
             {"$set": share_data}
         )
@@ -406,22 +428,30 @@ async def share_report(report_id: str, request: ReportShareRequest):
         raise HTTPException(status_code=500, detail=f"Failed to share report: {str(e)}")
 
 # Additional utility endpoints
+@router.get("/queue-stats")
+async def get_report_queue_stats():
+    """Queued and in-progress jobs waiting on the report workers"""
+    try:
+        return await asyncio.to_thread(queue_stats)
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Failed to fetch report queue stats: {str(e)}")
+
 @router.get("/schedules")
-async def get_scheduled_reports():
+async def get_scheduled_reports(db: AsyncDatabase = Depends(get_async_database)):
     """Get all scheduled reports"""
     try:
         schedules_collection = db["report_schedules"]
-        schedules = list(schedules_collection.find().sort("created_at", -1))
+        schedules = await schedules_collection.find().sort("created_at", -1).to_list(None)
         return schedules
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Failed to fetch scheduled reports: {str(e)}")
 
 @router.delete("/schedules/{schedule_id}")
-async def delete_scheduled_report(schedule_id: str):
+async def delete_scheduled_report(schedule_id: str, db: AsyncDatabase = Depends(get_async_database)):
     """Delete a scheduled report"""
     try:
         schedules_collection = db["report_schedules"]
-        result = schedules_collection.delete_one({"_id": schedule_id})
+        result = await schedules_collection.delete_one({"_id": schedule_id})
         
         if result.deleted_count == 0:
             raise HTTPException(status_code=404, detail="Scheduled report not found.")
@@ -0,0 +1,166 @@
+import re
+import string
+from typing import Any, Dict, List
+from pymongo.errors import OperationFailure
+
+# Text index weights; also used to rank prefix matches so both paths agree on name > email > position
+SEARCH_WEIGHTS = {
+    "name": 10,
+    "email": 5,
+    "position": 3,
+    "department": 2,
+    "employee_id": 2
+}
+TEXT_INDEX_NAME = "employee_search"
+MAX_QUERY_LENGTH = 100
+MAX_TERMS = 8
+
+# Lower-cased word tokens of the SEARCH_WEIGHTS fields, stored on every employee so
+# word prefixes are served by an anchored, case-sensitive regex on its index. Tokens
+# are ASCII-only because the server's $toLower is; search_tokens() and
+# SEARCH_TOKENS_EXPRESSION must produce the same array.
+SEARCH_TOKENS_FIELD = "search_tokens"
+TOKEN_PATTERN = "[a-z0-9_]+"
+# Projection for employee documents returned to clients
+EMPLOYEE_PROJECTION = {"_id": 0, SEARCH_TOKENS_FIELD: 0}
+
+_TERM = re.compile(r"\w+", re.UNICODE)
+_TOKEN = re.compile(TOKEN_PATTERN)
+_ASCII_LOWER = str.maketrans(string.ascii_uppercase, string.ascii_lowercase)
+
+
+def normalize_terms(q: str) -> List[str]:
+    """Lower-cased word terms of a raw query, de-duplicated; punctuation and operators are dropped"""
+    terms = []
+    for term in _TERM.findall(q[:MAX_QUERY_LENGTH].lower()):
+        if term not in terms:
+            terms.append(term)
+    return terms[:MAX_TERMS]
+
+
+def _tokens(value: Any) -> List[str]:
+    return _TOKEN.findall(value.translate(_ASCII_LOWER)) if isinstance(value, str) else []
+
+
+def search_tokens(document: Dict[str, Any]) -> List[str]:
+    """The stored search_tokens of an employee document"""
+    return sorted({token for field in SEARCH_WEIGHTS for token in _tokens(document.get(field))})
+
+
+def with_search_tokens(document: Dict[str, Any]) -> Dict[str, Any]:
+    """Copy of a whole employee document ready to insert"""
+    return {**document, SEARCH_TOKENS_FIELD: search_tokens(document)}
+
+
+def _field_tokens(field: str) -> Dict[str, Any]:
+    """Aggregation expression: search tokens of one field"""
+    value = f"${field}"
+    return {"$map": {
+        "input": {"$regexFindAll": {
+            "input": {"$cond": [{"$eq": [{"$type": value}, "string"]}, {"$toLower": value}, ""]},
+            "regex": TOKEN_PATTERN
+        }},
+        "as": "found",
+        "in": "$$found.match"
+    }}
+
+
+SEARCH_TOKENS_EXPRESSION = {"$setUnion": [_field_tokens(field) for field in SEARCH_WEIGHTS]}
+
+
+def search_update(updates: Dict[str, Any]) -> List[Dict[str, Any]]:
+    """
+    Update pipeline equivalent to {"$set": updates} that also refreshes search_tokens
+    from the updated document, for writes that don't carry every searchable field.
+    """
+    pipeline = [{"$set": {field: {"$literal": value} for field, value in updates.items()}}] if updates else []
+    pipeline.append({"$set": {SEARCH_TOKENS_FIELD: SEARCH_TOKENS_EXPRESSION}})
+    return pipeline
+
+
+def build_text_query(terms: List[str]) -> Dict[str, Any]:
+    # Terms are \w+ only, so they can't carry $text phrase ("...") or negation (-) syntax
+    return {"$text": {"$search": " ".join(terms)}}
+
+
+def prefix_tokens(terms: List[str]) -> List[str]:
+    """Query terms split the way search_tokens splits field values"""
+    tokens = []
+    for term in terms:
+        tokens.extend(token for token in _tokens(term) if token not in tokens)
+    return tokens
+
+
+def build_prefix_query(tokens: List[str]) -> Dict[str, Any]:
+    """Any token may start a stored token, matching $text's any-term semantics; each clause is an index range"""
+    clauses = [{SEARCH_TOKENS_FIELD: {"$regex": f"^{re.escape(token)}"}} for token in tokens]
+    return clauses[0] if len(clauses) == 1 else {"$or": clauses}
+
+
+def _prefix_score(tokens: List[str]) -> Dict[str, Any]:
+    """Field-weighted score: whole-word matches count fully, word prefixes count half"""
+    scores = []
+    for field, weight in SEARCH_WEIGHTS.items():
+        for token in tokens:
+            starts_word = {"$anyElementTrue": [{"$map": {
+                "input": f"$${field}",
+                "as": "word",
+                "in": {"$eq": [{"$indexOfCP": ["$$word", token]}, 0]}
+            }}]}
+            scores.append({"$cond": [
+                {"$in": [token, f"$${field}"]}, weight,
+                {"$cond": [starts_word, weight / 2, 0]}
+            ]})
+    return {"$let": {"vars": {field: _field_tokens(field) for field in SEARCH_WEIGHTS}, "in": {"$add": scores}}}
+
+
+def build_prefix_pipeline(tokens: List[str], limit: int, offset: int) -> List[Dict[str, Any]]:
+    """Prefix matches ranked with SEARCH_WEIGHTS, paged on the server"""
+    return [
+        {"$match": build_prefix_query(tokens)},
+        {"$set": {"_score": _prefix_score(tokens)}},
+        {"$sort": {"_score": -1, "name": 1, "employee_id": 1}},
+        {"$skip": offset},
+        {"$limit": limit},
+        {"$project": {**EMPLOYEE_PROJECTION, "_score": 0}}
+    ]
+
+
+def _text_search(collection, terms: List[str], limit: int, offset: int) -> List[Dict[str, Any]]:
+    cursor = collection.find(
+        build_text_query(terms),
+        {**EMPLOYEE_PROJECTION, "_score": {"$meta": "textScore"}}
+    ).sort([("_score", {"$meta": "textScore"}), ("employee_id", 1)]).skip(offset).limit(limit)
+    results = list(cursor)
+    for document in results:
+        document.pop("_score", None)
+    return results
+
+
+def _prefix_search(collection, terms: List[str], limit: int, offset: int) -> List[Dict[str, Any]]:
+    tokens = prefix_tokens(terms)
+    if not tokens:
+        return []
+    return list(collection.aggregate(build_prefix_pipeline(tokens, limit, offset)))
+
+
+def search_employees(collection, q: str, limit: int = 50, offset: int = 0) -> List[Dict[str, Any]]:
+    """
+    Ranked employee search. Whole words go through the weighted text index; when that finds
+    nothing (typically a half-typed word from the search box) we fall back to word-prefix
+    matching on the stored search tokens, ranked with the same weights. Both paths match
+    any of the terms.
+    """
+    terms = normalize_terms(q)
+    if not terms:
+        return []
+    try:
+        results = _text_search(collection, terms, limit, offset)
+        # Past the last text page: stay on the text path if it matched anything at all,
+        # so pages of one query never switch strategies midway
+        if results or (offset > 0 and collection.find_one(build_text_query(terms), {"_id": 1})):
+            return results
+    except OperationFailure as e:
+        # Text index not built yet (see app/indexes.py)
+        print(f"Warning: Text search unavailable, using prefix search: {e}")
+    return _prefix_search(collection, terms, limit, offset)
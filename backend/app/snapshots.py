@@ -0,0 +1,164 @@
+import numbers
+import sys
+from collections import defaultdict
+from datetime import datetime
+from typing import Any, Dict, Iterable, List, Optional
+from pymongo import UpdateOne
+from .database import get_database
+
+# Materialized per-department counters for the analytics dashboard.
+# Writers to `employees` call apply_insert / apply_update / apply_delete so the
+# snapshot stays in step; `python -m app.snapshots rebuild` repairs any drift.
+
+db = get_database()
+employees_collection = db["employees"]
+snapshots_collection = db["analytics_snapshots"]
+
+META_ID = "__meta__"
+
+# Fields a snapshot depends on; use as the projection when loading "before" images
+SNAPSHOT_FIELDS = {"_id": 0, "employee_id": 1, "department": 1, "is_active": 1,
+                   "salary": 1, "performance_score": 1, "join_date": 1}
+
+_built = False
+
+
+def _is_number(value) -> bool:
+    # Excludes bools and NaN (pandas uses NaN for empty cells in bulk imports)
+    return isinstance(value, numbers.Real) and not isinstance(value, bool) and value == value
+
+
+def _contribution(doc: Dict[str, Any], sign: int = 1) -> Dict[str, float]:
+    """Counter increments one employee document adds to its department snapshot"""
+    inc = defaultdict(int)
+    inc["employee_count"] += sign
+    active = doc.get("is_active")
+    if active is True:
+        inc["active_count"] += sign
+    elif active is False:
+        inc["inactive_count"] += sign
+
+    salary = doc.get("salary")
+    if _is_number(salary):
+        inc["salary_sum"] += sign * salary
+        inc["salary_count"] += sign
+
+    score = doc.get("performance_score")
+    if _is_number(score):
+        inc["performance_sum"] += sign * score
+        inc["performance_count"] += sign
+        if active is True:
+            inc["active_performance_sum"] += sign * score
+            inc["active_performance_count"] += sign
+
+    join_date = doc.get("join_date")
+    if isinstance(join_date, str) and len(join_date) >= 7:
+        inc[f"hires.{join_date[:7]}"] += sign
+    return inc
+
+
+def _merge(totals: Dict[Any, Dict[str, float]], docs: Iterable[Dict[str, Any]], sign: int):
+    for doc in docs:
+        for key, value in _contribution(doc, sign).items():
+            totals[doc.get("department")][key] += value
+
+
+def is_built() -> bool:
+    """True once a full rebuild has populated the snapshot collection"""
+    global _built
+    if not _built:
+        _built = snapshots_collection.find_one({"_id": META_ID}) is not None
+    return _built
+
+
+def _apply(totals: Dict[Any, Dict[str, float]]):
+    if not is_built():
+        return
+    now = datetime.utcnow().isoformat()
+    operations = []
+    for department, increments in totals.items():
+        increments = {k: v for k, v in increments.items() if v}
+        if not increments:
+            continue
+        operations.append(UpdateOne(
+            {"_id": department},
+            {"$inc": increments, "$set": {"department": department, "updated_at": now}},
+            upsert=True
+        ))
+    if not operations:
+        return
+    try:
+        snapshots_collection.bulk_write(operations, ordered=False)
+    except Exception as e:
+        # Never fail the employee write; a rebuild will repair the snapshot
+        print(f"Warning: Failed to update analytics snapshots: {e}")
+
+
+def apply_insert(docs: Iterable[Dict[str, Any]]):
+    """Record newly inserted employee documents"""
+    totals = defaultdict(lambda: defaultdict(int))
+    _merge(totals, docs, 1)
+    _apply(totals)
+
+
+def apply_delete(docs: Iterable[Dict[str, Any]]):
+    """Record deleted employee documents (pass their pre-delete images)"""
+    totals = defaultdict(lambda: defaultdict(int))
+    _merge(totals, docs, -1)
+    _apply(totals)
+
+
+def apply_update(before: Iterable[Dict[str, Any]], updates: Dict[str, Any]):
+    """Record a $set of `updates` applied to every document in `before`"""
+    before = list(before)
+    totals = defaultdict(lambda: defaultdict(int))
+    _merge(totals, before, -1)
+    _merge(totals, ({**doc, **updates} for doc in before), 1)
+    _apply(totals)
+
+
+def load_before(query: Dict[str, Any]) -> List[Dict[str, Any]]:
+    """Fetch the snapshot-relevant fields of documents about to be modified"""
+    if not is_built():
+        return []
+    return list(employees_collection.find(query, SNAPSHOT_FIELDS))
+
+
+def get_snapshots() -> Optional[List[Dict[str, Any]]]:
+    """Per-department snapshot documents, or None when no rebuild has run yet"""
+    if not is_built():
+        return None
+    return list(snapshots_collection.find({"_id": {"$ne": META_ID}}))
+
+
+def rebuild() -> int:
+    """Recompute every snapshot from `employees` and atomically swap it in"""
+    global _built
+    totals = defaultdict(lambda: defaultdict(int))
+    _merge(totals, employees_collection.find({}, SNAPSHOT_FIELDS), 1)
+
+    now = datetime.utcnow().isoformat()
+    documents = []
+    for department, counters in totals.items():
+        snapshot = {"_id": department, "department": department, "hires": {}, "updated_at": now}
+        for key, value in counters.items():
+            if key.startswith("hires."):
+                snapshot["hires"][key[len("hires."):]] = value
+            else:
+                snapshot[key] = value
+        documents.append(snapshot)
+    documents.append({"_id": META_ID, "built_at": now})
+
+    staging = db["analytics_snapshots_rebuild"]
+    staging.drop()
+    staging.insert_many(documents)
+    staging.rename(snapshots_collection.name, dropTarget=True)
+    _built = True
+    return len(documents) - 1
+
+
+if __name__ == "__main__":
+    if len(sys.argv) != 2 or sys.argv[1] != "rebuild":
+        print("Usage: python -m app.snapshots rebuild")
+        sys.exit(1)
+    print(f"Rebuilt analytics snapshots for {rebuild()} departments")
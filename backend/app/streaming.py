@@ -0,0 +1,144 @@
+import csv
+import io
+import json
+from datetime import datetime
+from tempfile import SpooledTemporaryFile
+from typing import Any, Callable, Dict, Iterable, List, Optional
+from fastapi.responses import StreamingResponse
+from openpyxl import Workbook
+
+DEFAULT_BATCH_SIZE = 1000
+MAX_BATCH_SIZE = 10000
+
+# Finished workbooks stay in memory up to this size, then spill to a temp file
+XLSX_SPOOL_MAX_SIZE = 16 * 1024 * 1024
+FILE_CHUNK_SIZE = 64 * 1024
+
+MEDIA_TYPES = {
+    "ndjson": "application/x-ndjson",
+    "json": "application/json",
+    "csv": "text/csv",
+    "xlsx": "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"
+}
+
+
+def _dumps(document: Dict[str, Any]) -> str:
+    return json.dumps(document, default=str)
+
+
+def iter_ndjson(documents: Iterable[Dict[str, Any]], batch_size: int = DEFAULT_BATCH_SIZE):
+    """One JSON document per line, flushed every `batch_size` documents"""
+    batch = []
+    for document in documents:
+        batch.append(_dumps(document))
+        if len(batch) >= batch_size:
+            yield "\n".join(batch) + "\n"
+            batch = []
+    if batch:
+        yield "\n".join(batch) + "\n"
+
+
+def iter_json_array(
+    documents: Iterable[Dict[str, Any]],
+    batch_size: int = DEFAULT_BATCH_SIZE,
+    prefix: str = "[",
+    suffix: Callable[[int], str] = lambda count: "]"
+):
+    """A JSON array written incrementally; `suffix` receives the element count once the cursor is drained"""
+    yield prefix
+    count = 0
+    batch = []
+    for document in documents:
+        batch.append(_dumps(document))
+        count += 1
+        if len(batch) >= batch_size:
+            yield ("," if count > len(batch) else "") + ",".join(batch)
+            batch = []
+    if batch:
+        yield ("," if count > len(batch) else "") + ",".join(batch)
+    yield suffix(count)
+
+
+def stream_documents(
+    cursor,
+    format: str = "ndjson",
+    batch_size: int = DEFAULT_BATCH_SIZE,
+    filename: Optional[str] = None
+) -> StreamingResponse:
+    """Stream a PyMongo cursor without materializing it; batch_size also sets the cursor fetch size"""
+    cursor = cursor.batch_size(batch_size)
+    if format == "ndjson":
+        body = iter_ndjson(cursor, batch_size)
+    else:
+        body = iter_json_array(cursor, batch_size)
+    headers = {"Content-Disposition": f"attachment; filename={filename}"} if filename else None
+    return StreamingResponse(body, media_type=MEDIA_TYPES[format], headers=headers)
+
+
+def _csv_value(value: Any) -> Any:
+    # Same rendering as DataFrame.to_csv: missing -> empty, everything else via str()
+    return "" if value is None else value
+
+
+def _excel_value(value: Any) -> Any:
+    if isinstance(value, list):
+        return ", ".join(str(item) for item in value)
+    if isinstance(value, dict):
+        return json.dumps(value, default=str)
+    if isinstance(value, datetime) and value.tzinfo is not None:
+        # Excel has no timezone support
+        return value.replace(tzinfo=None)
+    if value is None or isinstance(value, (str, int, float, bool, datetime)):
+        return value
+    return str(value)
+
+
+def iter_csv(documents: Iterable[Dict[str, Any]], columns: List[str], batch_size: int = DEFAULT_BATCH_SIZE):
+    """CSV rows written straight from the cursor, flushed every `batch_size` rows"""
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(columns)
+    rows = 0
+    for document in documents:
+        writer.writerow([_csv_value(document.get(column)) for column in columns])
+        rows += 1
+        if rows % batch_size == 0:
+            yield buffer.getvalue()
+            buffer.seek(0)
+            buffer.truncate()
+    yield buffer.getvalue()
+
+
+def iter_xlsx(documents: Iterable[Dict[str, Any]], columns: List[str], sheet_title: str = "Sheet1"):
+    """
+    Constant-memory workbook: openpyxl's write-only mode serializes each row as it is
+    appended, and the zipped result is spooled and sent in chunks. The xlsx container
+    can only be emitted once the last row is written.
+    """
+    workbook = Workbook(write_only=True)
+    worksheet = workbook.create_sheet(sheet_title)
+    worksheet.append(columns)
+    for document in documents:
+        worksheet.append([_excel_value(document.get(column)) for column in columns])
+
+    with SpooledTemporaryFile(max_size=XLSX_SPOOL_MAX_SIZE) as spool:
+        workbook.save(spool)
+        spool.seek(0)
+        while chunk := spool.read(FILE_CHUNK_SIZE):
+            yield chunk
+
+
+def stream_table(
+    documents: Iterable[Dict[str, Any]],
+    columns: List[str],
+    format: str,
+    filename: str,
+    batch_size: int = DEFAULT_BATCH_SIZE
+) -> StreamingResponse:
+    """CSV or XLSX download rendered while the cursor is read"""
+    body = iter_csv(documents, columns, batch_size) if format == "csv" else iter_xlsx(documents, columns)
+    return StreamingResponse(
+        body,
+        media_type=MEDIA_TYPES[format],
+        headers={"Content-Disposition": f"attachment; filename={filename}"}
+    )
@@ -0,0 +1,145 @@
+import asyncio
+import multiprocessing
+import os
+import threading
+import time
+from concurrent.futures import Future, ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from dotenv import load_dotenv
+from app.utils.auth import hashpass, verifypass
+
+# bcrypt runs in a small process pool so a burst of logins can't hold the GIL or
+# threads of the request threadpool: async routes await the result on the event
+# loop. Once PASSWORD_POOL_MAX_PENDING calls are queued or running, new ones are
+# refused.
+
+load_dotenv()
+
+PASSWORD_POOL_WORKERS = int(os.getenv("PASSWORD_POOL_WORKERS", min(4, os.cpu_count() or 1)))
+PASSWORD_POOL_MAX_PENDING = int(os.getenv("PASSWORD_POOL_MAX_PENDING", PASSWORD_POOL_WORKERS * 8))
+# Seconds a 429 response tells the client to wait
+PASSWORD_POOL_RETRY_AFTER = int(os.getenv("PASSWORD_POOL_RETRY_AFTER", 1))
+
+
+class PasswordPoolBusy(Exception):
+    """Raised instead of queueing when the pool already has max_pending calls"""
+
+
+def _timed(func, *args):
+    # Runs in the worker process; wall-clock timestamps let the parent split queue wait from work
+    started = time.time()
+    result = func(*args)
+    return result, started, time.time()
+
+
+class _Timing:
+    def __init__(self):
+        self.count = 0
+        self.total_ms = 0.0
+        self.max_ms = 0.0
+
+    def add(self, ms: float):
+        self.count += 1
+        self.total_ms += ms
+        self.max_ms = max(self.max_ms, ms)
+
+    def snapshot(self):
+        return {
+            "avg_ms": round(self.total_ms / self.count, 3) if self.count else 0,
+            "max_ms": round(self.max_ms, 3)
+        }
+
+
+class PasswordPool:
+    def __init__(self, workers: int = PASSWORD_POOL_WORKERS, max_pending: int = PASSWORD_POOL_MAX_PENDING):
+        self.workers = workers
+        self.max_pending = max_pending
+        self._executor = None
+        self._lock = threading.Lock()
+        self.pending = 0
+        self.completed = 0
+        self.rejected = 0
+        self.failures = 0
+        self.queue_wait = _Timing()
+        self.hash_time = _Timing()
+
+    def _get_executor(self):
+        if self._executor is None:
+            # spawn: forking a process that already runs PyMongo's monitor threads is unsafe
+            self._executor = ProcessPoolExecutor(
+                max_workers=self.workers,
+                mp_context=multiprocessing.get_context("spawn")
+            )
+        return self._executor
+
+    def _submit(self, func, *args) -> Future:
+        """Future of func(*args) in a worker; it completes after the call is counted"""
+        with self._lock:
+            if self.pending >= self.max_pending:
+                self.rejected += 1
+                raise PasswordPoolBusy()
+            self.pending += 1
+            executor = self._get_executor()
+        submitted = time.time()
+        outcome = Future()
+
+        def done(task):
+            with self._lock:
+                self.pending -= 1
+                error = None if task.cancelled() else task.exception()
+                if isinstance(error, BrokenProcessPool):
+                    # A worker died (e.g. OOM-killed); start a fresh pool for later calls
+                    if self._executor is executor:
+                        self._executor = None
+                    self.failures += 1
+                elif not task.cancelled() and error is None:
+                    _, started, finished = task.result()
+                    self.completed += 1
+                    self.queue_wait.add(max(0.0, started - submitted) * 1000)
+                    self.hash_time.add((finished - started) * 1000)
+            try:
+                outcome.set_result(task.result()[0])
+            except BaseException as e:
+                outcome.set_exception(e)
+
+        try:
+            executor.submit(_timed, func, *args).add_done_callback(done)
+        except Exception:
+            with self._lock:
+                self.pending -= 1
+            raise
+        return outcome
+
+    def hash(self, password: str) -> str:
+        return self._submit(hashpass, password).result()
+
+    def verify(self, password: str, hashed: str) -> bool:
+        return self._submit(verifypass, password, hashed).result()
+
+    async def hash_async(self, password: str) -> str:
+        return await asyncio.wrap_future(self._submit(hashpass, password))
+
+    async def verify_async(self, password: str, hashed: str) -> bool:
+        return await asyncio.wrap_future(self._submit(verifypass, password, hashed))
+
+    def shutdown(self):
+        with self._lock:
+            executor, self._executor = self._executor, None
+        if executor is not None:
+            executor.shutdown(wait=False, cancel_futures=True)
+
+    def stats(self):
+        with self._lock:
+            return {
+                "workers": self.workers,
+                "max_pending": self.max_pending,
+                "pending": self.pending,
+                "completed": self.completed,
+                "rejected": self.rejected,
+                "failures": self.failures,
+                "queue_wait": self.queue_wait.snapshot(),
+                "hash_time": self.hash_time.snapshot()
+            }
+
+
+password_pool = PasswordPool()
@@ -0,0 +1,12 @@
+from datetime import datetime
+from app.analytics_engine import build_dashboard_pipeline, current_month_range
+
+def test_dashboard_pipeline_is_single_facet():
+    pipeline = build_dashboard_pipeline("Engineering", "2024-02-01", "2024-02-29")
+    assert len(pipeline) == 1
+    facets = pipeline[0]["$facet"]
+    assert set(facets) == {"summary", "top_department"}
+    assert facets["summary"][0] == {"$match": {"department": "Engineering"}}
+
+def test_current_month_range_handles_leap_years():
+    assert current_month_range(datetime(2024, 2, 10)) == ("2024-02-01", "2024-02-29")
@@ -0,0 +1,32 @@
+from datetime import timedelta
+from app import auth_context
+from app.utils.auth import createtoken
+
+class _Users:
+    def __init__(self):
+        self.lookups = 0
+
+    def find_one(self, query):
+        self.lookups += 1
+        return {"_id": "1", "email": query["email"], "name": "Ada"}
+
+def test_verified_tokens_are_cached(monkeypatch):
+    token = createtoken({"sub": "ada@x.com"})
+    calls = []
+    monkeypatch.setattr(auth_context, "decodetoken", lambda t: calls.append(t) or {"sub": "ada@x.com", "exp": 2**40})
+    assert auth_context.verify_token(token)["sub"] == "ada@x.com"
+    assert auth_context.verify_token(token)["sub"] == "ada@x.com"
+    assert len(calls) == 1
+
+def test_expired_tokens_are_rejected():
+    assert auth_context.verify_token(createtoken({"sub": "ada@x.com"}, timedelta(seconds=-1))) is None
+
+def test_user_cache_returns_copies_and_invalidates(monkeypatch):
+    users = _Users()
+    monkeypatch.setattr(auth_context, "empcollection", users)
+    auth_context.load_user("ada@x.com").pop("_id")
+    assert auth_context.load_user("ada@x.com")["_id"] == "1"
+    assert users.lookups == 1
+    auth_context.invalidate_user("ada@x.com")
+    auth_context.load_user("ada@x.com")
+    assert users.lookups == 2
@@ -0,0 +1,33 @@
+import pytest
+from app.bulk_ops import BatchBuilder, OperationError, parse_operation
+
+def test_update_keeps_only_sent_fields():
+    operation = parse_operation(b'{"op": "update", "employee_id": "EMP1", "data": {"salary": "90000"}}')
+    assert operation == {"op": "update", "employee_id": "EMP1", "data": {"salary": 90000.0}}
+
+@pytest.mark.parametrize("line", [
+    b'not json',
+    b'{"op": "merge", "employee_id": "EMP1"}',
+    b'{"op": "delete"}',
+    b'{"op": "update", "employee_id": "EMP1", "data": {"bogus": 1}}',
+    b'{"op": "insert", "employee_id": "EMP1", "data": {"name": "A"}}',
+])
+def test_invalid_operations_are_rejected(line):
+    with pytest.raises(OperationError):
+        parse_operation(line)
+
+def test_batches_split_on_size_and_repeated_employee():
+    builder = BatchBuilder(batch_size=2)
+    op = lambda employee_id: {"op": "delete", "employee_id": employee_id, "data": {}}
+    assert builder.add(1, op("A")) is None
+    assert [line for line, _ in builder.add(2, op("A"))] == [1]
+    assert builder.add(3, op("B")) is None
+    assert [line for line, _ in builder.add(4, op("C"))] == [2, 3]
+    assert [line for line, _ in builder.flush()] == [4]
+    assert builder.flush() is None
+
+def test_blank_body_is_rejected():
+    from fastapi.testclient import TestClient
+    from app.main import app
+    response = TestClient(app).post("/employees/bulk", content=b"\n  \n\n")
+    assert response.status_code == 400
@@ -0,0 +1,42 @@
+from app.cache import MemoryBackend, ResultCache, cached
+
+def test_cache_hits_and_data_version_invalidation():
+    version = [0]
+    cache = ResultCache(backend=MemoryBackend(max_entries=10), ttl=60, version=lambda: version[0], version_ttl=0)
+    calls = []
+
+    @cached("stats", cache=cache)
+    def stats(department=None):
+        calls.append(department)
+        return {"department": department}
+
+    stats("all")
+    stats(None)
+    assert len(calls) == 1
+    # Another worker's write: this process's backend was never told
+    version[0] += 1
+    stats()
+    assert len(calls) == 2
+    assert cache.stats()["hits"] == 1
+    assert cache.stats()["misses"] == 2
+
+def test_hits_reuse_the_data_version():
+    reads = []
+    cache = ResultCache(backend=MemoryBackend(), ttl=60, version=lambda: reads.append(1) or 0)
+    assert cache.get_or_compute("stats", {}, lambda: 1) == 1
+    assert cache.get_or_compute("stats", {}, lambda: 2) == 1
+    assert len(reads) == 1 and cache.stats()["hits"] == 1
+    # A write in this process is seen at once
+    cache.invalidate()
+    cache.get_or_compute("stats", {}, lambda: 3)
+    assert len(reads) == 2
+
+def test_memory_backend_lru_eviction():
+    backend = MemoryBackend(max_entries=2)
+    backend.set("a", 1, 60)
+    backend.set("b", 2, 60)
+    backend.get("a")
+    backend.set("c", 3, 60)
+    assert backend.get("a") == 1
+    assert backend.evictions == 1
+    assert backend.size() == 2
@@ -1,5 +1,9 @@
 import os
-from app.excel_generator import generate_employee_report
+import pandas as pd
+from openpyxl import load_workbook
+from app.excel_generator import (
+    generate_comprehensive_report, generate_department_report, generate_employee_report, generate_performance_report
+)
 
 def test_excel_report_generation():
     sample_data = [{
@@ -19,3 +23,27 @@ def test_excel_report_generation():
 
     filepath = generate_employee_report(sample_data)
     assert os.path.exists(filepath)
+
+def test_template_reports_render(tmp_path):
+    df = pd.DataFrame({
+        "employee_id": ["EMP001", "EMP002", "EMP003"],
+        "name": ["A", "B", "C"],
+        "department": ["QA", "QA", "IT"],
+        "salary": [60000, 85000, 125000],
+        "performance_score": [4.6, 3.2, 4.9],
+        "join_date": ["2022-01-01", "2023-05-01", "2024-02-01"],
+        "is_active": [True, True, False],
+    })
+    path = generate_comprehensive_report(df, str(tmp_path / "comprehensive.xlsx"))
+    wb = load_workbook(path)
+    assert wb.sheetnames == ["Employee Directory", "Department Analysis", "Salary Analysis",
+                             "Performance Overview", "Executive Summary"]
+    assert wb["Employee Directory"]["A5"].value == "EMP001"
+    assert wb["Executive Summary"]["B5"].value == 3
+
+    path = generate_department_report(df, str(tmp_path / "department.xlsx"))
+    assert load_workbook(path).sheetnames[2:] == ["QA", "IT"]
+
+    path = generate_performance_report(df, str(tmp_path / "performance.xlsx"))
+    top = load_workbook(path)["Top Performers"]
+    assert [top["A6"].value, top["A7"].value] == ["EMP003", "EMP001"]
@@ -0,0 +1,107 @@
+from datetime import datetime
+import pandas as pd
+import pytest
+from openpyxl import load_workbook
+from openpyxl import Workbook
+from app import excel_parallel
+from app.excel_writer import StreamingWorkbook
+from app.report_styles import TOP_PERFORMERS, style_worksheet
+
+def test_sheet_blocks_render_in_row_order(tmp_path):
+    book = StreamingWorkbook()
+    sheet = book.sheet("Data")
+    sheet.header("Title", "Description")
+    df = pd.DataFrame({"name": ["A", "B", "C"], "salary": [50000, None, 70000]})
+    assert sheet.table(df, row=5) == (5, 8)
+    sheet.metrics({"Total": 3}, row=10)
+    path = book.save(str(tmp_path / "report.xlsx"))
+
+    ws = load_workbook(path)["Data"]
+    assert ws["A1"].value == "Title" and "A1:E1" in ws.merged_cells
+    assert [c.value for c in ws[5]][:2] == ["name", "salary"]
+    assert ws["B6"].value == 50000 and ws["B6"].number_format == "$#,##0"
+    assert ws["B7"].value is None and ws["B7"].border.left.style == "thin"
+    # banding is one conditional formatting rule over the data rows, not per-cell fills
+    assert ws["A7"].fill.fill_type is None
+    (rules,) = [(str(cf.sqref), cf.rules) for cf in ws.conditional_formatting]
+    assert rules[0] == "A6:B8" and rules[1][0].formula == ["MOD(ROW()-6,2)=1"]
+    assert ws["A10"].value == "Total" and ws["B10"].value == 3
+
+def test_batched_table_must_be_last(tmp_path):
+    book = StreamingWorkbook()
+    sheet = book.sheet("Data")
+    batches = (pd.DataFrame({"n": range(i, i + 2)}) for i in (0, 2))
+    assert sheet.table(batches) == (1, None)
+    with pytest.raises(ValueError):
+        sheet.text("below")
+    ws = load_workbook(book.save(str(tmp_path / "report.xlsx")))["Data"]
+    assert [row[0].value for row in ws.iter_rows()] == ["n", 0, 1, 2, 3]
+
+def test_highlight_rule_takes_priority_over_band(tmp_path):
+    book = StreamingWorkbook()
+    sheet = book.sheet("Data")
+    sheet.table(pd.DataFrame({"name": ["A"], "performance_score": [4.8]}), highlight=TOP_PERFORMERS)
+    ws = load_workbook(book.save(str(tmp_path / "report.xlsx")))["Data"]
+    rules = sorted((rule for cf in ws.conditional_formatting for rule in cf.rules), key=lambda rule: rule.priority)
+    assert rules[0].formula == ["AND(ISNUMBER($B2),$B2>=4.5)"]
+    assert rules[1].formula == ["MOD(ROW()-2,2)=1"]
+
+@pytest.fixture(params=[1, 2], ids=["in_process", "pool"])
+def parallel(request, monkeypatch):
+    monkeypatch.setattr(excel_parallel, "REPORT_RENDER_WORKERS", request.param)
+    monkeypatch.setattr(excel_parallel, "REPORT_PARALLEL_MIN_ROWS", 10)
+    monkeypatch.setattr(excel_parallel, "REPORT_PARALLEL_CHUNK_ROWS", 7)
+
+def test_parallel_rendering_splices_rows_in_order(tmp_path, parallel):
+    book = StreamingWorkbook()
+    sheet = book.sheet("Employees")
+    sheet.header("Title", "Description")
+    sheet.table(pd.DataFrame({"id": range(30), "salary": [1000.0] * 30}), row=4)
+    book.sheet("Summary").metrics({"Total": 30})
+    small = book.sheet("Small")
+    small.table(pd.DataFrame({"id": range(3)}))
+    path = book.save(str(tmp_path / "report.xlsx"))
+
+    wb = load_workbook(path)
+    ws = wb["Employees"]
+    assert ws["A1"].value == "Title" and ws["A4"].value == "id"
+    assert [row[0].value for row in ws.iter_rows(min_row=5)] == list(range(30))
+    assert ws["B34"].number_format == "$#,##0" and ws["B34"].style == "table_cell $#,##0"
+    (cf,) = ws.conditional_formatting
+    assert str(cf.sqref) == "A5:B34"
+    assert wb["Summary"]["B1"].value == 30
+    assert [row[0].value for row in wb["Small"].iter_rows()] == ["id", 0, 1, 2]
+
+def test_fragment_cells_match_appended_cells(tmp_path, monkeypatch, parallel):
+    df = pd.DataFrame({
+        "name": [" padded ", "a & <b>", "", None] * 5,
+        "active": [True, False, None, True] * 5,
+        "score": [4.5, None, 3, 1e-7] * 5,
+    })
+    paths = []
+    for min_rows in (10, len(df) + 1):
+        monkeypatch.setattr(excel_parallel, "REPORT_PARALLEL_MIN_ROWS", min_rows)
+        book = StreamingWorkbook()
+        book.sheet("Data").table(df)
+        paths.append(book.save(str(tmp_path / f"report_{min_rows}.xlsx")))
+    fast, appended = (load_workbook(path)["Data"] for path in paths)
+    assert [[(c.value, c.style) for c in row] for row in fast.iter_rows()] == \
+           [[(c.value, c.style) for c in row] for row in appended.iter_rows()]
+
+def test_parallel_rendering_falls_back_to_serial(tmp_path, parallel):
+    # A datetime picks a date format the workers can't register, so the table is written here
+    book = StreamingWorkbook()
+    book.sheet("Data").table(pd.DataFrame({"joined": [datetime(2024, 1, day) for day in range(1, 21)]}))
+    ws = load_workbook(book.save(str(tmp_path / "report.xlsx")))["Data"]
+    assert ws["A21"].value == datetime(2024, 1, 20) and ws["A21"].is_date
+
+def test_style_worksheet_sizes_columns_from_dataframe():
+    wb = Workbook()
+    ws = wb.active
+    df = pd.DataFrame({"id": [1, 2], "note": ["x" * 30, "short"]})
+    for row in [list(df.columns)] + df.values.tolist():
+        ws.append(row)
+    style_worksheet(ws, df, band=False)
+    assert ws.column_dimensions["A"].width == 17 and ws.column_dimensions["B"].width == 32
+    assert ws["A1"].style == "table_header" and ws["B3"].style == "table_cell"
+    assert not list(ws.conditional_formatting)
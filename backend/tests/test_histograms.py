@@ -0,0 +1,81 @@
+import pytest
+from pymongo.errors import OperationFailure
+from app import histograms
+from app.histograms import build_histogram_pipeline, compute_histogram, quantile_positions
+
+RANGES = [
+    {"range": "low", "min": 0, "max": 10},
+    {"range": "high", "min": 10, "max": float('inf')}
+]
+
+def test_histogram_pipeline_uses_bucket_boundaries():
+    pipeline = build_histogram_pipeline("salary", RANGES, match={"is_active": True})
+    bucket = pipeline[1]["$facet"]["buckets"][0]["$bucket"]
+    assert bucket["boundaries"] == [0, 10, float('inf')]
+    assert "$percentile" not in str(pipeline)
+    stats = build_histogram_pipeline("salary", RANGES, quantiles=[0.5])[1]["$facet"]["stats"][0]["$group"]
+    assert stats["quantiles"]["$percentile"] == {"input": "$salary", "p": [0.5], "method": "approximate"}
+
+def test_quantile_positions_match_higher_method():
+    assert quantile_positions(4, [0.5]) == [2]
+    assert quantile_positions(5, [0.5]) == [2]
+    assert quantile_positions(11, [0.0, 0.9, 1.0]) == [0, 9, 10]
+
+class FakeCursor:
+    def __init__(self, docs):
+        self.docs = docs
+
+    def sort(self, field, direction):
+        return FakeCursor(sorted(self.docs, key=lambda doc: doc[field]))
+
+    def skip(self, n):
+        return FakeCursor(self.docs[n:])
+
+    def limit(self, n):
+        return FakeCursor(self.docs[:n])
+
+    def __iter__(self):
+        return iter(self.docs)
+
+class FakeSalaries:
+    def __init__(self, salaries, percentile_error=None):
+        self.docs = [{"salary": s} for s in salaries]
+        self.percentile_error = percentile_error
+        self.calls = []
+
+    def aggregate(self, pipeline):
+        self.calls.append("aggregate")
+        stats = {"count": len(self.docs), "min": 0, "max": 0, "avg": 0}
+        if "$percentile" in str(pipeline):
+            if self.percentile_error:
+                raise OperationFailure("$percentile", code=self.percentile_error)
+            stats["quantiles"] = [35.0]
+        return iter([{"buckets": [], "stats": [stats]}])
+
+    def find(self, query, projection):
+        self.calls.append("find")
+        return FakeCursor(self.docs)
+
+@pytest.fixture(autouse=True)
+def percentile_supported(monkeypatch):
+    monkeypatch.setattr(histograms, "_percentile_supported", True)
+
+def test_quantiles_come_from_the_aggregation():
+    salaries = FakeSalaries([50, 10, 40, 20, 30, 60])
+    assert compute_histogram(salaries, "salary", RANGES)["stats"]["quantiles"] == {0.5: 35.0}
+    assert salaries.calls == ["aggregate"]
+
+def test_servers_without_percentile_get_exact_observations():
+    salaries = FakeSalaries([50, 10, 40, 20, 30, 60], percentile_error=15952)
+    histogram = compute_histogram(salaries, "salary", RANGES, quantiles=(0.25, 0.5))
+    assert histogram["stats"]["quantiles"] == {0.25: 30, 0.5: 40}
+    assert not histograms._percentile_supported
+
+def test_other_aggregation_errors_are_raised():
+    with pytest.raises(OperationFailure):
+        compute_histogram(FakeSalaries([10], percentile_error=11601), "salary", RANGES)
+    assert histograms._percentile_supported
+
+def test_histogram_rejects_overlapping_ranges():
+    with pytest.raises(ValueError):
+        build_histogram_pipeline("salary", [{"range": "a", "min": 5, "max": 10}, {"range": "b", "min": 5, "max": 20}])
@@ -0,0 +1,26 @@
+from app.id_allocator import IdAllocator
+
+def _allocator(block_size):
+    allocator = IdAllocator("test", "EMP", block_size=block_size)
+    state = {"seq": 41, "calls": 0}
+
+    def reserve(count):
+        state["calls"] += 1
+        state["seq"] += count
+        return state["seq"] - count + 1
+
+    allocator._reserve = reserve
+    return allocator, state
+
+def test_block_allocation_uses_one_counter_update_per_block():
+    allocator, state = _allocator(block_size=10)
+    ids = [allocator.next_id() for _ in range(25)]
+    assert ids[0] == "EMP042" and ids[-1] == "EMP066"
+    assert len(set(ids)) == 25
+    assert state["calls"] == 3
+
+def test_bulk_allocate_is_consecutive():
+    allocator, state = _allocator(block_size=1)
+    assert allocator.allocate(3) == ["EMP042", "EMP043", "EMP044"]
+    assert allocator.next_id() == "EMP045"
+    assert state["calls"] == 2
@@ -0,0 +1,86 @@
+import pytest
+from pymongo.errors import BulkWriteError
+from pymongo.results import UpdateResult
+from app import importer
+from app.importer import iter_batches, iter_csv_records, parse_skills, prepare_batch
+
+HEADER = "employee_id,name,email,department,position,salary,join_date,performance_score,is_active,skills\n"
+
+def test_csv_records_keep_multiline_fields_and_row_numbers(tmp_path):
+    path = tmp_path / "import.csv"
+    path.write_text(HEADER + 'EMP1,A,a@x.com,Eng,"Senior\nDev",1,2024-01-01,4,true,"py, go"\nEMP2,B,b@x.com,HR,HR,2,2024-01-01,3,false,\n')
+    records = list(iter_csv_records(path))
+    assert [row for row, _, _ in records] == [2, 3]
+    assert records[0][2]["position"] == "Senior\nDev"
+    # Resuming after the two-line record keeps the same row numbers
+    row_number, offset, _ = records[0]
+    assert list(iter_csv_records(path, offset, row_number)) == records[1:]
+
+def test_csv_records_resume_from_checkpoint(tmp_path):
+    path = tmp_path / "import.csv"
+    path.write_text(HEADER + "".join(f"EMP{i},N,e@x.com,Eng,Dev,1,2024-01-01,4,true,py\n" for i in range(5)))
+    records = list(iter_csv_records(path))
+    row_number, offset, _ = records[1]
+    resumed = list(iter_csv_records(path, offset, row_number))
+    assert resumed == records[2:]
+
+def test_skills_formats():
+    assert parse_skills("['py', 'go']") == ["py", "go"]
+    assert parse_skills("py, go") == ["py", "go"]
+    assert parse_skills(["py"]) == ["py"]
+
+def test_prepare_batch_reports_row_errors():
+    row = {"employee_id": "EMP1", "name": "A", "email": "a@x.com", "department": "Eng", "position": "Dev",
+           "salary": "1000", "join_date": "2024-01-01", "performance_score": "4", "is_active": "true", "skills": "py"}
+    valid, errors = prepare_batch([(2, 0, row), (3, 0, {**row, "employee_id": "EMP2", "salary": "abc"})])
+    assert [(number, doc["salary"]) for number, doc in valid] == [(2, 1000.0)]
+    assert [error["row"] for error in errors] == [3]
+    assert "salary" in errors[0]["error"]
+
+class FakeClaims:
+    """Unique _id like the import_rows collection"""
+    def __init__(self):
+        self.claims = {}
+
+    def insert_many(self, docs, ordered):
+        errors = []
+        for index, doc in enumerate(docs):
+            if doc["_id"] in self.claims:
+                errors.append({"index": index, "code": 11000})
+            else:
+                self.claims[doc["_id"]] = doc
+        if errors:
+            raise BulkWriteError({"writeErrors": errors})
+
+    def find(self, query):
+        return [self.claims[_id] for _id in query["_id"]["$in"]]
+
+def test_duplicate_employee_ids_are_caught_across_batches(monkeypatch):
+    monkeypatch.setattr(importer, "claims_collection", FakeClaims())
+    first, second = (2, {"employee_id": "EMP1"}), (9, {"employee_id": "EMP1"})
+    assert importer.claim_rows("job", [first]) == ([first], [], set())
+    rows, errors, _ = importer.claim_rows("job", [second, (10, {"employee_id": "EMP2"})])
+    assert [row for row, _ in rows] == [10]
+    assert errors[0]["row"] == 9 and "row 2" in errors[0]["error"]
+    # A resumed run replaying row 2 writes it again, and counts it as inserted if it was
+    importer.claims_collection.claims["job:EMP1"]["inserted"] = True
+    assert importer.claim_rows("job", [first]) == ([first], [], {"EMP1"})
+
+class FakeJobs:
+    def __init__(self, owner):
+        self.owner = owner
+
+    def update_one(self, query, update):
+        return UpdateResult({"n": int(query.get("locked_by") == self.owner)}, True)
+
+def test_checkpoints_need_the_run_lease(monkeypatch):
+    monkeypatch.setattr(importer, "jobs_collection", FakeJobs("run-2"))
+    batch = [(2, 10, {"employee_id": "EMP1"})]
+    result = {"inserted": 1, "updated": 0, "skipped": 0}
+    importer._record_progress("job", "run-2", batch, result, [])
+    with pytest.raises(importer.ImportLeaseLost):
+        importer._record_progress("job", "run-1", batch, result, [])
+    assert not importer._finish("job", "run-1", "Completed")
+
+def test_batches_are_fixed_size():
+    assert [len(batch) for batch in iter_batches(iter(range(5)), 2)] == [2, 2, 1]
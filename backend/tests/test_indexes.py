@@ -0,0 +1,55 @@
+import pytest
+from pymongo import MongoClient
+from pymongo.errors import PyMongoError
+from app.database import MONGODB_URL
+from app.indexes import INDEXES, db, ensure_indexes
+
+@pytest.fixture(scope="module")
+def mongodb():
+    try:
+        MongoClient(MONGODB_URL, serverSelectionTimeoutMS=2000).admin.command("ping")
+    except PyMongoError:
+        pytest.skip("MongoDB is not reachable")
+    ensure_indexes()
+    return db
+
+def test_registry_index_names_are_unique_per_collection():
+    for collection_name, models in INDEXES.items():
+        names = [model.document["name"] for model in models]
+        assert len(names) == len(set(names)), collection_name
+
+def test_one_failing_index_does_not_block_the_others(monkeypatch):
+    from pymongo.errors import OperationFailure
+    from app import indexes
+
+    class FakeCollection:
+        def create_indexes(self, models):
+            (model,) = models
+            if model.document.get("unique"):
+                raise OperationFailure("E11000 duplicate key error", code=11000)
+            return [model.document["name"]]
+
+    monkeypatch.setattr(indexes, "INDEXES", {"employees": INDEXES["employees"]})
+    monkeypatch.setattr(indexes, "db", {"employees": FakeCollection()})
+    result = ensure_indexes()["employees"]
+    unique = {model.document["name"] for model in INDEXES["employees"] if model.document.get("unique")}
+    assert unique and set(result["errors"]) == unique
+    assert set(result["created"]) == {model.document["name"] for model in INDEXES["employees"]} - unique
+
+def _winning_stages(plan):
+    stages = [plan.get("stage")]
+    for child in plan.get("inputStages", []) + ([plan["inputStage"]] if "inputStage" in plan else []):
+        stages.extend(_winning_stages(child))
+    return stages
+
+@pytest.mark.parametrize("collection_name, query", [
+    ("employees", {"employee_id": "EMP001"}),
+    ("employees", {"email": "test@company.com"}),
+    ("employees", {"department": "QA", "join_date": {"$gte": "2024-01-01"}}),
+])
+def test_lookups_use_an_index(mongodb, collection_name, query):
+    explain = mongodb[collection_name].find(query).explain()
+    winning_plan = explain["queryPlanner"]["winningPlan"]
+    # Slot-based engine plans nest the classic tree under "queryPlan"
+    stages = _winning_stages(winning_plan.get("queryPlan", winning_plan))
+    assert "IXSCAN" in stages and "COLLSCAN" not in stages
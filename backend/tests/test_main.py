@@ -7,3 +7,12 @@ def test_health_check():
     response = client.get("/")
     assert response.status_code == 200
     assert response.json() == {"message": "Employee Analytics API is running successfully."}
+
+def test_clients_are_recreated_after_shutdown():
+    import asyncio
+    from app import database
+    first = database.get_client()
+    asyncio.run(database.close_clients())
+    # Handles taken at import time move to the new client
+    assert database.get_client() is not first
+    assert database.db["employees"].database.client is database.get_client()
@@ -0,0 +1,42 @@
+import pytest
+from fastapi import HTTPException
+from app.pagination import build_projection, decode_cursor, encode_cursor
+
+def test_cursor_round_trip():
+    assert decode_cursor(encode_cursor("EMP042")) == "EMP042"
+
+def test_invalid_cursor_is_rejected():
+    with pytest.raises(HTTPException):
+        decode_cursor("not-a-cursor")
+
+def test_projection_always_keeps_employee_id():
+    assert build_projection("name, salary") == {"name": 1, "salary": 1, "employee_id": 1, "_id": 0}
+    with pytest.raises(HTTPException):
+        build_projection("name,$where")
+
+def test_paged_and_full_lists_match_the_same_employees(monkeypatch):
+    from fastapi import Response
+    from app import crud
+    from app.routes import employeeroutes
+
+    class FakeCursor(list):
+        def sort(self, *args):
+            return self
+
+        def limit(self, n):
+            return FakeCursor(self[:n])
+
+    class FakeEmployees:
+        def __init__(self):
+            self.queries = []
+
+        def find(self, query, projection):
+            self.queries.append(query)
+            return FakeCursor()
+
+    employees = FakeEmployees()
+    monkeypatch.setattr(crud, "employees_collection", employees)
+    monkeypatch.setattr(employeeroutes, "empcollection", employees)
+    employeeroutes._employees_response(Response(), {"department": "QA"}, None, None, None)
+    employeeroutes._employees_response(Response(), {"department": "QA"}, 10, None, None)
+    assert employees.queries == [{"department": "QA", "employee_id": {"$gte": ""}}] * 2
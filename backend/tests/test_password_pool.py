@@ -0,0 +1,30 @@
+import asyncio
+import pytest
+from app.utils.password_pool import PasswordPool, PasswordPoolBusy
+
+def test_hash_and_verify_in_worker_process():
+    pool = PasswordPool(workers=1, max_pending=2)
+    try:
+        hashed = pool.hash("s3cret")
+        assert pool.verify("s3cret", hashed)
+        assert not pool.verify("wrong", hashed)
+        stats = pool.stats()
+        assert stats["completed"] == 3 and stats["pending"] == 0
+        assert stats["hash_time"]["avg_ms"] > 0
+    finally:
+        pool.shutdown()
+
+def test_full_queue_is_rejected_without_queueing():
+    pool = PasswordPool(workers=1, max_pending=0)
+    with pytest.raises(PasswordPoolBusy):
+        pool.hash("s3cret")
+    assert pool.stats()["rejected"] == 1
+
+def test_async_callers_await_without_a_thread():
+    pool = PasswordPool(workers=1, max_pending=2)
+    try:
+        hashed = asyncio.run(pool.hash_async("s3cret"))
+        assert asyncio.run(pool.verify_async("s3cret", hashed))
+        assert pool.stats()["completed"] == 2 and pool.stats()["pending"] == 0
+    finally:
+        pool.shutdown()
@@ -0,0 +1,80 @@
+import pandas as pd
+import pytest
+from openpyxl import load_workbook
+from pymongo.errors import OperationFailure
+from app import report_aggregates
+from app.excel_generator import TEMPLATE_SUMMARIES, generate_executive_report
+from app.report_aggregates import SUMMARY_FIELDS, FrameReportData, MongoReportData, build_summary_pipeline
+
+FACETS = {
+    "overview": [{"_id": None, "total": 3, "active": 2, "departments": ["IT", "QA"], "avg_performance": 4.0,
+                  "avg_salary": 80000.0, "min_salary": 60000.0, "max_salary": 100000.0, "std_salary": 20000.0,
+                  "median_salary": 80000.0,
+                  **{f"has_{field}": True for field in SUMMARY_FIELDS}}],
+    "departments": [
+        {"_id": "IT", "rows": 1, "employee_count": 1, "avg_salary": 100000.0, "median_salary": 100000.0,
+         "min_salary": 100000.0, "max_salary": 100000.0, "avg_performance": 4.5},
+        {"_id": "QA", "rows": 2, "employee_count": 2, "avg_salary": 70000.0, "median_salary": 70000.0,
+         "min_salary": 60000.0, "max_salary": 80000.0, "avg_performance": 3.75},
+    ],
+    "hiring": [{"_id": 2023, "hires": 3}],
+}
+
+class FakeEmployees:
+    def __init__(self):
+        self.calls = []
+
+    def aggregate(self, pipeline):
+        self.calls.append("aggregate")
+        return iter([{name: FACETS[name] for name in pipeline[-1]["$facet"]}])
+
+    def find(self, *args, **kwargs):
+        self.calls.append("find")
+        return iter([])
+
+def test_summary_pipeline_is_one_facet_pass():
+    pipeline = build_summary_pipeline({"is_active": True}, ["overview", "salary_ranges"], with_median=False)
+    assert [next(iter(stage)) for stage in pipeline] == ["$match", "$project", "$facet"]
+    facets = pipeline[2]["$facet"]
+    assert sorted(facets) == ["overview", "salary_ranges"]
+    assert facets["salary_ranges"][1]["$bucket"]["boundaries"][:2] == [0, 40000]
+    assert "$median" not in str(facets)
+    assert "$median" in str(build_summary_pipeline({}, ["departments"]))
+
+def test_executive_report_needs_no_employee_rows(tmp_path):
+    employees = FakeEmployees()
+    data = MongoReportData(employees, {}, TEMPLATE_SUMMARIES[generate_executive_report])
+    wb = load_workbook(generate_executive_report(data, str(tmp_path / "executive.xlsx")))
+    assert employees.calls == ["aggregate"]
+    assert [wb["Executive Summary"][f"B{row}"].value for row in (5, 6, 7)] == [3, 2, 2]
+    assert wb["Key Metrics"]["A7"].value == "QA" and wb["Trends Analysis"]["A7"].value == 2023
+
+def test_mongo_and_frame_summaries_match():
+    df = pd.DataFrame({
+        "employee_id": ["E1", "E2", "E3"],
+        "department": ["QA", "IT", "QA"],
+        "salary": [60000.0, 100000.0, 80000.0],
+        "performance_score": [3.5, 4.5, 4.0],
+        "is_active": [True, True, False],
+    })
+    frame, mongo = FrameReportData(df), MongoReportData(FakeEmployees(), {})
+    for table in ("department_analysis", "department_salary", "department_counts", "performance_by_department"):
+        pd.testing.assert_frame_equal(getattr(frame, table)(), getattr(mongo, table)(), check_dtype=False)
+    assert frame.salary_stats()["Value"].tolist() == mongo.salary_stats()["Value"].tolist()
+
+def test_executive_summary_without_averages(tmp_path, monkeypatch):
+    overview = {**FACETS["overview"][0], "avg_salary": None, "avg_performance": None}
+    monkeypatch.setitem(FACETS, "overview", [overview])
+    data = MongoReportData(FakeEmployees(), {}, TEMPLATE_SUMMARIES[generate_executive_report])
+    wb = load_workbook(generate_executive_report(data, str(tmp_path / "executive.xlsx")))
+    assert [wb["Executive Summary"][f"B{row}"].value for row in (8, 9)] == ["N/A", "N/A"]
+
+def test_only_unsupported_operator_disables_median(monkeypatch):
+    class FailingEmployees(FakeEmployees):
+        def aggregate(self, pipeline):
+            raise OperationFailure("interrupted", code=11601)
+
+    monkeypatch.setattr(report_aggregates, "_median_supported", True)
+    with pytest.raises(OperationFailure):
+        MongoReportData(FailingEmployees(), {}).overview()
+    assert report_aggregates._median_supported
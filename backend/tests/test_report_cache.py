@@ -0,0 +1,13 @@
+from app.report_cache import report_cache_key
+
+def test_cache_key_ignores_dict_order():
+    a = report_cache_key("template", {"template_id": "t1", "filters": {"department": "IT", "is_active": True}}, 4)
+    b = report_cache_key("template", {"filters": {"is_active": True, "department": "IT"}, "template_id": "t1"}, 4)
+    assert a == b
+
+def test_cache_key_changes_with_filters_and_data_version():
+    spec = {"template_id": "t1", "filters": {"department": "IT"}}
+    key = report_cache_key("template", spec, 4)
+    assert key != report_cache_key("template", spec, 5)
+    assert key != report_cache_key("template", {"template_id": "t1", "filters": {"department": "HR"}}, 4)
+    assert key != report_cache_key("custom", spec, 4)
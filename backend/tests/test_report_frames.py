@@ -0,0 +1,18 @@
+from app.report_frames import employee_frame, employee_pipeline, flat_projection
+
+def test_employee_frame_joins_skills_and_coerces_numbers():
+    df = employee_frame([
+        {"_id": "x", "employee_id": "EMP001", "skills": ["Python", "SQL"], "salary": "65000", "performance_score": 4.5},
+        {"_id": "y", "employee_id": "EMP002", "skills": "Go", "salary": 70000, "performance_score": None},
+    ])
+    assert "_id" not in df.columns
+    assert df["skills"].tolist() == ["Python, SQL", "Go"]
+    assert df["salary"].tolist() == [65000, 70000]
+    assert df["performance_score"].dtype == float
+
+def test_list_fields_are_joined_in_the_query():
+    projection = flat_projection(["name", "skills"])
+    assert projection["name"] == 1 and projection["_id"] == 0
+    assert "$reduce" in str(projection["skills"])
+    pipeline = employee_pipeline({"department": "IT"}, sort={"join_date": 1})
+    assert [next(iter(stage)) for stage in pipeline] == ["$match", "$sort", "$set", "$unset"]
@@ -0,0 +1,18 @@
+from datetime import datetime
+from app.report_scheduler import following_run, next_run_after
+
+def test_monthly_runs_keep_their_day_and_clamp_short_months():
+    run = datetime(2024, 1, 31, 9, 0)
+    run = next_run_after(run, "monthly", 31)
+    assert run == datetime(2024, 2, 29, 9, 0)
+    run = next_run_after(run, "monthly", 31)
+    assert run == datetime(2024, 3, 31, 9, 0)
+    assert next_run_after(datetime(2024, 12, 15), "monthly") == datetime(2025, 1, 15)
+
+def test_daily_and_weekly_steps():
+    assert next_run_after(datetime(2024, 2, 28, 6), "daily") == datetime(2024, 2, 29, 6)
+    assert next_run_after(datetime(2024, 12, 30), "weekly") == datetime(2025, 1, 6)
+
+def test_missed_runs_are_skipped_not_replayed():
+    schedule = {"next_run": datetime(2024, 1, 1, 8).isoformat(), "frequency": "weekly"}
+    assert following_run(schedule, datetime(2024, 1, 20, 12)) == datetime(2024, 1, 22, 8)
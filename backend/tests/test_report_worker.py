@@ -0,0 +1,27 @@
+import threading
+from app import report_queue, report_worker
+
+def test_heartbeat_survives_a_failed_renewal(monkeypatch):
+    calls = []
+    renewed = threading.Event()
+
+    def extend_lease(queue, job_id, worker_id):
+        calls.append(job_id)
+        if len(calls) == 1:
+            raise ConnectionError("primary stepped down")
+        renewed.set()
+        return True
+
+    monkeypatch.setattr(report_queue, "REPORT_LEASE_SECONDS", 0.03)
+    monkeypatch.setattr(report_queue, "extend_lease", extend_lease)
+    done = threading.Event()
+    thread = threading.Thread(target=report_worker._heartbeat, args=("reports", "R1", "w1", done))
+    thread.start()
+    assert renewed.wait(2)
+    done.set()
+    thread.join(2)
+    assert len(calls) >= 2
+
+def test_status_writes_need_the_lease():
+    assert report_queue.job_filter("R1") == {"_id": "R1"}
+    assert report_queue.job_filter("R1", "w1") == {"_id": "R1", "locked_by": "w1"}
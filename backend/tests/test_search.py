@@ -0,0 +1,28 @@
+from app.search import (SEARCH_TOKENS_FIELD, build_prefix_pipeline, build_prefix_query, normalize_terms,
+                        prefix_tokens, search_tokens, search_update)
+
+def test_terms_drop_regex_and_text_operators():
+    assert normalize_terms('.*("Jo-Ann" -smith)+') == ["jo", "ann", "smith"]
+    assert normalize_terms("$$$") == []
+
+def test_search_tokens_are_lowercase_words_of_searchable_fields():
+    employee = {"name": "Ada Lovelace", "email": "ada@corp.com", "position": None, "salary": 100, "employee_id": "EMP001"}
+    assert search_tokens(employee) == ["ada", "com", "corp", "emp001", "lovelace"]
+    # The server's $toLower only folds ASCII; non-ASCII letters split words on both sides
+    assert search_tokens({"name": "JOSÉ"}) == prefix_tokens(normalize_terms("José")) == ["jos"]
+
+def test_prefix_query_is_anchored_on_stored_tokens():
+    query = build_prefix_query(["ada", "lov"])
+    assert query == {"$or": [{SEARCH_TOKENS_FIELD: {"$regex": "^ada"}}, {SEARCH_TOKENS_FIELD: {"$regex": "^lov"}}]}
+    assert "$options" not in str(query)
+
+def test_prefix_pipeline_ranks_and_pages_on_the_server():
+    pipeline = build_prefix_pipeline(["ada"], limit=20, offset=40)
+    assert [next(iter(stage)) for stage in pipeline] == ["$match", "$set", "$sort", "$skip", "$limit", "$project"]
+    assert pipeline[3]["$skip"] == 40 and pipeline[4]["$limit"] == 20
+    assert pipeline[5]["$project"][SEARCH_TOKENS_FIELD] == 0
+
+def test_search_update_sets_literal_values_then_refreshes_tokens():
+    pipeline = search_update({"position": "$ceo"})
+    assert pipeline[0] == {"$set": {"position": {"$literal": "$ceo"}}}
+    assert SEARCH_TOKENS_FIELD in pipeline[1]["$set"]
@@ -0,0 +1,22 @@
+from app.analytics_engine import dashboard_stats_from_snapshots
+from app.snapshots import _contribution
+
+def test_contribution_skips_missing_and_nan_values():
+    inc = _contribution({"department": "QA", "is_active": False, "salary": float("nan"), "join_date": "2024-01-05"})
+    assert inc["employee_count"] == 1
+    assert inc["inactive_count"] == 1
+    assert "salary_sum" not in inc
+    assert inc["hires.2024-01"] == 1
+
+def test_dashboard_stats_from_snapshots():
+    snapshots = [
+        {"department": "QA", "employee_count": 2, "inactive_count": 1, "salary_sum": 100, "salary_count": 2,
+         "active_performance_sum": 4, "active_performance_count": 1, "hires": {}},
+        {"department": "HR", "employee_count": 2, "inactive_count": 0, "salary_sum": 300, "salary_count": 2,
+         "active_performance_sum": 9, "active_performance_count": 2, "hires": {}},
+    ]
+    stats = dashboard_stats_from_snapshots(snapshots, "QA")
+    assert stats["total_employees"] == 2
+    assert stats["average_salary"] == 50
+    assert stats["attrition_rate"] == 50
+    assert stats["top_department"] == "HR"
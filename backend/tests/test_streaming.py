@@ -0,0 +1,54 @@
+import json
+from datetime import datetime
+from app.streaming import iter_json_array, iter_ndjson
+
+def _docs(n):
+    return ({"employee_id": f"EMP{i:03d}", "join_date": datetime(2024, 1, 1)} for i in range(n))
+
+def test_ndjson_flushes_one_chunk_per_batch():
+    chunks = list(iter_ndjson(_docs(5), batch_size=2))
+    assert len(chunks) == 3
+    lines = "".join(chunks).splitlines()
+    assert [json.loads(line)["employee_id"] for line in lines] == [f"EMP{i:03d}" for i in range(5)]
+
+def test_json_array_is_valid_for_any_size():
+    for n in (0, 1, 2, 5):
+        assert len(json.loads("".join(iter_json_array(_docs(n), batch_size=2)))) == n
+
+def test_json_array_suffix_receives_count():
+    body = "".join(iter_json_array(_docs(3), batch_size=2, prefix='{"data": [',
+                                   suffix=lambda count: f'], "record_count": {count}}}'))
+    assert json.loads(body)["record_count"] == 3
+
+def test_csv_rows_follow_columns():
+    from app.streaming import iter_csv
+    docs = [{"employee_id": "EMP001", "skills": None}, {"employee_id": "EMP002", "extra": 1}]
+    body = "".join(iter_csv(docs, ["employee_id", "skills"], batch_size=1))
+    assert body.splitlines() == ["employee_id,skills", "EMP001,", "EMP002,"]
+
+def test_xlsx_is_readable_and_flattens_lists():
+    from io import BytesIO
+    from openpyxl import load_workbook
+    from app.streaming import iter_xlsx
+    docs = [{"employee_id": "EMP001", "skills": ["python", "sql"]}]
+    sheet = load_workbook(BytesIO(b"".join(iter_xlsx(docs, ["employee_id", "skills"])))).active
+    assert [cell.value for cell in sheet[2]] == ["EMP001", "python, sql"]
+
+def test_export_columns_cover_fields_missing_from_first_row(monkeypatch):
+    import asyncio
+    from app.routes import employeeroutes
+
+    class FakeEmployees:
+        def aggregate(self, pipeline, **kwargs):
+            return iter([{"employee_id": "EMP001", "name": "A"},
+                         {"employee_id": "EMP002", "name": "B", "photo_url": "uploads/photos/b.png"}])
+
+    async def body(response):
+        return "".join([chunk async for chunk in response.body_iterator])
+
+    monkeypatch.setattr(employeeroutes, "empcollection", FakeEmployees())
+    response = employeeroutes.export_employees("2024-01-01", "2024-12-31", "csv")
+    rows = asyncio.run(body(response)).splitlines()
+    header = rows[0].split(",")
+    assert header[0] == "employee_id" and "hashed_password" not in header
+    assert rows[2].split(",")[header.index("photo_url")] == "uploads/photos/b.png"